@@ -0,0 +1,59 @@
+""" Test cases for the movie entity. """
+
+import pytest
+
+from api.entities.movies import Movie
+
+
+def test_movie_has_no_instance_dict():
+    """Test that movies are slotted and expose the read only attribute API."""
+    movie = Movie(
+        movie_id="my-id",
+        title="My Movie",
+        description="My description",
+        release_year=1990,
+        watched=True,
+    )
+    assert not hasattr(movie, "__dict__")
+    assert (movie.id, movie.title, movie.release_year, movie.watched) == (
+        "my-id",
+        "My Movie",
+        1990,
+        True,
+    )
+    with pytest.raises(AttributeError):
+        movie.title = "Other"
+
+
+def test_from_documents():
+    """Test building movies in bulk from stored documents."""
+    documents = [
+        {
+            "_id": "ignored",
+            "id": "my-id",
+            "title": "My Movie",
+            "description": "My description",
+            "release_year": 1990,
+            "watched": True,
+        },
+        {"id": "my-id-2", "title": "My Movie 2"},
+    ]
+    assert Movie.from_documents(documents) == [
+        Movie(
+            movie_id="my-id",
+            title="My Movie",
+            description="My description",
+            release_year=1990,
+            watched=True,
+        ),
+        Movie(
+            movie_id="my-id-2",
+            title="My Movie 2",
+            description=None,
+            release_year=None,
+            watched=None,
+        ),
+    ]
+    assert Movie.from_document(documents[0]) == Movie.from_documents(documents)[0]
+    with pytest.raises(ValueError):
+        Movie.from_documents([{"title": "No id"}])
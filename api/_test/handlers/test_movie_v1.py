@@ -1,14 +1,22 @@
 """ Test cases for the movie_v1 api endpoint. """
 
 # pylint: disable=unused-import , redefined-outer-name
+import asyncio
+import collections
 import functools
+import json
+
+import httpx
 import pytest
 
 # from api._test.repository.fixture import test_client
 from api._test.repository.fixture import test_client_fixture
 from api.entities.movies import Movie
 from api.handlers.movie_v1 import movie_repository
+from api.repository.movie.batching import BatchingMovieRepository
+from api.repository.movie.caching import CachingMovieRepository
 from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.single_flight import SingleFlightMovieRepository
 
 
 def memory_repository_dependency(dependency):
@@ -441,3 +449,526 @@ async def test_delete_movie(test_client_fixture):
 
     assert result.status_code == 204
     assert await repo.get_by_id(movie_id="top_movie") is None
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_prefix(test_client_fixture):
+    """Test searching movies by title prefix and autocompleting titles."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id, title in (("1", "The Matrix"), ("2", "The Matrix Reloaded")):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="Movie Description",
+                release_year=1999,
+                watched=False,
+            )
+        )
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/?title=the mat&match=prefix", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 200
+    assert [movie["id"] for movie in result.json()] == ["1", "2"]
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/autocomplete?prefix=THE MATRIX R", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 200
+    assert result.json() == [{"title": "The Matrix Reloaded", "count": 1}]
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_release_year(test_client_fixture):
+    """Test listing movies released in a range of years."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id, release_year in (("1", 1989), ("2", 1994), ("3", 1999)):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=release_year,
+                watched=False,
+            )
+        )
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/by-release-year?start=1990&end=1999", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 200
+    assert [movie["id"] for movie in result.json()] == ["2", "3"]
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/by-release-year?start=1999&end=1990", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 400
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_snapshot(test_client_fixture):
+    """Test paging through title matches from a snapshot."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("1", "2", "3"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+                watched=False,
+            )
+        )
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/?title=movie title&limit=2&consistent=true",
+        auth=("Bruce", "Wayne"),
+    )
+    assert [movie["id"] for movie in result.json()] == ["1", "2"]
+    token = result.headers["X-Snapshot-Token"]
+    await repo.delete("1")
+
+    result = test_client_fixture.get(
+        f"/api/v1/movies/?title=movie title&skip=2&limit=2&snapshot={token}",
+        auth=("Bruce", "Wayne"),
+    )
+    assert result.status_code == 200
+    assert [movie["id"] for movie in result.json()] == ["3"]
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/?title=movie title&snapshot=unknown", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 400
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_cursor(test_client_fixture):
+    """Test paging through title matches with the cursor of the previous page."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("1", "2", "3"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+                watched=False,
+            )
+        )
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/?title=movie title&limit=2", auth=("Bruce", "Wayne")
+    )
+    assert [movie["id"] for movie in result.json()] == ["1", "2"]
+    cursor = result.headers["X-Next-Cursor"]
+
+    result = test_client_fixture.get(
+        f"/api/v1/movies/?title=movie title&limit=2&cursor={cursor}",
+        auth=("Bruce", "Wayne"),
+    )
+    assert [movie["id"] for movie in result.json()] == ["3"]
+    assert "X-Next-Cursor" not in result.headers
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/?title=movie title&cursor=garbage", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 400
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_ndjson(test_client_fixture):
+    """Test streaming title matches as NDJSON."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("1", "2", "3"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+                watched=False,
+            )
+        )
+    headers = {"Accept": "application/x-ndjson"}
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/?title=movie title&skip=1",
+        headers=headers,
+        auth=("Bruce", "Wayne"),
+    )
+    assert result.status_code == 200
+    assert result.headers["content-type"] == "application/x-ndjson"
+    lines = result.text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["2", "3"]
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/?title=movie title&consistent=true",
+        headers=headers,
+        auth=("Bruce", "Wayne"),
+    )
+    assert result.status_code == 400
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_ids(test_client_fixture):
+    """Test fetching several movies by id in one request."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("1", "2"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+                watched=False,
+            )
+        )
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/batch?ids=2,missing&ids=1&ids=2", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 200
+    body = result.json()
+    assert [movie["id"] for movie in body["movies"]] == ["2", "1"]
+    assert body["missing"] == ["missing"]
+
+    too_many = ",".join(str(index) for index in range(101))
+    result = test_client_fixture.get(
+        f"/api/v1/movies/batch?ids={too_many}", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 400
+
+
+@pytest.mark.asyncio()
+async def test_conditional_get(test_client_fixture):
+    """Test the ETag of movie reads and the 304 answer to If-None-Match."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="1",
+            title="movie title",
+            description="Movie Description",
+            release_year=2000,
+            watched=False,
+        )
+    )
+
+    for url in ("/api/v1/movies/1", "/api/v1/movies/?title=movie title"):
+        result = test_client_fixture.get(url, auth=("Bruce", "Wayne"))
+        assert result.status_code == 200
+        etag = result.headers["ETag"]
+
+        result = test_client_fixture.get(
+            url, headers={"If-None-Match": etag}, auth=("Bruce", "Wayne")
+        )
+        assert result.status_code == 304
+        assert result.content == b""
+
+        await repo.update("1", {"description": f"Described for {url}"})
+        result = test_client_fixture.get(
+            url, headers={"If-None-Match": etag}, auth=("Bruce", "Wayne")
+        )
+        assert result.status_code == 200
+        assert result.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio()
+async def test_search_movies(test_client_fixture):
+    """Test the full-text search of titles and descriptions."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id, title, description in (
+        ("1", "Heat", "A detective hunts a crew of thieves"),
+        ("2", "Thieves Highway", "A trucker takes on a crooked dealer"),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description=description,
+                release_year=1995,
+                watched=False,
+            )
+        )
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/search?q=thieves", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 200
+    assert [movie["id"] for movie in result.json()] == ["2", "1"]
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_fuzzy(test_client_fixture):
+    """Test searching movies by a misspelled title."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="1",
+            title="The Godfather",
+            description="Movie Description",
+            release_year=1972,
+            watched=False,
+        )
+    )
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/?title=the godfahter&match=fuzzy", auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 200
+    assert [movie["id"] for movie in result.json()] == ["1"]
+
+
+@pytest.mark.asyncio()
+async def test_get_catalog_stats(test_client_fixture):
+    """Test the statistics of the catalog."""
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id, release_year, watched in (("1", 1972, True), ("2", 1994, False)):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="Movie Description",
+                release_year=release_year,
+                watched=watched,
+            )
+        )
+
+    result = test_client_fixture.get("/api/v1/movies/stats", auth=("Bruce", "Wayne"))
+    assert result.status_code == 200
+    assert result.json() == {
+        "total": 2,
+        "watched": 1,
+        "unwatched": 1,
+        "by_release_year": {"1972": 1, "1994": 1},
+    }
+
+
+class SlowMemoryRepository(MemoryMovieRepository):
+    """Memory repository whose list reads take a while and are counted."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = collections.Counter()
+
+    async def _slow(self, operation: str):
+        self.reads[operation] += 1
+        await asyncio.sleep(0.05)
+
+    async def get_by_title_after(self, title, cursor=None, limit=1000):
+        await self._slow("get_by_title_after")
+        return await super().get_by_title_after(title, cursor=cursor, limit=limit)
+
+    async def get_by_title_fuzzy(self, title, max_distance=2, skip=0, limit=1000):
+        await self._slow("get_by_title_fuzzy")
+        return await super().get_by_title_fuzzy(
+            title, max_distance=max_distance, skip=skip, limit=limit
+        )
+
+    async def get_by_release_year_range(self, start, end, skip=0, limit=1000):
+        await self._slow("get_by_release_year_range")
+        return await super().get_by_release_year_range(
+            start, end, skip=skip, limit=limit
+        )
+
+    async def search(self, query, skip=0, limit=1000):
+        await self._slow("search")
+        return await super().search(query, skip=skip, limit=limit)
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_list_requests_share_backend_reads(test_client_fixture):
+    """Test that concurrent identical list requests are answered by one backend read."""
+    inner = SlowMemoryRepository()
+    await inner.create(
+        Movie(
+            movie_id="1",
+            title="The Godfather",
+            description="Movie Description",
+            release_year=1972,
+            watched=False,
+        )
+    )
+    patched_dependency = functools.partial(
+        memory_repository_dependency, SingleFlightMovieRepository(inner)
+    )
+    app = test_client_fixture.app
+    app.dependency_overrides[movie_repository] = patched_dependency
+    urls = [
+        "/api/v1/movies/?title=The Godfather",
+        "/api/v1/movies/?title=the godfahter&match=fuzzy",
+        "/api/v1/movies/by-release-year?start=1970&end=1980",
+        "/api/v1/movies/search?q=godfather",
+    ]
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        results = await asyncio.gather(
+            *(
+                client.get(url, auth=("Bruce", "Wayne"))
+                for url in urls
+                for _ in range(5)
+            )
+        )
+    assert [result.status_code for result in results] == [200] * 20
+    assert all([movie["id"] for movie in result.json()] == ["1"] for result in results)
+    assert inner.reads == {
+        "get_by_title_after": 1,
+        "get_by_title_fuzzy": 1,
+        "get_by_release_year_range": 1,
+        "search": 1,
+    }
+
+
+class CountingMemoryRepository(MemoryMovieRepository):
+    """Memory repository counting the reads of a movie by id reaching it."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    async def get_by_id(self, movie_id):
+        self.reads += 1
+        return await super().get_by_id(movie_id)
+
+    async def get_version(self, movie_id):
+        self.reads += 1
+        return await super().get_version(movie_id)
+
+
+@pytest.mark.asyncio()
+async def test_conditional_get_from_a_warm_cache(test_client_fixture):
+    """Test that a warm cache answers both 200 and 304 without reading the backend."""
+    inner = CountingMemoryRepository()
+    await inner.create(
+        Movie(
+            movie_id="1",
+            title="movie title",
+            description="Movie Description",
+            release_year=2000,
+            watched=False,
+        )
+    )
+    patched_dependency = functools.partial(
+        memory_repository_dependency, CachingMovieRepository(inner)
+    )
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+
+    result = test_client_fixture.get("/api/v1/movies/1", auth=("Bruce", "Wayne"))
+    assert result.status_code == 200
+    etag = result.headers["ETag"]
+    reads = inner.reads
+
+    result = test_client_fixture.get("/api/v1/movies/1", auth=("Bruce", "Wayne"))
+    assert result.status_code == 200
+    assert result.headers["ETag"] == etag
+    result = test_client_fixture.get(
+        "/api/v1/movies/1", headers={"If-None-Match": etag}, auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 304
+    assert inner.reads == reads
+
+
+class VersionedRecordingRepository(MemoryMovieRepository):
+    """Memory repository recording its reads of movies with versions."""
+
+    def __init__(self):
+        super().__init__()
+        self.versioned_batches = []
+        self.versioned_reads = 0
+
+    async def get_versioned(self, movie_id):
+        self.versioned_reads += 1
+        return await super().get_versioned(movie_id)
+
+    async def get_many_versioned(self, movie_ids):
+        self.versioned_batches.append(sorted(movie_ids))
+        return await super().get_many_versioned(movie_ids)
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_detail_requests_are_batched(test_client_fixture):
+    """Test that concurrent reads of movies by id are answered by one bulk read."""
+    inner = VersionedRecordingRepository()
+    for movie_id in ("1", "2", "3"):
+        await inner.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+                watched=False,
+            )
+        )
+    patched_dependency = functools.partial(
+        memory_repository_dependency, BatchingMovieRepository(inner, max_delay=0.05)
+    )
+    app = test_client_fixture.app
+    app.dependency_overrides[movie_repository] = patched_dependency
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        results = await asyncio.gather(
+            *(
+                client.get(f"/api/v1/movies/{movie_id}", auth=("Bruce", "Wayne"))
+                for movie_id in ("1", "2", "3", "1")
+            )
+        )
+    assert [result.status_code for result in results] == [200] * 4
+    assert [result.json()["id"] for result in results] == ["1", "2", "3", "1"]
+    assert results[0].headers["ETag"] == results[3].headers["ETag"]
+    assert inner.versioned_batches == [["1", "2", "3"]]
+
+
+@pytest.mark.asyncio()
+async def test_cold_conditional_get_reads_the_version_only(test_client_fixture):
+    """Test that a matching If-None-Match on a cold cache does not load the movie."""
+    inner = VersionedRecordingRepository()
+    await inner.create(
+        Movie(
+            movie_id="1",
+            title="movie title",
+            description="Movie Description",
+            release_year=2000,
+            watched=False,
+        )
+    )
+    etag = f'"{await inner.get_version("1")}"'
+    patched_dependency = functools.partial(
+        memory_repository_dependency, CachingMovieRepository(inner)
+    )
+    test_client_fixture.app.dependency_overrides[movie_repository] = patched_dependency
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/1", headers={"If-None-Match": etag}, auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 304
+    assert result.headers["ETag"] == etag
+    assert inner.versioned_reads == 0
+
+    result = test_client_fixture.get(
+        "/api/v1/movies/1", headers={"If-None-Match": '"0"'}, auth=("Bruce", "Wayne")
+    )
+    assert result.status_code == 200
+    assert result.headers["ETag"] == etag
+    assert inner.versioned_reads == 1
@@ -7,10 +7,28 @@ import pytest
 from starlette.testclient import TestClient
 
 from api.api import create_app
+from api.entities.movies import Movie
 from api.repository.movie.memory import MemoryMovieRepository
 from api.repository.movie.mongo import MongoMovieRepository
 
 
+def make_movie(
+    movie_id: str,
+    title: str = "My Movie",
+    description: str = "My description",
+    release_year: int = 1990,
+    watched: bool = False,
+) -> Movie:
+    """Return a movie with default values for the fields a test does not care about."""
+    return Movie(
+        movie_id=movie_id,
+        title=title,
+        description=description,
+        release_year=release_year,
+        watched=watched,
+    )
+
+
 @pytest.fixture
 def test_client_fixture():
     """Return a TestClient instance."""
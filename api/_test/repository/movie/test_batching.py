@@ -0,0 +1,94 @@
+"""
+This file contains the tests for the batching movie repository.
+"""
+
+import asyncio
+
+import pytest
+
+from api._test.repository.fixture import make_movie
+from api.repository.movie.batching import BatchingMovieRepository
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+class RecordingRepository(MemoryMovieRepository):
+    """Memory repository recording its bulk reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.versioned_batches = []
+
+    async def get_many(self, movie_ids):
+        self.batches.append(list(movie_ids))
+        return await super().get_many(movie_ids)
+
+    async def get_many_versioned(self, movie_ids):
+        self.versioned_batches.append(list(movie_ids))
+        return await super().get_many_versioned(movie_ids)
+
+
+@pytest.mark.asyncio
+async def test_reads_of_one_tick_are_batched():
+    """Test that the reads of a tick become one bulk read, answered per caller."""
+    inner = RecordingRepository()
+    for movie_id in ("a", "b"):
+        await inner.create(make_movie(movie_id))
+    repo = BatchingMovieRepository(inner)
+
+    results = await asyncio.gather(
+        repo.get_by_id("a"), repo.get_by_id("missing"), repo.get_by_id("a")
+    )
+    assert results == [make_movie("a"), None, make_movie("a")]
+    assert inner.batches == [["a", "missing"]]
+
+    assert await repo.get_by_id("b") == make_movie("b")
+    assert inner.batches == [["a", "missing"], ["b"]]
+
+
+@pytest.mark.asyncio
+async def test_versioned_reads_of_one_tick_are_batched():
+    """Test that the versioned reads of a tick become one bulk read of their own."""
+    inner = RecordingRepository()
+    for movie_id in ("a", "b"):
+        await inner.create(make_movie(movie_id))
+    await inner.update("b", {"watched": True})
+    repo = BatchingMovieRepository(inner)
+
+    results = await asyncio.gather(
+        repo.get_versioned("a"),
+        repo.get_versioned("b"),
+        repo.get_versioned("missing"),
+        repo.get_by_id("a"),
+    )
+    assert results[0] == (make_movie("a"), await inner.get_version("a"))
+    assert results[1] == (make_movie("b", watched=True), await inner.get_version("b"))
+    assert results[2] is None
+    assert results[3] == make_movie("a")
+    assert inner.versioned_batches == [["a", "b", "missing"]]
+    assert inner.batches == [["a"]]
+
+
+@pytest.mark.asyncio
+async def test_full_batches_are_dispatched_early():
+    """Test that a batch is dispatched once it holds max_batch_size ids."""
+    inner = RecordingRepository()
+    repo = BatchingMovieRepository(inner, max_batch_size=2, max_delay=60)
+
+    await asyncio.gather(*(repo.get_by_id(str(index)) for index in range(4)))
+    assert inner.batches == [["0", "1"], ["2", "3"]]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_fails_every_caller():
+    """Test that an error of the bulk read reaches every caller of the batch."""
+
+    class FailingRepository(MemoryMovieRepository):
+        async def get_many(self, movie_ids):
+            raise ConnectionError("backend down")
+
+    repo = BatchingMovieRepository(FailingRepository())
+    results = await asyncio.gather(
+        repo.get_by_id("a"), repo.get_by_id("b"), return_exceptions=True
+    )
+    assert all(isinstance(result, ConnectionError) for result in results)
@@ -0,0 +1,146 @@
+"""
+This file contains the tests for the caching movie repository.
+"""
+
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from api._test.repository.fixture import make_movie
+from api.repository.movie.caching import CachingMovieRepository
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+class CountingRepository(MemoryMovieRepository):
+    """Memory repository counting the reads by id reaching it."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    async def get_by_id(self, movie_id):
+        self.reads += 1
+        return await super().get_by_id(movie_id)
+
+    async def get_many(self, movie_ids):
+        self.reads += len(movie_ids)
+        return await super().get_many(movie_ids)
+
+    async def get_versioned(self, movie_id):
+        self.reads += 1
+        return await super().get_versioned(movie_id)
+
+
+class FakeClock:
+    """A clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, {"cache": "movie", **labels}) or 0
+
+
+@pytest.mark.asyncio
+async def test_reads_are_cached_until_they_expire():
+    """Test that reads by id hit the cache until the TTL elapses."""
+    inner, clock = CountingRepository(), FakeClock()
+    await inner.create(make_movie("id"))
+    repo = CachingMovieRepository(inner, ttl=10, clock=clock)
+    hits = _sample("movie_tracker_cache_hits_total")
+
+    assert await repo.get_by_id("id") == make_movie("id")
+    assert await repo.get_by_id("id") == make_movie("id")
+    assert inner.reads == 1
+    assert _sample("movie_tracker_cache_hits_total") == hits + 1
+
+    clock.now = 11
+    assert await repo.get_by_id("id") == make_movie("id")
+    assert inner.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_fill_and_invalidate():
+    """Test that creates fill the cache and updates and deletes invalidate it."""
+    inner = CountingRepository()
+    repo = CachingMovieRepository(inner)
+    await repo.create(make_movie("id"))
+    assert await repo.get_by_id("id") == make_movie("id")
+    assert inner.reads == 0
+
+    await repo.update("id", {"title": "Renamed"})
+    assert (await repo.get_by_id("id")).title == "Renamed"
+    await repo.delete("id")
+    assert await repo.get_by_id("id") is None
+    assert inner.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_is_evicted():
+    """Test that the cache keeps at most max_entries movies."""
+    inner = CountingRepository()
+    repo = CachingMovieRepository(inner, max_entries=2)
+    evictions = _sample("movie_tracker_cache_evictions_total", reason="size")
+    for movie_id in ("a", "b"):
+        await repo.create(make_movie(movie_id))
+    await repo.get_by_id("a")
+    await repo.create(make_movie("c"))
+
+    assert list(repo._entries) == ["a", "c"]
+    assert (
+        _sample("movie_tracker_cache_evictions_total", reason="size") == evictions + 1
+    )
+    assert await repo.get_many(["a", "b", "missing"]) == [
+        make_movie("a"),
+        make_movie("b"),
+        None,
+    ]
+    assert inner.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_read_racing_a_write_is_not_cached():
+    """Test that a read overlapping an update does not cache the old movie."""
+
+    class SlowRepository(MemoryMovieRepository):
+        async def get_by_id(self, movie_id):
+            movie = await super().get_by_id(movie_id)
+            await asyncio.sleep(0.01)
+            return movie
+
+    inner = SlowRepository()
+    await inner.create(make_movie("id"))
+    repo = CachingMovieRepository(inner)
+    read = asyncio.ensure_future(repo.get_by_id("id"))
+    await asyncio.sleep(0)
+    await repo.update("id", {"title": "Renamed"})
+
+    assert (await read).title == "My Movie"
+    assert "id" not in repo._entries
+
+
+@pytest.mark.asyncio
+async def test_versions_are_cached_with_their_movie():
+    """Test that versioned reads hit the cache and writes invalidate the version too."""
+    inner = CountingRepository()
+    repo = CachingMovieRepository(inner)
+    await repo.create(make_movie("id"))
+    version = await inner.get_version("id")
+    # the created movie is cached without its version
+    assert await repo.get_versioned("id") == (make_movie("id"), version)
+    assert await repo.get_versioned("id") == (make_movie("id"), version)
+    assert await repo.get_by_id("id") == make_movie("id")
+    assert inner.reads == 1
+
+    await repo.update("id", {"title": "Renamed"})
+    movie, renamed = await repo.get_versioned("id")
+    assert movie == make_movie("id", "Renamed")
+    assert renamed > version
+    await repo.delete("id")
+    assert await repo.get_versioned("id") is None
+    assert inner.reads == 3
@@ -0,0 +1,90 @@
+"""
+This file contains the tests for the columnar movie storage engine.
+"""
+
+import uuid
+
+import pytest
+
+from api.entities.movies import Movie
+from api.repository.movie.columnar import ColumnarMovieStore
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+def test_store_round_trip():
+    """Test that stored movies are materialized unchanged, for uuid and other ids."""
+    store = ColumnarMovieStore()
+    uuid_id = str(uuid.uuid4())
+    for movie_id in (uuid_id, "my-id", str(uuid.uuid4()).upper()):
+        movie = Movie(
+            movie_id=movie_id,
+            title="My Movie",
+            description="My description",
+            release_year=1994,
+            watched=True,
+        )
+        store[movie_id] = movie
+        assert store.get(movie_id) == movie
+        assert store.get(movie_id) is not movie
+    assert len(store) == 3
+    assert store.get("missing") is None
+    assert store.pop(uuid_id).id == uuid_id
+    assert uuid_id not in store
+    assert len(store) == 2
+
+
+def test_store_reuses_rows_and_titles():
+    """Test that deleted rows and unreferenced titles are recycled."""
+    store = ColumnarMovieStore()
+    for index in range(3):
+        store[str(index)] = Movie(
+            movie_id=str(index),
+            title="Shared Title" if index < 2 else "Other Title",
+            description="My description",
+            release_year=2000 + index,
+            watched=False,
+        )
+    assert len(store._titles) == 2
+    store.pop("2")
+    store["3"] = Movie(
+        movie_id="3",
+        title="Third Title",
+        description="My description",
+        release_year=2003,
+        watched=True,
+    )
+    assert len(store._keys) == 3
+    assert len(store._titles) == 2
+    assert store["3"].title == "Third Title"
+    assert store["0"].title == "Shared Title"
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_with_columnar_storage():
+    """Test the in-memory repository operations on top of the columnar store."""
+    repo = MemoryMovieRepository(storage=ColumnarMovieStore())
+    for movie_id in ("my-id", "my-id-2"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="My description",
+                release_year=1990,
+                watched=False,
+            )
+        )
+    await repo.update(
+        movie_id="my-id-2", update_parameteres={"title": "Renamed", "watched": True}
+    )
+    await repo.delete("my-id")
+
+    assert await repo.get_by_title("My Movie") == []
+    assert await repo.get_by_title("Renamed") == [
+        Movie(
+            movie_id="my-id-2",
+            title="Renamed",
+            description="My description",
+            release_year=1990,
+            watched=True,
+        )
+    ]
@@ -0,0 +1,62 @@
+"""
+This file contains the tests for the full-text search of the in-memory repositories.
+"""
+
+import pytest
+
+from api.entities.movies import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+
+MOVIES = [
+    ("1", "The Matrix", "A hacker learns the truth about his reality"),
+    ("2", "Hackers", "Teenage hackers are drawn into a corporate conspiracy"),
+    ("3", "The Truth", "A documentary about a reality show"),
+    ("4", "Reality Bites", "Graduates face the reality of adult life"),
+    (
+        "5",
+        "Matrix of Leadership",
+        "A long saga of giant robots at war across many worlds",
+    ),
+]
+
+
+async def _seed(repo):
+    for movie_id, title, description in MOVIES:
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description=description,
+                release_year=1999,
+                watched=False,
+            )
+        )
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_matches():
+    """Test that matches are ranked by BM25, title words counting more."""
+    repo = MemoryMovieRepository()
+    await _seed(repo)
+
+    assert [movie.id for movie in await repo.search("matrix")] == ["1", "5"]
+    assert [movie.id for movie in await repo.search("REALITY")] == ["4", "3", "1"]
+    assert [movie.id for movie in await repo.search("reality", skip=1, limit=1)] == [
+        "3"
+    ]
+    assert await repo.search("nothing") == []
+
+
+@pytest.mark.asyncio
+async def test_search_follows_writes():
+    """Test that the index is updated by updates and deletes."""
+    repo = MemoryMovieRepository()
+    await _seed(repo)
+
+    await repo.update("5", {"description": "A robot uprising"})
+    assert [movie.id for movie in await repo.search("uprising")] == ["5"]
+    await repo.update("5", {"description": "A story of robots"})
+    assert await repo.search("uprising") == []
+    await repo.delete_many(["1", "5"])
+    assert await repo.search("matrix") == []
+    assert [movie.id for movie in await repo.search("hackers")] == ["2"]
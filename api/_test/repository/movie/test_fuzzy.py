@@ -0,0 +1,111 @@
+"""
+This file contains the tests for the fuzzy title search.
+"""
+
+import random
+
+import pytest
+
+from api.entities.movies import Movie
+from api.repository.movie.fuzzy import (
+    TrigramIndex,
+    bounded_levenshtein,
+    trigrams,
+    usable_distance,
+)
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+def _levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char != other),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+@pytest.mark.parametrize(
+    "a, b, bound, expected",
+    [
+        ("matrix", "matrix", 0, 0),
+        ("matrix", "matirx", 2, 2),
+        ("matrix", "matrx", 1, 1),
+        ("matrix", "mtrx", 1, None),
+        ("", "abc", 3, 3),
+        ("kitten", "sitting", 2, None),
+        ("kitten", "sitting", 3, 3),
+    ],
+)
+def test_bounded_levenshtein(a, b, bound, expected):
+    """Test the bounded edit distance on known pairs."""
+    assert bounded_levenshtein(a, b, bound) == expected
+    assert bounded_levenshtein(b, a, bound) == expected
+
+
+def test_trigram_search_finds_every_match():
+    """Test that the trigram candidates never miss a title within the distance."""
+    rng = random.Random(7)
+    titles = {
+        "".join(rng.choice("abcde ") for _ in range(rng.randrange(3, 12)))
+        for _ in range(500)
+    }
+    index = TrigramIndex()
+    for title in titles:
+        index.add(title)
+    for query in list(titles)[:50]:
+        query = query[:-1] + "x"
+        distance = usable_distance(trigrams(query), 2)
+        expected = sorted(
+            (_levenshtein(query, title), title)
+            for title in titles
+            if _levenshtein(query, title) <= distance
+        )
+        assert index.search(query, 2) == expected
+
+
+async def _seed(repo):
+    for movie_id, title in (
+        ("1", "The Matrix"),
+        ("2", "The Matrix Reloaded"),
+        ("3", "Matrix"),
+        ("4", "The Mattress"),
+        ("5", "THE MATRIX"),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="My description",
+                release_year=1999,
+                watched=False,
+            )
+        )
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_fuzzy():
+    """Test typo tolerant title search and that it follows writes."""
+    repo = MemoryMovieRepository()
+    await _seed(repo)
+
+    movies = await repo.get_by_title_fuzzy("teh matrix")
+    assert [movie.id for movie in movies] == ["1", "5"]
+    assert await repo.get_by_title_fuzzy("teh matrx") == []
+    movies = await repo.get_by_title_fuzzy("the matress", max_distance=3)
+    assert [movie.id for movie in movies] == ["4", "1", "5"]
+    movies = await repo.get_by_title_fuzzy(
+        "the matress", max_distance=3, skip=1, limit=1
+    )
+    assert [movie.id for movie in movies] == ["1"]
+
+    await repo.update("1", {"title": "Something Else"})
+    await repo.delete("5")
+    assert await repo.get_by_title_fuzzy("teh matrix") == []
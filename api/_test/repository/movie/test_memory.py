@@ -7,8 +7,13 @@ import pytest
 
 from api._test.repository.fixture import memory_movie_repo_fixture
 from api.entities.movies import Movie
-from api.repository.movie.abstractions import RepositoryException
-from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.abstractions import (
+    NOT_PROCESSED,
+    CatalogStats,
+    RepositoryException,
+)
+from api.repository.movie.columnar import ColumnarMovieStore
+from api.repository.movie.memory import DictMovieStore, MemoryMovieRepository
 
 
 @pytest.mark.asyncio
@@ -338,3 +343,301 @@ async def test_update_fail():
     )
     with pytest.raises(RepositoryException):
         await repo.update(movie_id="my-id-2", update_parameteres={"id": "fail"})
+
+
+@pytest.mark.asyncio()
+async def test_title_index_follows_update_and_delete():
+    """Test that the title index is kept in sync by update and delete."""
+    repo = MemoryMovieRepository()
+    for movie_id in ("b", "a", "c"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="My description",
+                release_year=1990,
+                watched=False,
+            )
+        )
+    await repo.update(movie_id="b", update_parameteres={"title": "Other Movie"})
+    await repo.delete("c")
+
+    assert [movie.id for movie in await repo.get_by_title("My Movie")] == ["a"]
+    assert [movie.id for movie in await repo.get_by_title("Other Movie")] == ["b"]
+
+    await repo.create(
+        Movie(
+            movie_id="a",
+            title="Other Movie",
+            description="My description",
+            release_year=1990,
+            watched=False,
+        )
+    )
+    assert await repo.get_by_title("My Movie") == []
+    assert [movie.id for movie in await repo.get_by_title("Other Movie")] == ["a", "b"]
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize(
+    "prefix,skip,limit,expected_ids",
+    [
+        pytest.param("the", 0, 1000, ["3", "1", "2", "4"], id="all-matches"),
+        pytest.param("  THE  dark", 0, 1000, ["3", "1", "2"], id="normalized"),
+        pytest.param("the", 1, 2, ["1", "2"], id="pagination"),
+        pytest.param("the", 2, 0, ["2", "4"], id="no-limit"),
+        pytest.param("alien", 0, 1000, [], id="no-match"),
+    ],
+)
+async def test_get_by_title_prefix(prefix, skip, limit, expected_ids):
+    """Test the retrieval of movies by a case insensitive title prefix."""
+    repo = MemoryMovieRepository()
+    for movie_id, title in (
+        ("1", "The Dark Knight Rises"),
+        ("2", "the dark knight rises"),
+        ("3", "The Dark Knight"),
+        ("4", "The Prestige"),
+        ("5", "Inception"),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="My description",
+                release_year=2010,
+                watched=False,
+            )
+        )
+    movies = await repo.get_by_title_prefix(prefix, skip=skip, limit=limit)
+    assert [movie.id for movie in movies] == expected_ids
+
+
+@pytest.mark.asyncio()
+async def test_autocomplete_titles():
+    """Test that autocomplete ranks exact, popular and short titles first."""
+    repo = MemoryMovieRepository()
+    for movie_id, title in (
+        ("1", "Alien Resurrection"),
+        ("2", "Aliens"),
+        ("3", "Alien"),
+        ("4", "Aliens"),
+        ("5", "Alien 3"),
+        ("6", "Avatar"),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="My description",
+                release_year=1990,
+                watched=False,
+            )
+        )
+    suggestions = await repo.autocomplete_titles("alien", limit=3)
+    assert [(s.title, s.count) for s in suggestions] == [
+        ("Alien", 1),
+        ("Aliens", 2),
+        ("Alien 3", 1),
+    ]
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize(
+    "start,end,skip,limit,expected_ids",
+    [
+        pytest.param(1990, 1999, 0, 1000, ["b", "a", "c"], id="decade"),
+        pytest.param(1994, 1994, 0, 1000, ["a", "c"], id="single-year"),
+        pytest.param(1990, 2010, 1, 2, ["a", "c"], id="pagination"),
+        pytest.param(2000, 1990, 0, 1000, [], id="empty-range"),
+    ],
+)
+async def test_get_by_release_year_range(start, end, skip, limit, expected_ids):
+    """Test the retrieval of movies released within a range of years."""
+    repo = MemoryMovieRepository()
+    for movie_id, release_year in (("a", 1994), ("b", 1991), ("c", 1994), ("d", 2005)):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="My description",
+                release_year=release_year,
+                watched=False,
+            )
+        )
+    await repo.create(
+        Movie(
+            movie_id="e",
+            title="My Movie",
+            description="My description",
+            release_year=1995,
+            watched=False,
+        )
+    )
+    await repo.update(movie_id="e", update_parameteres={"release_year": 2001})
+    movies = await repo.get_by_release_year_range(start, end, skip=skip, limit=limit)
+    assert [movie.id for movie in movies] == expected_ids
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("batch_size", [3, 100])
+async def test_bulk_operations(batch_size):
+    """Test the bulk operations and the index maintenance of small and large batches."""
+    repo = MemoryMovieRepository()
+    movies = [
+        Movie(
+            movie_id=f"id-{i:03d}",
+            title="My Movie",
+            description="My description",
+            release_year=1990 + i % 3,
+            watched=False,
+        )
+        for i in range(batch_size)
+    ]
+    results = await repo.create_many(movies)
+    assert all(result.ok for result in results)
+    assert len(await repo.get_by_title("My Movie", limit=0)) == batch_size
+
+    results = await repo.update_many(
+        [("id-000", {"title": "Renamed"}), ("missing", {"title": "x"}), ("id-001", {})]
+    )
+    assert [(r.movie_id, r.ok) for r in results] == [
+        ("id-000", True),
+        ("missing", False),
+        ("id-001", False),
+    ]
+    assert results[2].error == NOT_PROCESSED
+    results = await repo.update_many(
+        [("missing", {"title": "x"}), ("id-001", {"release_year": 2000})], ordered=False
+    )
+    assert [r.ok for r in results] == [False, True]
+
+    results = await repo.delete_many([movie.id for movie in movies[1:]] + ["missing"])
+    assert [r.ok for r in results] == [True] * (batch_size - 1) + [False]
+    assert await repo.get_by_title("My Movie") == []
+    assert await repo.get_by_release_year_range(1990, 2000) == [
+        Movie(
+            movie_id="id-000",
+            title="Renamed",
+            description="My description",
+            release_year=1990,
+            watched=False,
+        )
+    ]
+    assert await repo.get_many(["id-000", "id-001"]) == [
+        await repo.get_by_id("id-000"),
+        None,
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_get_by_title_after():
+    """Test walking the title matches page by page with cursors."""
+    repo = MemoryMovieRepository()
+    for movie_id in ("c", "a", "d", "b", "e"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="My description",
+                release_year=1990,
+                watched=False,
+            )
+        )
+    page = await repo.get_by_title_after("My Movie", limit=2)
+    assert [movie.id for movie in page.movies] == ["a", "b"]
+    # deleting a movie before the cursor does not shift the following pages
+    await repo.delete("a")
+    page = await repo.get_by_title_after("My Movie", cursor=page.next_cursor, limit=2)
+    assert [movie.id for movie in page.movies] == ["c", "d"]
+    page = await repo.get_by_title_after("My Movie", cursor=page.next_cursor, limit=2)
+    assert [movie.id for movie in page.movies] == ["e"]
+    assert page.next_cursor is None
+
+    with pytest.raises(RepositoryException):
+        await repo.get_by_title_after("My Movie", cursor="not-a-cursor")
+    first = await repo.get_by_title_after("My Movie", limit=1)
+    with pytest.raises(RepositoryException):
+        await repo.get_by_title_after("Other Movie", cursor=first.next_cursor)
+
+
+@pytest.mark.asyncio()
+async def test_versions_change_on_every_write():
+    """Test that creates and updates change the version and deletes drop it."""
+    repo = MemoryMovieRepository()
+    movie = Movie(
+        movie_id="id",
+        title="My Movie",
+        description="My description",
+        release_year=1990,
+        watched=False,
+    )
+    assert await repo.get_version("id") is None
+    await repo.create(movie)
+    created = await repo.get_version("id")
+    await repo.update("id", {"watched": True})
+    updated = await repo.get_version("id")
+    assert updated > created
+    await repo.create_many([movie])
+    assert await repo.get_version("id") > updated
+    await repo.delete("id")
+    assert await repo.get_version("id") is None
+
+
+@pytest.mark.asyncio()
+async def test_get_stats_follow_every_write():
+    """Test that the statistics are kept up to date by single and bulk writes."""
+    repo = MemoryMovieRepository()
+
+    def movie(movie_id: str, release_year: int, watched: bool = False) -> Movie:
+        return Movie(
+            movie_id=movie_id,
+            title="My Movie",
+            description="My description",
+            release_year=release_year,
+            watched=watched,
+        )
+
+    assert await repo.get_stats() == CatalogStats(0, 0, {})
+    await repo.create(movie("1", 1990))
+    await repo.create_many([movie("2", 1990, watched=True), movie("3", 2000)])
+    assert await repo.get_stats() == CatalogStats(3, 1, {1990: 2, 2000: 1})
+    await repo.create(movie("1", 2000, watched=True))
+    await repo.update("3", {"release_year": 2010})
+    await repo.update_many([("2", {"watched": False}), ("missing", {"watched": True})])
+    assert await repo.get_stats() == CatalogStats(3, 1, {1990: 1, 2000: 1, 2010: 1})
+    await repo.delete("1")
+    await repo.delete_many(["2", "missing"])
+    assert await repo.get_stats() == CatalogStats(1, 0, {2010: 1})
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("storage_factory", [DictMovieStore, ColumnarMovieStore])
+async def test_indexes_follow_reused_rows(storage_factory):
+    """Test that the row of a deleted movie is reused without stale index entries."""
+    repo = MemoryMovieRepository(storage=storage_factory())
+
+    def movie(movie_id: str, title: str, release_year: int) -> Movie:
+        return Movie(
+            movie_id=movie_id,
+            title=title,
+            description=f"{title} description",
+            release_year=release_year,
+            watched=False,
+        )
+
+    await repo.create_many([movie("b", "Heat", 1995), movie("c", "Heat", 1995)])
+    await repo.update("b", {"title": "Alien"})
+    version = await repo.get_version("b")
+    await repo.delete("b")
+    await repo.create(movie("a", "Heat", 1979))
+
+    assert [m.id for m in await repo.get_by_title("Heat")] == ["a", "c"]
+    assert await repo.get_by_title("Alien") == []
+    assert [m.id for m in await repo.get_by_release_year_range(1970, 2000)] == [
+        "a",
+        "c",
+    ]
+    assert [m.id for m in await repo.search("heat")] == ["a", "c"]
+    assert await repo.search("alien") == []
+    assert await repo.get_version("a") > version
+    assert await repo.get_version("b") is None
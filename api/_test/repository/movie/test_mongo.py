@@ -1,11 +1,14 @@
 """ Test cases for the movie repository using MongoDB. """
 
 # pylint: disable=unused-import , redefined-outer-name
+import asyncio
+
 import pytest
 
 from api._test.repository.fixture import mongo_movie_repo_fixture
 from api.entities.movies import Movie
-from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie import mongo
+from api.repository.movie.abstractions import CatalogStats, RepositoryException
 
 
 @pytest.mark.asyncio
@@ -360,3 +363,371 @@ async def test_delete(mongo_movie_repo_fixture):
     await mongo_movie_repo_fixture.create(initial_movie)
     await mongo_movie_repo_fixture.delete("first")
     assert await mongo_movie_repo_fixture.get_by_id(movie_id="first") is None
+
+
+@pytest.mark.asyncio
+async def test_bulk_operations(mongo_movie_repo_fixture):
+    """
+    Test the bulk operations of the repository.
+    """
+    movies = [
+        Movie(
+            movie_id=movie_id,
+            title="My Movie",
+            description="My Movie Description",
+            release_year=2022,
+            watched=True,
+        )
+        for movie_id in ("first", "second")
+    ]
+    results = await mongo_movie_repo_fixture.create_many(movies)
+    assert all(result.ok for result in results)
+    assert await mongo_movie_repo_fixture.get_many(["second", "none", "first"]) == [
+        movies[1],
+        None,
+        movies[0],
+    ]
+    results = await mongo_movie_repo_fixture.update_many(
+        [("first", {"watched": False}), ("none", {"watched": False})], ordered=False
+    )
+    assert [result.ok for result in results] == [True, False]
+    results = await mongo_movie_repo_fixture.delete_many(["first", "second", "none"])
+    assert [result.ok for result in results] == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes(mongo_movie_repo_fixture):
+    """
+    Test that the indexes are provisioned and a mismatched one is reported.
+    """
+    states = await mongo_movie_repo_fixture.ensure_indexes()
+    assert set(states.values()) == {"ok"}
+
+    await mongo_movie_repo_fixture._movies.drop_index("title_id")
+    await mongo_movie_repo_fixture._movies.create_index(
+        [("title", 1), ("id", 1)], name="title_id", sparse=True, unique=True
+    )
+    states = await mongo_movie_repo_fixture.check_indexes()
+    assert states["title_id"] == "mismatched"
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_after(mongo_movie_repo_fixture):
+    """
+    Test walking the title matches page by page with cursors.
+    """
+    for movie_id in ("c", "a", "b"):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="description of movie",
+                release_year=2015,
+                watched=True,
+            )
+        )
+    page = await mongo_movie_repo_fixture.get_by_title_after("My Movie", limit=2)
+    assert [movie.id for movie in page.movies] == ["a", "b"]
+    page = await mongo_movie_repo_fixture.get_by_title_after(
+        "My Movie", cursor=page.next_cursor, limit=2
+    )
+    assert [movie.id for movie in page.movies] == ["c"]
+    assert page.next_cursor is None
+    with pytest.raises(RepositoryException):
+        await mongo_movie_repo_fixture.get_by_title_after("My Movie", cursor="%%")
+    await mongo_movie_repo_fixture.delete_many(["a", "b", "c"])
+
+
+@pytest.mark.asyncio
+async def test_iter_by_title(mongo_movie_repo_fixture):
+    """
+    Test streaming the movies matching a title.
+    """
+    for movie_id in ("b", "a"):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="description of movie",
+                release_year=2015,
+                watched=True,
+            )
+        )
+    movies = [
+        movie async for movie in mongo_movie_repo_fixture.iter_by_title("My Movie")
+    ]
+    assert [movie.id for movie in movies] == ["a", "b"]
+    movies = [
+        movie async for movie in mongo_movie_repo_fixture.iter_by_title_prefix("my mov")
+    ]
+    assert [movie.id for movie in movies] == ["a", "b"]
+    await mongo_movie_repo_fixture.delete_many(["a", "b"])
+
+
+@pytest.mark.asyncio
+async def test_versions_change_on_every_write(mongo_movie_repo_fixture):
+    """
+    Test that creates and updates change the version of a movie.
+    """
+    await mongo_movie_repo_fixture.create(
+        Movie(
+            movie_id="first",
+            title="My Movie",
+            description="description of movie",
+            release_year=2015,
+            watched=True,
+        )
+    )
+    created = await mongo_movie_repo_fixture.get_version("first")
+    await mongo_movie_repo_fixture.update("first", {"watched": False})
+    assert await mongo_movie_repo_fixture.get_version("first") == created + 1
+    await mongo_movie_repo_fixture.delete("first")
+    assert await mongo_movie_repo_fixture.get_version("first") is None
+
+
+@pytest.mark.asyncio
+async def test_search(mongo_movie_repo_fixture):
+    """
+    Test the full-text search of titles and descriptions.
+    """
+    await mongo_movie_repo_fixture.ensure_indexes()
+    for movie_id, title, description in (
+        ("first", "Heat", "A detective hunts a crew of thieves"),
+        ("second", "Thieves Highway", "A trucker takes on a crooked dealer"),
+    ):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description=description,
+                release_year=1995,
+                watched=False,
+            )
+        )
+    movies = await mongo_movie_repo_fixture.search("thieves")
+    assert [movie.id for movie in movies] == ["second", "first"]
+    await mongo_movie_repo_fixture.delete_many(["first", "second"])
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_fuzzy(mongo_movie_repo_fixture):
+    """
+    Test searching movies by a misspelled title.
+    """
+    for movie_id, title in (("first", "The Godfather"), ("second", "The Godfather II")):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="description of movie",
+                release_year=1972,
+                watched=False,
+            )
+        )
+    movies = await mongo_movie_repo_fixture.get_by_title_fuzzy("the godfahter ii")
+    assert [movie.id for movie in movies] == ["second"]
+    movies = await mongo_movie_repo_fixture.get_by_title_fuzzy("the godfather i")
+    assert [movie.id for movie in movies] == ["second", "first"]
+    await mongo_movie_repo_fixture.delete_many(["first", "second"])
+
+
+@pytest.mark.asyncio
+async def test_get_stats(mongo_movie_repo_fixture):
+    """
+    Test that the statistics follow the writes and that a recompute repairs them.
+    """
+    for movie_id, release_year, watched in (
+        ("first", 1972, True),
+        ("second", 1972, False),
+        ("third", 1994, False),
+    ):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="description of movie",
+                release_year=release_year,
+                watched=watched,
+            )
+        )
+    await mongo_movie_repo_fixture.update("second", {"release_year": 1994})
+    await mongo_movie_repo_fixture.delete("first")
+    expected = CatalogStats(total=2, watched=0, by_release_year={1994: 2})
+    assert await mongo_movie_repo_fixture.get_stats() == expected
+    assert await mongo_movie_repo_fixture.recompute_stats()
+    await mongo_movie_repo_fixture._stats.update_one(
+        {"_id": "catalog"}, {"$inc": {"total": 5}}
+    )
+    assert not await mongo_movie_repo_fixture.recompute_stats()
+    assert await mongo_movie_repo_fixture.get_stats() == expected
+    await mongo_movie_repo_fixture.delete_many(["second", "third"])
+
+
+@pytest.mark.asyncio
+async def test_backfill_title_fields(mongo_movie_repo_fixture):
+    """
+    Test that documents written without the derived title fields are found by
+    prefix and fuzzy searches once backfilled.
+    """
+    await mongo_movie_repo_fixture._movies.insert_one(
+        {
+            "id": "legacy",
+            "title": "The  Godfather",
+            "description": "description of movie",
+            "release_year": 1972,
+            "watched": False,
+        }
+    )
+    assert await mongo_movie_repo_fixture.get_by_title_prefix("the god") == []
+    assert await mongo_movie_repo_fixture.backfill_title_fields() == 1
+    assert await mongo_movie_repo_fixture.backfill_title_fields() == 0
+    movies = await mongo_movie_repo_fixture.get_by_title_prefix("the god")
+    assert [movie.id for movie in movies] == ["legacy"]
+    movies = await mongo_movie_repo_fixture.get_by_title_fuzzy("the godfahter")
+    assert [movie.id for movie in movies] == ["legacy"]
+    await mongo_movie_repo_fixture.delete("legacy")
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_snapshot(mongo_movie_repo_fixture):
+    """Test that the pages of a snapshot do not see the writes made after it."""
+    for movie_id in ("1", "2", "3"):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title="Snapshot Movie",
+                description="description of movie",
+                release_year=1990,
+                watched=False,
+            )
+        )
+    first = await mongo_movie_repo_fixture.get_by_title_snapshot(
+        "Snapshot Movie", limit=2
+    )
+    assert [movie.id for movie in first.movies] == ["1", "2"]
+    await mongo_movie_repo_fixture.delete("1")
+    second = await mongo_movie_repo_fixture.get_by_title_snapshot(
+        "Snapshot Movie", skip=2, limit=2, snapshot=first.snapshot
+    )
+    assert [movie.id for movie in second.movies] == ["3"]
+    with pytest.raises(RepositoryException):
+        await mongo_movie_repo_fixture.get_by_title_snapshot(
+            "Other Movie", snapshot=first.snapshot
+        )
+    with pytest.raises(RepositoryException):
+        await mongo_movie_repo_fixture.get_by_title_snapshot(
+            "Snapshot Movie", snapshot="missing"
+        )
+    await mongo_movie_repo_fixture.delete_many(["2", "3"])
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_fuzzy_candidates(mongo_movie_repo_fixture, monkeypatch):
+    """
+    Test that titles sharing too few trigrams are filtered on the server and that
+    too many candidates are reported rather than truncated.
+    """
+    for movie_id, title in (("1", "Heat 1"), ("2", "Heat 2"), ("3", "Heathers")):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="description of movie",
+                release_year=1995,
+                watched=False,
+            )
+        )
+    movies = await mongo_movie_repo_fixture.get_by_title_fuzzy("heat 1")
+    assert [movie.id for movie in movies] == ["1", "2"]
+    monkeypatch.setattr(mongo, "FUZZY_CANDIDATES", 1)
+    with pytest.raises(RepositoryException):
+        await mongo_movie_repo_fixture.get_by_title_fuzzy("heat 1")
+    await mongo_movie_repo_fixture.delete_many(["1", "2", "3"])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_delete_many_counts_once(mongo_movie_repo_fixture):
+    """Test that movies deleted by concurrent bulk deletes are uncounted once."""
+    for movie_id in ("1", "2"):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="description of movie",
+                release_year=1990,
+                watched=True,
+            )
+        )
+    before = await mongo_movie_repo_fixture.get_stats()
+    results = await asyncio.gather(
+        *(mongo_movie_repo_fixture.delete_many(["1", "2", "1"]) for _ in range(4))
+    )
+    assert sum(result.ok for batch in results for result in batch) == 2
+    after = await mongo_movie_repo_fixture.get_stats()
+    assert after.total == before.total - 2
+    assert after.watched == before.watched - 2
+
+
+@pytest.mark.asyncio
+async def test_delete_many_concurrent_with_updates_keeps_stats_exact(
+    mongo_movie_repo_fixture,
+):
+    """Test that bulk deletes racing with updates of their movies count each once."""
+    movie_ids = [str(index) for index in range(20)]
+    for movie_id in movie_ids:
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="description of movie",
+                release_year=1990,
+                watched=False,
+            )
+        )
+    await asyncio.gather(
+        mongo_movie_repo_fixture.delete_many(movie_ids),
+        mongo_movie_repo_fixture.delete_many(movie_ids[::-1]),
+        *(
+            mongo_movie_repo_fixture.update(
+                movie_id, {"watched": True, "release_year": 2000}
+            )
+            for movie_id in movie_ids
+        ),
+        *(mongo_movie_repo_fixture.delete(movie_id) for movie_id in movie_ids[::3]),
+        # updates of movies deleted first fail
+        return_exceptions=True,
+    )
+    assert await mongo_movie_repo_fixture.recompute_stats()
+
+
+@pytest.mark.asyncio
+async def test_autocomplete_counts_every_copy_of_a_popular_title(
+    mongo_movie_repo_fixture,
+):
+    """Test that a title with more copies than the candidate window is fully counted."""
+    movies = [
+        Movie(
+            movie_id=f"popular-{index}",
+            title="Popeye",
+            description="description of movie",
+            release_year=1980,
+            watched=False,
+        )
+        for index in range(mongo.AUTOCOMPLETE_CANDIDATES + 50)
+    ]
+    movies.append(
+        Movie(
+            movie_id="rare",
+            title="Popeye the Sailor",
+            description="description of movie",
+            release_year=1933,
+            watched=False,
+        )
+    )
+    await mongo_movie_repo_fixture.create_many(movies)
+    suggestions = await mongo_movie_repo_fixture.autocomplete_titles("pop")
+    assert [(s.title, s.count) for s in suggestions] == [
+        ("Popeye", mongo.AUTOCOMPLETE_CANDIDATES + 50),
+        ("Popeye the Sailor", 1),
+    ]
+    await mongo_movie_repo_fixture.delete_many([movie.id for movie in movies])
@@ -0,0 +1,68 @@
+"""
+This file contains the tests for the MongoDB connection pool metrics.
+"""
+
+from prometheus_client import REGISTRY
+from pymongo import monitoring
+
+from api.repository.movie.mongo import MongoMovieRepository
+from api.repository.movie.mongo_pool import PoolMetricsListener
+
+ADDRESS = ("pool-test", 27017)
+LABELS = {"address": "pool-test:27017"}
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, {**LABELS, **labels}) or 0
+
+
+def test_pool_metrics_follow_events():
+    """Test that the pool events update the connection and checkout metrics."""
+    listener = PoolMetricsListener()
+    listener.pool_created(monitoring.PoolCreatedEvent(ADDRESS, {"maxPoolSize": 5}))
+    listener.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+    checkouts = _sample("movie_tracker_mongo_pool_checkouts_total", outcome="ok")
+    waits = _sample("movie_tracker_mongo_pool_checkout_wait_seconds_count")
+
+    listener.connection_check_out_started(
+        monitoring.ConnectionCheckOutStartedEvent(ADDRESS)
+    )
+    listener.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 1))
+    assert _sample("movie_tracker_mongo_pool_in_use") == 1
+    assert _sample("movie_tracker_mongo_pool_max_size") == 5
+    assert _sample("movie_tracker_mongo_pool_connections") == 1
+    assert (
+        _sample("movie_tracker_mongo_pool_checkouts_total", outcome="ok")
+        == checkouts + 1
+    )
+    assert _sample("movie_tracker_mongo_pool_checkout_wait_seconds_count") == waits + 1
+
+    listener.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+    listener.connection_check_out_started(
+        monitoring.ConnectionCheckOutStartedEvent(ADDRESS)
+    )
+    listener.connection_check_out_failed(
+        monitoring.ConnectionCheckOutFailedEvent(ADDRESS, "timeout")
+    )
+    assert _sample("movie_tracker_mongo_pool_in_use") == 0
+    assert _sample("movie_tracker_mongo_pool_checkouts_total", outcome="timeout") >= 1
+
+
+def test_repository_pool_options():
+    """Test that the pool options reach the client, which connects lazily."""
+    repo = MongoMovieRepository(
+        "mongodb://localhost:27017",
+        max_pool_size=7,
+        min_pool_size=1,
+        max_idle_time_ms=30_000,
+        wait_queue_timeout_ms=500,
+        compressors="zlib",
+        read_preference="secondaryPreferred",
+    )
+    options = repo._client.delegate.options
+    assert options.pool_options.max_pool_size == 7
+    assert options.pool_options.min_pool_size == 1
+    assert options.pool_options.max_idle_time_seconds == 30
+    assert options.pool_options.wait_queue_timeout == 0.5
+    assert options.read_preference.mongos_mode == "secondaryPreferred"
+    repo._client.close()
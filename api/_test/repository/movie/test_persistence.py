@@ -0,0 +1,149 @@
+"""
+This file contains the tests for the durable journal of the in-memory repository.
+"""
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from api._test.repository.fixture import make_movie
+from api.entities.movies import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.persistence import MovieJournal, decode_movie, encode_movie
+
+
+def test_encode_decode_movie():
+    """Test that the binary encoding round trips."""
+    encoded = b"xx" + encode_movie(make_movie("my-id", "Amélie", "My déscription"))
+    movie, end = decode_movie(encoded, 2)
+    assert movie == make_movie("my-id", "Amélie", "My déscription")
+    assert end == len(encoded)
+
+
+def test_encode_decode_movie_with_missing_fields():
+    """Test that fields a stored document lacks round trip as None."""
+    movie = Movie.from_document({"id": "my-id", "watched": True})
+    decoded, _ = decode_movie(encode_movie(movie))
+    assert decoded == movie
+    assert (decoded.title, decoded.description, decoded.release_year) == (
+        None,
+        None,
+        None,
+    )
+    assert decoded.watched
+
+
+@pytest.mark.asyncio
+async def test_restore_from_log(tmp_path):
+    """Test that a repository is restored from the mutation log."""
+    repo = MemoryMovieRepository(journal=MovieJournal(str(tmp_path)))
+    await repo.create(make_movie("1"))
+    await repo.create(make_movie("2"))
+    await repo.update(movie_id="2", update_parameteres={"title": "Renamed"})
+    await repo.delete("1")
+    await repo.close()
+
+    restored = MemoryMovieRepository(journal=MovieJournal(str(tmp_path)))
+    assert await restored.get_by_id("1") is None
+    assert await restored.get_by_title("Renamed") == [make_movie("2", "Renamed")]
+
+
+@pytest.mark.asyncio
+async def test_restore_from_snapshot_and_tail(tmp_path):
+    """Test that snapshots replace older files and are combined with the log tail."""
+    repo = MemoryMovieRepository(journal=MovieJournal(str(tmp_path)), snapshot_every=3)
+    for movie_id in ("1", "2", "3"):
+        await repo.create(make_movie(movie_id))
+    await repo.create(make_movie("4"))
+    await repo.delete("2")
+    await repo.close()
+    assert sorted(os.listdir(tmp_path)) == [
+        "journal-000000000001.log",
+        "snapshot-000000000001.bin",
+    ]
+
+    restored = MemoryMovieRepository(journal=MovieJournal(str(tmp_path)))
+    movies = await restored.get_by_title("My Movie")
+    assert [movie.id for movie in movies] == ["1", "3", "4"]
+    assert await restored.get_by_release_year_range(1990, 2000) == movies
+
+
+@pytest.mark.asyncio
+async def test_torn_log_tail_is_dropped(tmp_path):
+    """Test that a partially written record at the end of the log is ignored."""
+    repo = MemoryMovieRepository(journal=MovieJournal(str(tmp_path)))
+    await repo.create(make_movie("1"))
+    await repo.create(make_movie("2"))
+    await repo.close()
+    log_path = tmp_path / "journal-000000000000.log"
+    log_path.write_bytes(log_path.read_bytes()[:-3])
+
+    restored = MemoryMovieRepository(journal=MovieJournal(str(tmp_path)))
+    await restored.create(make_movie("3"))
+    await restored.close()
+
+    restored = MemoryMovieRepository(journal=MovieJournal(str(tmp_path)))
+    assert [movie.id for movie in await restored.get_by_title("My Movie")] == ["1", "3"]
+
+
+@pytest.mark.asyncio
+async def test_pending_records_are_synced_on_a_timer(tmp_path, monkeypatch):
+    """Test that a lone append is fsynced within the interval, off the loop thread."""
+    synced_on = []
+    fsync = os.fsync
+
+    def recording_fsync(fd):
+        synced_on.append(threading.get_ident())
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", recording_fsync)
+    journal = MovieJournal(str(tmp_path), fsync_batch_size=100, fsync_interval=0.01)
+    repo = MemoryMovieRepository(journal=journal)
+    await repo.create(make_movie("1"))
+    assert synced_on == []
+    await asyncio.sleep(0.1)
+    assert len(synced_on) == 1
+    assert synced_on[0] != threading.get_ident()
+    assert MovieJournal(str(tmp_path)).load() == {"1": make_movie("1")}
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_close_during_a_running_sync_fsyncs_again(tmp_path, monkeypatch):
+    """Test that close does not count records as synced before their fsync returns."""
+    loop_thread = threading.get_ident()
+    started, release = threading.Event(), threading.Event()
+    synced_on = []
+    fsync = os.fsync
+
+    def blocking_fsync(fd):
+        if threading.get_ident() != loop_thread:
+            started.set()
+            release.wait(5)
+        synced_on.append(threading.get_ident())
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", blocking_fsync)
+    journal = MovieJournal(str(tmp_path), fsync_batch_size=1)
+    journal.append_put(make_movie("1"))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+    journal.close()
+    assert synced_on == [loop_thread]
+    release.set()
+    await asyncio.sleep(0.05)
+    assert MovieJournal(str(tmp_path)).load() == {"1": make_movie("1")}
+
+
+def test_appends_outside_of_a_loop_sync_inline(tmp_path, monkeypatch):
+    """Test that every append made without an event loop is fsynced right away."""
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+    journal = MovieJournal(str(tmp_path), fsync_batch_size=100, fsync_interval=60)
+    journal.append_put(make_movie("1"))
+    journal.append_delete("1")
+    assert len(synced) == 2
+    journal.close()
+    assert len(synced) == 2
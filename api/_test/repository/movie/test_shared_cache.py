@@ -0,0 +1,150 @@
+"""
+This file contains the tests for the cache shared by the worker processes.
+"""
+
+import multiprocessing
+import struct
+
+import pytest
+
+from api._test.repository.fixture import make_movie
+from api.entities.movies import Movie
+from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.shared_cache import (
+    SharedCachingMovieRepository,
+    SharedMovieCache,
+    key_hash,
+)
+
+
+def _store_in_child(path: str):
+    cache = SharedMovieCache(path, slots=64, slot_size=256)
+    cache.store(make_movie("child"), cache.stamp("child"), ttl=60)
+    cache.close()
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """Return the path of a new cache file."""
+    return str(tmp_path / "cache")
+
+
+def test_processes_share_the_cache(cache_path):
+    """Test that a movie cached by another process is read without a lock."""
+    cache = SharedMovieCache(cache_path, slots=64, slot_size=256)
+    process = multiprocessing.get_context("spawn").Process(
+        target=_store_in_child, args=(cache_path,)
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    assert cache.get("child") == make_movie("child")
+    assert cache.get("child", now=10**12) is None
+    assert cache.get("other") is None
+    cache.close()
+
+
+def test_stamps_guard_stores(cache_path):
+    """Test that a store is dropped if the slot changed since its stamp."""
+    first = SharedMovieCache(cache_path, slots=64, slot_size=256)
+    second = SharedMovieCache(cache_path, slots=64, slot_size=256)
+    stamp = first.stamp("id")
+    second.invalidate(["id"])
+    assert not first.store(make_movie("id"), stamp, ttl=60)
+    assert first.get("id") is None
+    assert first.store(make_movie("id"), first.stamp("id"), ttl=60)
+    assert second.get("id") == make_movie("id")
+    assert not first.store(make_movie("id", "x" * 300), first.stamp("id"), ttl=60)
+    first.close()
+    second.close()
+
+
+def test_movies_with_missing_fields_are_cached(cache_path):
+    """Test that a movie built from a sparse stored document can be cached."""
+    cache = SharedMovieCache(cache_path, slots=64, slot_size=256)
+    movie = Movie.from_document({"id": "sparse", "title": "Sparse", "watched": False})
+    assert cache.store(movie, cache.stamp("sparse"), ttl=60)
+    cached = cache.get("sparse")
+    assert cached == movie
+    assert (cached.description, cached.release_year) == (None, None)
+    cache.close()
+
+
+def test_torn_slots_are_misses(cache_path):
+    """Test that a slot being written or with a corrupt payload is not read."""
+    cache = SharedMovieCache(cache_path, slots=1, slot_size=256)
+    cache.store(make_movie("id"), cache.stamp("id"), ttl=60)
+    offset = 64
+    sequence = struct.unpack_from("<Q", cache._map, offset)[0]
+    struct.pack_into("<Q", cache._map, offset, sequence + 1)
+    assert cache.get("id") is None
+    # a writer died mid-write: the next write recovers the slot
+    assert cache.store(make_movie("id"), cache.stamp("id"), ttl=60)
+    assert cache.get("id") == make_movie("id")
+    cache._map[offset + 40] ^= 0xFF
+    assert cache.get("id") is None
+    cache.close()
+
+
+def test_layout_mismatch(cache_path):
+    """Test that a file with another layout is not reused."""
+    SharedMovieCache(cache_path, slots=64, slot_size=256).close()
+    with pytest.raises(RepositoryException):
+        SharedMovieCache(cache_path, slots=32, slot_size=256)
+
+
+def test_key_hash_is_stable():
+    """Test that the slot of a movie does not depend on the process."""
+    assert key_hash("my-id") == 0x1126CD34A0807A91
+
+
+@pytest.mark.asyncio
+async def test_repository_reads_and_invalidations(cache_path):
+    """Test that reads fill the shared cache and writes invalidate it."""
+    inner = MemoryMovieRepository()
+    repo = SharedCachingMovieRepository(
+        inner, SharedMovieCache(cache_path, slots=64, slot_size=256), ttl=60
+    )
+    other_worker = SharedCachingMovieRepository(
+        inner, SharedMovieCache(cache_path, slots=64, slot_size=256), ttl=60
+    )
+    await repo.create(make_movie("id"))
+    assert await repo.get_by_id("id") == make_movie("id")
+    await inner.update("id", {"title": "Behind the cache"})
+    assert await other_worker.get_by_id("id") == make_movie("id")
+    assert await other_worker.get_many(["missing", "id"]) == [None, make_movie("id")]
+
+    await repo.update("id", {"title": "Renamed"})
+    assert await other_worker.get_by_id("id") == make_movie("id", "Renamed")
+    await other_worker.delete("id")
+    assert await repo.get_many(["id"]) == [None]
+    await repo.close()
+    await other_worker.close()
+
+
+@pytest.mark.asyncio
+async def test_versions_are_shared_with_their_movie(cache_path):
+    """Test that a versioned read of one worker is served to the others."""
+    inner = MemoryMovieRepository()
+    repo = SharedCachingMovieRepository(
+        inner, SharedMovieCache(cache_path, slots=64, slot_size=256), ttl=60
+    )
+    other_worker = SharedCachingMovieRepository(
+        inner, SharedMovieCache(cache_path, slots=64, slot_size=256), ttl=60
+    )
+    await inner.create(make_movie("id"))
+    version = await inner.get_version("id")
+    assert await repo.get_by_id("id") == make_movie("id")
+    # the slot holds no version yet, so the versioned read reaches the backend
+    assert await other_worker.get_versioned("id") == (make_movie("id"), version)
+    await inner.update("id", {"title": "Behind the cache"})
+    assert await repo.get_versioned("id") == (make_movie("id"), version)
+
+    await other_worker.update("id", {"title": "Renamed"})
+    assert await repo.get_versioned("id") == (
+        make_movie("id", "Renamed"),
+        await inner.get_version("id"),
+    )
+    await repo.close()
+    await other_worker.close()
@@ -0,0 +1,96 @@
+"""
+This file contains the tests for the single-flight movie repository.
+"""
+
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from api._test.repository.fixture import make_movie
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.single_flight import SingleFlightMovieRepository
+
+
+class SlowRepository(MemoryMovieRepository):
+    """Memory repository with slow, counted reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    async def get_by_id(self, movie_id):
+        self.reads += 1
+        await asyncio.sleep(0.01)
+        return await super().get_by_id(movie_id)
+
+    async def get_by_title(self, title, skip=0, limit=1000):
+        self.reads += 1
+        await asyncio.sleep(0.01)
+        return await super().get_by_title(title, skip=skip, limit=limit)
+
+
+def _deduplicated(operation: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "movie_tracker_single_flight_deduplicated_total", {"operation": operation}
+        )
+        or 0
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_reads_share_one_call():
+    """Test that identical reads in flight are coalesced and distinct ones are not."""
+    inner = SlowRepository()
+    await inner.create(make_movie("a"))
+    repo = SingleFlightMovieRepository(inner)
+    deduplicated = _deduplicated("get_by_id")
+
+    results = await asyncio.gather(
+        *(repo.get_by_id("a") for _ in range(10)), repo.get_by_id("b")
+    )
+    assert results == [make_movie("a")] * 10 + [None]
+    assert inner.reads == 2
+    assert _deduplicated("get_by_id") == deduplicated + 9
+
+    titles = await asyncio.gather(*(repo.get_by_title("My Movie") for _ in range(3)))
+    assert titles == [[make_movie("a")]] * 3
+    assert titles[0] is not titles[1]
+    assert inner.reads == 3
+
+    await repo.get_by_id("a")
+    assert inner.reads == 4
+
+
+@pytest.mark.asyncio
+async def test_reads_after_a_write_do_not_join_older_reads():
+    """Test that a write detaches the reads in flight."""
+    inner = SlowRepository()
+    await inner.create(make_movie("a"))
+    repo = SingleFlightMovieRepository(inner)
+
+    before = asyncio.ensure_future(repo.get_by_id("a"))
+    await asyncio.sleep(0)
+    await repo.update("a", {"title": "Renamed"})
+    after = await repo.get_by_id("a")
+
+    assert after.title == "Renamed"
+    await before
+    assert inner.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_others():
+    """Test that cancelling one waiting caller leaves the shared call running."""
+    inner = SlowRepository()
+    await inner.create(make_movie("a"))
+    repo = SingleFlightMovieRepository(inner)
+
+    first = asyncio.ensure_future(repo.get_by_id("a"))
+    second = asyncio.ensure_future(repo.get_by_id("a"))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == make_movie("a")
+    assert first.cancelled()
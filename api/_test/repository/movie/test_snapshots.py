@@ -0,0 +1,52 @@
+"""
+This file contains the tests for snapshot isolated pagination.
+"""
+
+import pytest
+
+from api._test.repository.fixture import make_movie
+from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.snapshots import ResultSnapshots
+
+
+@pytest.mark.asyncio
+async def test_pages_are_read_from_the_snapshot():
+    """Test that writes after the first page do not shift the following pages."""
+    repo = MemoryMovieRepository()
+    for movie_id in ("1", "2", "3", "4"):
+        await repo.create(make_movie(movie_id))
+
+    first = await repo.get_by_title_snapshot("My Movie", skip=0, limit=2)
+    await repo.delete("1")
+    await repo.create(make_movie("0"))
+    await repo.update("3", {"title": "Renamed"})
+    second = await repo.get_by_title_snapshot(
+        "My Movie", skip=2, limit=2, snapshot=first.snapshot
+    )
+
+    assert [movie.id for movie in first.movies] == ["1", "2"]
+    assert second.movies == [make_movie("3"), make_movie("4")]
+    assert second.snapshot == first.snapshot
+    with pytest.raises(RepositoryException):
+        await repo.get_by_title_snapshot("Renamed", snapshot=first.snapshot)
+
+
+def test_snapshots_expire(monkeypatch):
+    """Test that expired and excess snapshots are garbage collected."""
+    now = [100.0]
+    monkeypatch.setattr("api.repository.movie.snapshots.time.monotonic", lambda: now[0])
+    snapshots = ResultSnapshots(ttl=10, max_snapshots=2)
+    evicted = snapshots.take("a", [make_movie("1")])
+    now[0] += 5
+    expired = snapshots.take("b", [make_movie("2")])
+    snapshots.take("c", [make_movie("3")])
+    assert len(snapshots) == 2
+    with pytest.raises(RepositoryException):
+        snapshots.page(evicted, "a")
+    now[0] += 11
+    kept = snapshots.take("d", [make_movie("4")])
+    assert len(snapshots) == 1
+    assert snapshots.page(kept, "d") == [make_movie("4")]
+    with pytest.raises(RepositoryException):
+        snapshots.page(expired, "b")
@@ -0,0 +1,212 @@
+"""
+This file contains the tests for the SQLite movie repository.
+"""
+
+import asyncio
+
+import pytest
+
+from api._test.repository.fixture import make_movie
+from api.repository.movie import sqlite
+from api.repository.movie.abstractions import (
+    NOT_PROCESSED,
+    BulkItemResult,
+    CatalogStats,
+    RepositoryException,
+    TitleSuggestion,
+)
+from api.repository.movie.sqlite import SqliteMovieRepository
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    """Return the path of a new database file."""
+    return str(tmp_path / "movies.db")
+
+
+@pytest.mark.asyncio
+async def test_create_update_delete(database_path):
+    """Test the single movie operations and their version tags."""
+    repo = SqliteMovieRepository(database_path)
+    await repo.create(make_movie("id", watched=True))
+    assert await repo.get_by_id("id") == make_movie("id", watched=True)
+    assert (await repo.get_by_id("id")).watched is True
+    created = await repo.get_version("id")
+
+    await repo.update("id", {"title": "Renamed", "release_year": 1994})
+    assert await repo.get_by_id("id") == make_movie(
+        "id", title="Renamed", release_year=1994, watched=True
+    )
+    assert await repo.get_version("id") == created + 1
+    assert await repo.get_versioned("id") == (
+        make_movie("id", title="Renamed", release_year=1994, watched=True),
+        created + 1,
+    )
+    with pytest.raises(RepositoryException):
+        await repo.update("id", {"id": "other"})
+    with pytest.raises(RepositoryException):
+        await repo.update("missing", {"watched": True})
+
+    await repo.delete("id")
+    assert await repo.get_by_id("id") is None
+    assert await repo.get_version("id") is None
+    assert await repo.get_versioned("id") is None
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_movies_survive_reopening(database_path):
+    """Test that committed movies are read back by a new repository."""
+    repo = SqliteMovieRepository(database_path)
+    await repo.create(make_movie("id"))
+    await repo.close()
+
+    repo = SqliteMovieRepository(database_path)
+    assert await repo.get_by_id("id") == make_movie("id")
+    journal_mode = await repo._run(
+        lambda connection: connection.execute("PRAGMA journal_mode").fetchone()[0]
+    )
+    assert journal_mode == "wal"
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_transactions(database_path, monkeypatch):
+    """Test that queued writes are committed together and fail independently."""
+    repo = SqliteMovieRepository(database_path)
+    transactions = []
+    transaction = repo._transaction
+
+    def counting_transaction(connection, operations):
+        transactions.append(len(operations))
+        return transaction(connection, operations)
+
+    monkeypatch.setattr(repo, "_transaction", counting_transaction)
+    results = await asyncio.gather(
+        *(repo.create(make_movie(f"id-{index}")) for index in range(10)),
+        repo.update("missing", {"watched": True}),
+        return_exceptions=True,
+    )
+    assert results[:10] == [None] * 10
+    assert isinstance(results[10], RepositoryException)
+    assert transactions == [11]
+    assert len(await repo.get_by_title("My Movie", limit=0)) == 10
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_title_queries(database_path):
+    """Test the exact, cursor, prefix, fuzzy and autocomplete title queries."""
+    repo = SqliteMovieRepository(database_path)
+    await repo.create_many(
+        [
+            make_movie("3", title="The Godfather"),
+            make_movie("1", title="The Godfather"),
+            make_movie("2", title="the  godfather II"),
+            make_movie("4", title="Heat"),
+        ]
+    )
+    assert [m.id for m in await repo.get_by_title("The Godfather")] == ["1", "3"]
+    page = await repo.get_by_title_after("The Godfather", limit=1)
+    assert [movie.id for movie in page.movies] == ["1"]
+    page = await repo.get_by_title_after("The Godfather", page.next_cursor, limit=1)
+    assert [movie.id for movie in page.movies] == ["3"]
+    assert page.next_cursor is None
+
+    assert [m.id for m in await repo.get_by_title_prefix("THE god")] == ["1", "3", "2"]
+    assert [m.id for m in await repo.get_by_title_fuzzy("the godfahter")] == ["1", "3"]
+    assert [m.id for m in await repo.get_by_title_fuzzy("the godfather i")] == [
+        "2",
+        "1",
+        "3",
+    ]
+    assert await repo.autocomplete_titles("the god") == [
+        TitleSuggestion(title="The Godfather", count=2),
+        TitleSuggestion(title="the  godfather II", count=1),
+    ]
+
+    await repo.update("2", {"title": "Casino"})
+    assert await repo.get_by_title_fuzzy("the godfather ii") == []
+    assert [m.id for m in await repo.get_by_title_fuzzy("casimo")] == ["2"]
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_search_and_release_year_range(database_path):
+    """Test the full-text search ranking and the release year range."""
+    repo = SqliteMovieRepository(database_path)
+    await repo.create_many(
+        [
+            make_movie("1", title="Heat", description="Thieves and a detective"),
+            make_movie("2", title="Thieves", description="Thieves", release_year=1995),
+            make_movie("3", title="Alien", release_year=1979),
+        ]
+    )
+    assert [movie.id for movie in await repo.search("thieves")] == ["2", "1"]
+    assert await repo.search("!!") == []
+    await repo.update("2", {"description": "A robbery"})
+    await repo.delete("1")
+    assert [movie.id for movie in await repo.search("thieves detective")] == ["2"]
+
+    movies = await repo.get_by_release_year_range(1979, 1995, limit=0)
+    assert [movie.id for movie in movies] == ["3", "2"]
+    movies = await repo.get_by_release_year_range(1979, 1995, skip=1, limit=1)
+    assert [movie.id for movie in movies] == ["2"]
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_bulk_operations(database_path):
+    """Test the bulk writes, their per item results and the statistics."""
+    repo = SqliteMovieRepository(database_path)
+    results = await repo.create_many(
+        [
+            make_movie("1"),
+            make_movie("2", watched=True),
+            make_movie("3", release_year=2000),
+        ]
+    )
+    assert all(result.ok for result in results)
+    assert await repo.get_many(["3", "missing", "1"]) == [
+        make_movie("3", release_year=2000),
+        None,
+        make_movie("1"),
+    ]
+
+    results = await repo.update_many(
+        [("1", {"watched": True}), ("missing", {"watched": True}), ("2", {})]
+    )
+    assert results == [
+        BulkItemResult("1", True),
+        BulkItemResult("missing", False, "movie: missing not found"),
+        BulkItemResult("2", False, NOT_PROCESSED),
+    ]
+    results = await repo.update_many(
+        [("missing", {}), ("3", {"release_year": 2010})], ordered=False
+    )
+    assert [result.ok for result in results] == [False, True]
+    assert await repo.get_stats() == CatalogStats(3, 2, {1990: 2, 2010: 1})
+
+    results = await repo.delete_many(["1", "1", "missing"])
+    assert [result.ok for result in results] == [True, False, False]
+    assert await repo.get_stats() == CatalogStats(2, 1, {1990: 1, 2010: 1})
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_truncated_fuzzy_candidates_are_reported(database_path, monkeypatch):
+    """Test that a fuzzy search with too many candidates fails rather than truncates."""
+    monkeypatch.setattr(sqlite, "FUZZY_CANDIDATES", 2)
+    repo = SqliteMovieRepository(database_path)
+    await repo.create_many(
+        [make_movie(str(index), title=f"Heat {index}") for index in range(3)]
+    )
+    with pytest.raises(RepositoryException):
+        await repo.get_by_title_fuzzy("heat 1")
+    monkeypatch.setattr(sqlite, "FUZZY_CANDIDATES", 3)
+    assert [movie.id for movie in await repo.get_by_title_fuzzy("heat 1")] == [
+        "1",
+        "0",
+        "2",
+    ]
+    await repo.close()
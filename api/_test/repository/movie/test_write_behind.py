@@ -0,0 +1,92 @@
+"""
+This file contains the tests for the write-behind movie repository.
+"""
+
+import asyncio
+
+import pytest
+
+from api._test.repository.fixture import make_movie
+from api.repository.movie.abstractions import BulkItemResult, RepositoryException
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.write_behind import WriteBehindMovieRepository
+
+
+class RecordingRepository(MemoryMovieRepository):
+    """Memory repository recording its bulk creates and failing the given ids."""
+
+    def __init__(self, failing_ids=()):
+        super().__init__()
+        self.batches = []
+        self.failing_ids = set(failing_ids)
+
+    async def create_many(self, movies, ordered=True):
+        self.batches.append([movie.id for movie in movies])
+        accepted = [movie for movie in movies if movie.id not in self.failing_ids]
+        await super().create_many(accepted, ordered=ordered)
+        return [
+            (
+                BulkItemResult(movie_id=movie.id, ok=False, error="duplicate key")
+                if movie.id in self.failing_ids
+                else BulkItemResult(movie_id=movie.id, ok=True)
+            )
+            for movie in movies
+        ]
+
+
+@pytest.mark.asyncio
+async def test_creates_are_batched_by_size_and_delay():
+    """Test that concurrent creates are written in batches of at most the size."""
+    inner = RecordingRepository()
+    repo = WriteBehindMovieRepository(inner, max_batch_size=4, max_delay=0.01)
+    await asyncio.gather(*(repo.create(make_movie(f"id-{i}")) for i in range(10)))
+
+    assert [len(batch) for batch in inner.batches] == [4, 4, 2]
+    assert len(await repo.get_by_title("My Movie", limit=0)) == 10
+
+
+@pytest.mark.asyncio
+async def test_latest_create_of_a_movie_wins():
+    """Test that creates of the same movie in one batch keep the latest."""
+    inner = RecordingRepository()
+    repo = WriteBehindMovieRepository(inner, max_batch_size=10, max_delay=0.01)
+    await asyncio.gather(
+        repo.create(make_movie("id", title="First")),
+        repo.create(make_movie("id", title="Second")),
+    )
+
+    assert inner.batches == [["id"]]
+    assert (await repo.get_by_id("id")).title == "Second"
+
+
+@pytest.mark.asyncio
+async def test_failed_creates_raise():
+    """Test that only the callers of the failed movies get an error."""
+    repo = WriteBehindMovieRepository(
+        RecordingRepository(failing_ids={"bad"}), max_batch_size=2
+    )
+    results = await asyncio.gather(
+        repo.create(make_movie("good")),
+        repo.create(make_movie("bad")),
+        return_exceptions=True,
+    )
+
+    assert results[0] is None
+    assert isinstance(results[1], RepositoryException)
+    assert await repo.get_by_id("bad") is None
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_the_queue():
+    """Test that closing the repository writes the queued creates."""
+    inner = RecordingRepository()
+    repo = WriteBehindMovieRepository(inner, max_batch_size=100, max_delay=60)
+    creates = [
+        asyncio.ensure_future(repo.create(make_movie(f"id-{i}"))) for i in range(3)
+    ]
+    await asyncio.sleep(0)
+    assert inner.batches == []
+
+    await repo.close()
+    await asyncio.gather(*creates)
+    assert inner.batches == [["id-0", "id-1", "id-2"]]
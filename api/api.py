@@ -5,6 +5,7 @@ from prometheus_fastapi_instrumentator import Instrumentator
 from starlette.middleware.cors import CORSMiddleware
 
 from api.handlers import movie_v1
+from api.settings import settings_instance
 
 
 def create_app():
@@ -28,4 +29,13 @@ def create_app():
 
     # app.include_router(demo.router)
     app.include_router(movie_v1.router)
+
+    @app.on_event("startup")
+    async def initialize_repository():
+        await movie_v1.movie_repository(settings_instance()).initialize()
+
+    @app.on_event("shutdown")
+    async def close_repository():
+        await movie_v1.movie_repository(settings_instance()).close()
+
     return app
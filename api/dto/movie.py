@@ -2,6 +2,7 @@
 
 # pylint: disable=no-self-argument
 
+import enum
 import typing
 
 from pydantic import BaseModel, validator
@@ -59,3 +60,34 @@ class MovieUpdateBody(BaseModel):
     description: typing.Optional[str] = None
     release_year: typing.Optional[int] = None
     watched: typing.Optional[bool] = None
+
+
+class TitleMatch(str, enum.Enum):
+    """How the title query parameter is matched against movie titles."""
+
+    EXACT = "exact"
+    PREFIX = "prefix"
+    FUZZY = "fuzzy"
+
+
+class TitleSuggestionResponse(BaseModel):
+    """DTO for an autocomplete title suggestion."""
+
+    title: str
+    count: int
+
+
+class MovieBatchResponse(BaseModel):
+    """DTO for the movies fetched by id in one request."""
+
+    movies: typing.List[MovieResponse]
+    missing: typing.List[str]
+
+
+class CatalogStatsResponse(BaseModel):
+    """DTO for the statistics of the movie catalog."""
+
+    total: int
+    watched: int
+    unwatched: int
+    by_release_year: typing.Dict[int, int]
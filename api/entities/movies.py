@@ -1,5 +1,7 @@
 """This module contains the movie class"""
 
+import typing
+
 
 class Movie:
     """
@@ -10,8 +12,13 @@ class Movie:
         description (str): Optional description of the movie.
         release_year (int): Year the movie was released.
         watched (bool): Indicates whether the movie has been watched (True) or not (False).
+
+    The class uses __slots__ so instances carry no per-instance __dict__, which keeps
+    the many short lived movies built by repository reads small and cheap to allocate.
     """
 
+    __slots__ = ("_id", "_title", "_description", "_release_year", "_watched")
+
     def __init__(
         self,
         *,
@@ -29,6 +36,29 @@ class Movie:
         self._release_year = release_year
         self._watched = watched
 
+    @classmethod
+    def from_document(cls, document: typing.Mapping) -> "Movie":
+        """Builds a movie from a stored document with id, title, description,
+        release_year and watched keys."""
+        movie_id = document.get("id")
+        if movie_id is None:
+            raise ValueError("Movie id is required")
+        movie = object.__new__(cls)
+        movie._id = movie_id
+        movie._title = document.get("title")
+        movie._description = document.get("description")
+        movie._release_year = document.get("release_year")
+        movie._watched = document.get("watched")
+        return movie
+
+    @classmethod
+    def from_documents(
+        cls, documents: typing.Iterable[typing.Mapping]
+    ) -> typing.List["Movie"]:
+        """Builds a list of movies from stored documents, see from_document."""
+        from_document = cls.from_document
+        return [from_document(document) for document in documents]
+
     @property
     def id(self) -> str:
         """Getter for the movie id"""
@@ -55,12 +85,17 @@ class Movie:
         return self._watched
 
     def __eq__(self, o: object) -> bool:
+        if o is self:
+            return True
         if not isinstance(o, Movie):
             return False
         return (
-            self.id == o.id
-            and self.title == o.title
-            and self.description == o.description
-            and self.release_year == o.release_year
-            and self.watched == o.watched
+            self._id == o._id
+            and self._title == o._title
+            and self._description == o._description
+            and self._release_year == o._release_year
+            and self._watched == o._watched
         )
+
+    def __repr__(self) -> str:
+        return f"Movie(movie_id={self._id!r}, title={self._title!r})"
@@ -2,33 +2,54 @@
 This file contains the FastAPI router for the movie API. version 1.
 """
 
-from http.client import HTTPException
+import hashlib
 import typing
 import uuid
 from collections import namedtuple
 from functools import lru_cache
+from http.client import HTTPException
 
-from fastapi import APIRouter, Body, Depends, Path, Query
+from fastapi import APIRouter, Body, Depends, Header, Path, Query
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from starlette.responses import Response
 from starlette import status
+from starlette.responses import Response
 
 from api.dto.detail import DetailResponse
 from api.dto.movie import (
+    CatalogStatsResponse,
     CreateMovieBody,
+    MovieBatchResponse,
     MovieCreatedResponse,
     MovieResponse,
     MovieUpdateBody,
+    TitleMatch,
+    TitleSuggestionResponse,
 )
 from api.entities.movies import Movie
 from api.repository.movie.abstractions import MovieRepository, RepositoryException
+from api.repository.movie.batching import BatchingMovieRepository
+from api.repository.movie.caching import CachingMovieRepository
 from api.repository.movie.mongo import MongoMovieRepository
+from api.repository.movie.shared_cache import (
+    SharedCachingMovieRepository,
+    SharedMovieCache,
+    default_cache_path,
+)
+from api.repository.movie.single_flight import SingleFlightMovieRepository
+from api.repository.movie.sqlite import SqliteMovieRepository
+from api.repository.movie.write_behind import WriteBehindMovieRepository
 from api.settings import Settings, settings_instance
 
 http_basic = HTTPBasic()
 
+# Maximum number of movies fetched by one batch request.
+MAX_BATCH_IDS = 100
+
+# Media type of the streamed list responses, one JSON movie per line.
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 def basic_authentication(credentials: HTTPBasicCredentials = Depends(http_basic)):
     """Basic auth for the API. Only allows access to API if the credentials are correct."""
@@ -52,10 +73,54 @@ def movie_repository(settings: Settings = Depends(settings_instance)):
     LRU cache is used to store the repository instance to avoid creating a new instance every
     time it is requested.
     """
-    return MongoMovieRepository(
-        connection_string=settings.mongo_connection_string,
-        database=settings.mongo_database_name,
-    )
+    if settings.repository_backend == "sqlite":
+        repo = SqliteMovieRepository(
+            path=settings.sqlite_path,
+            max_batch_size=settings.sqlite_max_batch_size,
+            synchronous=settings.sqlite_synchronous,
+        )
+    else:
+        repo = MongoMovieRepository(
+            connection_string=settings.mongo_connection_string,
+            database=settings.mongo_database_name,
+            max_pool_size=settings.mongo_max_pool_size,
+            min_pool_size=settings.mongo_min_pool_size,
+            max_idle_time_ms=settings.mongo_max_idle_time_ms,
+            wait_queue_timeout_ms=settings.mongo_wait_queue_timeout_ms,
+            compressors=settings.mongo_compressors,
+            read_preference=settings.mongo_read_preference,
+        )
+    if settings.shared_cache_enabled:
+        repo = SharedCachingMovieRepository(
+            repo,
+            cache=SharedMovieCache(
+                settings.shared_cache_path or default_cache_path(),
+                slots=settings.shared_cache_slots,
+                slot_size=settings.shared_cache_slot_size,
+            ),
+            ttl=settings.shared_cache_ttl_seconds,
+        )
+    if settings.write_behind_enabled:
+        repo = WriteBehindMovieRepository(
+            repo,
+            max_batch_size=settings.write_behind_max_batch_size,
+            max_delay=settings.write_behind_max_delay_ms / 1000,
+        )
+    if settings.batching_enabled:
+        repo = BatchingMovieRepository(
+            repo,
+            max_batch_size=settings.batching_max_batch_size,
+            max_delay=settings.batching_max_delay_ms / 1000,
+        )
+    if settings.single_flight_enabled:
+        repo = SingleFlightMovieRepository(repo)
+    if settings.cache_enabled:
+        repo = CachingMovieRepository(
+            repo,
+            max_entries=settings.cache_max_entries,
+            ttl=settings.cache_ttl_seconds,
+        )
+    return repo
 
 
 def pagination_params(
@@ -72,6 +137,31 @@ def pagination_params(
     return Pagination(skip=skip, limit=limit)
 
 
+def wants_ndjson(accept: typing.Optional[str] = Header(None)) -> bool:
+    """Returns whether the client asked for a streamed NDJSON list response."""
+    return accept is not None and NDJSON_MEDIA_TYPE in accept
+
+
+async def _ndjson_lines(movies: typing.AsyncIterator[Movie]):
+    """Serializes movies to NDJSON lines as the repository yields them."""
+    async for movie in movies:
+        yield MovieResponse(
+            id=movie.id,
+            title=movie.title,
+            description=movie.description,
+            release_year=movie.release_year,
+            watched=movie.watched,
+        ).json() + "\n"
+
+
+def _etag_matches(etag: str, if_none_match: typing.Optional[str]) -> bool:
+    """Returns whether an If-None-Match header matches the ETag, weakly compared."""
+    if if_none_match is None:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
 @router.post("/", status_code=201, response_model=MovieCreatedResponse)
 async def post_create_movie(
     movie: CreateMovieBody = Body(..., title="movie", description="Movie details"),
@@ -94,23 +184,189 @@ async def post_create_movie(
     return MovieCreatedResponse(id=movie_id)
 
 
+@router.get("/autocomplete", response_model=typing.List[TitleSuggestionResponse])
+async def get_title_suggestions(
+    prefix: str = Query(
+        ..., title="Prefix", description="Partially typed movie title", min_length=3
+    ),
+    limit: int = Query(
+        10, title="Limit", description="The maximum number of suggestions", ge=1, le=50
+    ),
+    repo: MovieRepository = Depends(movie_repository),
+):
+    """Returns ranked title suggestions for a partially typed title."""
+    suggestions = await repo.autocomplete_titles(prefix, limit=limit)
+    return [
+        TitleSuggestionResponse(title=suggestion.title, count=suggestion.count)
+        for suggestion in suggestions
+    ]
+
+
+@router.get("/stats", response_model=CatalogStatsResponse)
+async def get_catalog_stats(repo: MovieRepository = Depends(movie_repository)):
+    """Returns the number of movies, of watched movies and of movies per release year."""
+    stats = await repo.get_stats()
+    return CatalogStatsResponse(
+        total=stats.total,
+        watched=stats.watched,
+        unwatched=stats.total - stats.watched,
+        by_release_year=stats.by_release_year,
+    )
+
+
+@router.get("/search", response_model=typing.List[MovieResponse])
+async def search_movies(
+    q: str = Query(
+        ...,
+        title="Query",
+        description="Words to search for in the titles and descriptions",
+        min_length=1,
+    ),
+    pagination: namedtuple = Depends(pagination_params),
+    repo: MovieRepository = Depends(movie_repository),
+):
+    """Returns the movies matching the words of the query, best matches first."""
+    movies = await repo.search(q, skip=pagination.skip, limit=pagination.limit)
+    return [
+        MovieResponse(
+            id=movie.id,
+            title=movie.title,
+            description=movie.description,
+            release_year=movie.release_year,
+            watched=movie.watched,
+        )
+        for movie in movies
+    ]
+
+
+@router.get(
+    "/by-release-year",
+    responses={
+        200: {"model": typing.List[MovieResponse]},
+        400: {"model": DetailResponse},
+    },
+)
+async def get_movies_by_release_year(
+    start: int = Query(
+        ..., title="Start", description="First release year of the range (inclusive)"
+    ),
+    end: int = Query(
+        ..., title="End", description="Last release year of the range (inclusive)"
+    ),
+    pagination: namedtuple = Depends(pagination_params),
+    stream: bool = Depends(wants_ndjson),
+    repo: MovieRepository = Depends(movie_repository),
+):
+    """Returns the movies released between start and end ordered by release year.
+    The movies are streamed as NDJSON if the client accepts application/x-ndjson."""
+    if start > end:
+        return JSONResponse(
+            status_code=400,
+            content=jsonable_encoder(
+                DetailResponse(message="start must not be greater than end")
+            ),
+        )
+    if stream:
+        return StreamingResponse(
+            _ndjson_lines(
+                repo.iter_by_release_year_range(
+                    start, end, skip=pagination.skip, limit=pagination.limit
+                )
+            ),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+    movies = await repo.get_by_release_year_range(
+        start, end, skip=pagination.skip, limit=pagination.limit
+    )
+    return [
+        MovieResponse(
+            id=movie.id,
+            title=movie.title,
+            description=movie.description,
+            release_year=movie.release_year,
+            watched=movie.watched,
+        )
+        for movie in movies
+    ]
+
+
+@router.get(
+    "/batch",
+    responses={200: {"model": MovieBatchResponse}, 400: {"model": DetailResponse}},
+)
+async def get_movies_by_ids(
+    ids: typing.List[str] = Query(
+        ...,
+        title="IDs",
+        description=f"IDs of the movies, repeated or comma separated, at most "
+        f"{MAX_BATCH_IDS}",
+    ),
+    repo: MovieRepository = Depends(movie_repository),
+):
+    """Returns the movies found for the ids provided and the ids which were not found."""
+    movie_ids = list(
+        dict.fromkeys(
+            movie_id for value in ids for movie_id in value.split(",") if movie_id
+        )
+    )
+    if len(movie_ids) > MAX_BATCH_IDS:
+        return JSONResponse(
+            status_code=400,
+            content=jsonable_encoder(
+                DetailResponse(message=f"at most {MAX_BATCH_IDS} ids can be requested")
+            ),
+        )
+    movies = await repo.get_many(movie_ids)
+    return MovieBatchResponse(
+        movies=[
+            MovieResponse(
+                id=movie.id,
+                title=movie.title,
+                description=movie.description,
+                release_year=movie.release_year,
+                watched=movie.watched,
+            )
+            for movie in movies
+            if movie is not None
+        ],
+        missing=[
+            movie_id for movie_id, movie in zip(movie_ids, movies) if movie is None
+        ],
+    )
+
+
 @router.get(
     "/{movie_id}",
     responses={200: {"model": MovieResponse}, 404: {"model": DetailResponse}},
 )
 async def get_movie_by_id(
     movie_id: str,
+    response: Response,
+    if_none_match: typing.Optional[str] = Header(None),
     repo: MovieRepository = Depends(movie_repository),
 ):
-    """Returns a movie if found, otherwise returns a 404 response."""
-    movie = await repo.get_by_id(movie_id=movie_id)
-    if movie is None:
+    """Returns a movie if found, otherwise returns a 404 response.
+    The response carries the version of the movie as ETag, and is a bodiless 304 if
+    it matches If-None-Match."""
+    if if_none_match is not None:
+        # a cold conditional read checks the version alone before loading the movie
+        version = await repo.get_version(movie_id=movie_id)
+        if version is not None and _etag_matches(f'"{version}"', if_none_match):
+            return Response(status_code=304, headers={"ETag": f'"{version}"'})
+    # the movie and its version are read together, from the caches when warm
+    versioned = await repo.get_versioned(movie_id=movie_id)
+    if versioned is None:
         return JSONResponse(
             status_code=404,
             content=jsonable_encoder(
                 DetailResponse(message=f"Movie with ID {movie_id} not found")
             ),
         )
+    etag = f'"{versioned.version}"'
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    movie = versioned.movie
     return MovieResponse(
         id=movie.id,
         title=movie.title,
@@ -120,19 +376,129 @@ async def get_movie_by_id(
     )
 
 
-@router.get("/", response_model=typing.List[MovieResponse])
+@router.get(
+    "/",
+    response_model=typing.List[MovieResponse],
+    responses={400: {"model": DetailResponse}},
+)
 async def get_movies_by_title(
     title: str = Query(
         ..., title="Title", description="Title of the movie to search for", min_length=3
     ),
+    match: TitleMatch = Query(
+        TitleMatch.EXACT,
+        title="Match",
+        description="exact matches the whole title, prefix matches the beginning of "
+        "the title ignoring case, fuzzy matches titles with a few typos, closest first",
+    ),
+    consistent: bool = Query(
+        False,
+        title="Consistent",
+        description="Take a snapshot of the matches and return its token in the "
+        "X-Snapshot-Token header, to page through them without seeing concurrent "
+        "changes",
+    ),
+    snapshot: typing.Optional[str] = Query(
+        None,
+        title="Snapshot",
+        description="Snapshot token returned by a previous consistent request",
+    ),
+    cursor: typing.Optional[str] = Query(
+        None,
+        title="Cursor",
+        description="Cursor returned in the X-Next-Cursor header of the previous "
+        "page, replaces skip",
+    ),
     pagination: namedtuple = Depends(pagination_params),
+    stream: bool = Depends(wants_ndjson),
+    if_none_match: typing.Optional[str] = Header(None),
     repo: MovieRepository = Depends(movie_repository),
 ):
     """Returns a list of movies that match the title provided.
-    If no movies are found, an empty list is returned."""
-    movies = await repo.get_by_title(
-        title, skip=pagination.skip, limit=pagination.limit
-    )
+    If no movies are found, an empty list is returned.
+    The movies are streamed as NDJSON if the client accepts application/x-ndjson.
+    Otherwise the ETag is a hash of the body and a matching If-None-Match gets a 304."""
+    headers = {}
+    if match != TitleMatch.EXACT and (
+        consistent or snapshot is not None or cursor is not None
+    ):
+        return JSONResponse(
+            status_code=400,
+            content=jsonable_encoder(
+                DetailResponse(
+                    message="snapshots and cursors require an exact title match"
+                )
+            ),
+        )
+    if match == TitleMatch.FUZZY:
+        try:
+            movies = await repo.get_by_title_fuzzy(
+                title, skip=pagination.skip, limit=pagination.limit
+            )
+        except RepositoryException as e:
+            return JSONResponse(
+                status_code=400,
+                content=jsonable_encoder(DetailResponse(message=str(e))),
+            )
+    elif match == TitleMatch.PREFIX:
+        if stream:
+            return StreamingResponse(
+                _ndjson_lines(
+                    repo.iter_by_title_prefix(
+                        title, skip=pagination.skip, limit=pagination.limit
+                    )
+                ),
+                media_type=NDJSON_MEDIA_TYPE,
+            )
+        movies = await repo.get_by_title_prefix(
+            title, skip=pagination.skip, limit=pagination.limit
+        )
+    elif stream:
+        if consistent or snapshot is not None or cursor is not None:
+            return JSONResponse(
+                status_code=400,
+                content=jsonable_encoder(
+                    DetailResponse(
+                        message="streamed responses do not support snapshots or cursors"
+                    )
+                ),
+            )
+        return StreamingResponse(
+            _ndjson_lines(
+                repo.iter_by_title(title, skip=pagination.skip, limit=pagination.limit)
+            ),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+    elif consistent or snapshot is not None:
+        try:
+            page = await repo.get_by_title_snapshot(
+                title, skip=pagination.skip, limit=pagination.limit, snapshot=snapshot
+            )
+        except RepositoryException as e:
+            return JSONResponse(
+                status_code=400,
+                content=jsonable_encoder(DetailResponse(message=str(e))),
+            )
+        headers["X-Snapshot-Token"] = page.snapshot
+        movies = page.movies
+    elif cursor is not None or pagination.skip == 0:
+        # keyset pagination: the first page and the pages after a cursor
+        try:
+            page = await repo.get_by_title_after(
+                title, cursor=cursor, limit=pagination.limit
+            )
+        except RepositoryException as e:
+            return JSONResponse(
+                status_code=400,
+                content=jsonable_encoder(DetailResponse(message=str(e))),
+            )
+        if page.next_cursor is not None:
+            headers["X-Next-Cursor"] = page.next_cursor
+        movies = page.movies
+    else:
+        movies = await repo.get_by_title(
+            title, skip=pagination.skip, limit=pagination.limit
+        )
     movies_return_value = []
     for movie in movies:
         movies_return_value.append(
@@ -144,7 +510,14 @@ async def get_movies_by_title(
                 watched=movie.watched,
             )
         )
-    return movies_return_value
+    response = JSONResponse(
+        content=jsonable_encoder(movies_return_value), headers=headers
+    )
+    etag = f'"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+    if _etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.patch(
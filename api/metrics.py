@@ -0,0 +1,65 @@
+"""Prometheus metrics of the API, exposed with the HTTP metrics by the instrumentator."""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+MONGO_INDEX_OK = Gauge(
+    "movie_tracker_mongo_index_ok",
+    "1 if an expected MongoDB index exists with the expected definition, "
+    "0 if it is missing or mismatched",
+    ["collection", "index"],
+)
+
+MONGO_POOL_MAX_SIZE = Gauge(
+    "movie_tracker_mongo_pool_max_size",
+    "Maximum number of connections of a MongoDB connection pool",
+    ["address"],
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "movie_tracker_mongo_pool_connections",
+    "Open connections of a MongoDB connection pool",
+    ["address"],
+)
+MONGO_POOL_IN_USE = Gauge(
+    "movie_tracker_mongo_pool_in_use",
+    "Connections of a MongoDB connection pool checked out by an operation",
+    ["address"],
+)
+MONGO_POOL_CHECKOUTS = Counter(
+    "movie_tracker_mongo_pool_checkouts",
+    "Connection checkouts from a MongoDB connection pool, by outcome",
+    ["address", "outcome"],
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "movie_tracker_mongo_pool_checkout_wait_seconds",
+    "Time an operation waited to check a connection out of a MongoDB connection pool",
+    ["address"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+
+CACHE_HITS = Counter(
+    "movie_tracker_cache_hits",
+    "Lookups answered by a repository cache",
+    ["cache"],
+)
+CACHE_MISSES = Counter(
+    "movie_tracker_cache_misses",
+    "Lookups a repository cache could not answer",
+    ["cache"],
+)
+CACHE_EVICTIONS = Counter(
+    "movie_tracker_cache_evictions",
+    "Entries dropped from a repository cache, because it was full or they expired",
+    ["cache", "reason"],
+)
+
+SINGLE_FLIGHT_DEDUPLICATED = Counter(
+    "movie_tracker_single_flight_deduplicated",
+    "Repository reads answered by joining an identical read already in flight",
+    ["operation"],
+)
+
+LOADER_BATCH_SIZE = Histogram(
+    "movie_tracker_loader_batch_size",
+    "Distinct movie ids loaded by one batched lookup",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
@@ -10,6 +10,54 @@ class RepositoryException(Exception):
     """Base class for repository exceptions."""
 
 
+class TitleSuggestion(typing.NamedTuple):
+    """An autocomplete suggestion: a title and the number of movies sharing it."""
+
+    title: str
+    count: int
+
+
+class TitlePage(typing.NamedTuple):
+    """A page of movies read from a snapshot, with the token of that snapshot."""
+
+    movies: typing.List[Movie]
+    snapshot: str
+
+
+class VersionedMovie(typing.NamedTuple):
+    """A movie and its version tag, read together."""
+
+    movie: Movie
+    version: int
+
+
+class CursorPage(typing.NamedTuple):
+    """A page of movies and the cursor of the next page, None on the last page."""
+
+    movies: typing.List[Movie]
+    next_cursor: typing.Optional[str]
+
+
+class BulkItemResult(typing.NamedTuple):
+    """The outcome of one item of a bulk write, error explains why it failed."""
+
+    movie_id: str
+    ok: bool
+    error: typing.Optional[str] = None
+
+
+class CatalogStats(typing.NamedTuple):
+    """Counts of the whole catalog: movies, watched movies and movies per release year."""
+
+    total: int
+    watched: int
+    by_release_year: typing.Dict[int, int]
+
+
+# Error reported for the items an ordered bulk write skipped after a failure.
+NOT_PROCESSED = "not processed, a previous item failed"
+
+
 class MovieRepository(abc.ABC):
     """
     Abstract base class that defines a common interface for movie repositories.
@@ -33,6 +81,27 @@ class MovieRepository(abc.ABC):
         """
         raise NotImplementedError
 
+    async def get_version(self, movie_id: str) -> typing.Optional[int]:
+        """
+        Returns the version tag of a movie, changed by every create and update of
+        it, or None if the movie is not found. Reading it does not load the movie.
+        """
+        raise NotImplementedError
+
+    async def get_versioned(self, movie_id: str) -> typing.Optional[VersionedMovie]:
+        """
+        Returns the movie with its version tag, or None if the movie is not found.
+        The version is never newer than the movie. By default the version is read
+        first and the movie second; repositories reading both at once override it.
+        """
+        version = await self.get_version(movie_id)
+        if version is None:
+            return None
+        movie = await self.get_by_id(movie_id)
+        if movie is None:
+            return None
+        return VersionedMovie(movie=movie, version=version)
+
     async def get_by_title(
         self, title: str, skip: int = 0, limit: int = 1000
     ) -> typing.List[Movie]:
@@ -41,6 +110,108 @@ class MovieRepository(abc.ABC):
         """
         raise NotImplementedError
 
+    async def get_by_title_after(
+        self, title: str, cursor: typing.Optional[str] = None, limit: int = 1000
+    ) -> CursorPage:
+        """
+        Returns the page of the movies sharing the title that follows the cursor,
+        or the first page without a cursor, ordered like get_by_title. The cost of
+        a page does not depend on how deep it is.
+        Raises RepositoryException if the cursor is invalid.
+        """
+        raise NotImplementedError
+
+    async def get_by_title_snapshot(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        snapshot: typing.Optional[str] = None,
+    ) -> TitlePage:
+        """
+        Returns a page of the movies sharing the title, read from a frozen snapshot of
+        the matches. Without a snapshot token a new snapshot is taken; passing the
+        returned token reads the next pages from that same snapshot.
+        Raises RepositoryException if the snapshot expired.
+        """
+        raise NotImplementedError
+
+    async def get_by_title_prefix(
+        self, prefix: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        """
+        Returns the movies whose title starts with the prefix, ignoring case and
+        redundant whitespace, ordered by normalized title.
+        """
+        raise NotImplementedError
+
+    async def get_by_title_fuzzy(
+        self, title: str, max_distance: int = 2, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        """
+        Returns the movies whose normalized title is within max_distance edits of
+        the normalized title, closest first, then ordered by normalized title. Short
+        titles tolerate fewer edits. Raises RepositoryException if the title shares
+        trigrams with more candidate titles than the repository verifies.
+        """
+        raise NotImplementedError
+
+    async def autocomplete_titles(
+        self, prefix: str, limit: int = 10
+    ) -> typing.List[TitleSuggestion]:
+        """
+        Returns ranked title suggestions for a partially typed title.
+        """
+        raise NotImplementedError
+
+    async def get_by_release_year_range(
+        self, start: int, end: int, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        """
+        Returns the movies released between start and end, both inclusive, ordered by
+        release year.
+        """
+        raise NotImplementedError
+
+    async def search(
+        self, query: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        """
+        Returns the movies whose title or description contain words of the query,
+        best matches first.
+        """
+        raise NotImplementedError
+
+    async def iter_by_title(
+        self, title: str, skip: int = 0, limit: int = 1000
+    ) -> typing.AsyncIterator[Movie]:
+        """
+        Yields the movies of get_by_title one at a time. Backends which can stream
+        from their store override it, this default reads the whole page first.
+        """
+        for movie in await self.get_by_title(title, skip=skip, limit=limit):
+            yield movie
+
+    async def iter_by_title_prefix(
+        self, prefix: str, skip: int = 0, limit: int = 1000
+    ) -> typing.AsyncIterator[Movie]:
+        """
+        Yields the movies of get_by_title_prefix one at a time.
+        """
+        for movie in await self.get_by_title_prefix(prefix, skip=skip, limit=limit):
+            yield movie
+
+    async def iter_by_release_year_range(
+        self, start: int, end: int, skip: int = 0, limit: int = 1000
+    ) -> typing.AsyncIterator[Movie]:
+        """
+        Yields the movies of get_by_release_year_range one at a time.
+        """
+        for movie in await self.get_by_release_year_range(
+            start, end, skip=skip, limit=limit
+        ):
+            yield movie
+
     async def delete(self, movie_id: str):
         """
         Deletes a movie by its id.
@@ -53,3 +224,64 @@ class MovieRepository(abc.ABC):
         Updates a movie.
         """
         raise NotImplementedError
+
+    async def create_many(
+        self, movies: typing.List[Movie], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        """
+        Inserts or replaces the movies, returns one result per movie. An ordered
+        write stops at the first failure, an unordered one attempts every movie.
+        """
+        raise NotImplementedError
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        """
+        Returns the movie of every id, or None for the ids which are not found.
+        """
+        raise NotImplementedError
+
+    async def get_many_versioned(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[VersionedMovie]]:
+        """
+        Returns the movie of every id with its version tag, see get_versioned, or
+        None for the ids which are not found.
+        """
+        return [await self.get_versioned(movie_id) for movie_id in movie_ids]
+
+    async def update_many(
+        self, updates: typing.List[typing.Tuple[str, dict]], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        """
+        Applies (movie id, update parameters) pairs, returns one result per pair. An
+        ordered write stops at the first failure, an unordered one attempts every pair.
+        """
+        raise NotImplementedError
+
+    async def delete_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[BulkItemResult]:
+        """
+        Deletes the movies, returns one result per id, failed for unknown ids.
+        """
+        raise NotImplementedError
+
+    async def get_stats(self) -> CatalogStats:
+        """
+        Returns the counts of the catalog. They are maintained by every write, so
+        reading them does not scan the movies.
+        """
+        raise NotImplementedError
+
+    async def initialize(self):
+        """
+        Prepares the backing store, for example by provisioning indexes.
+        Called once when the application starts.
+        """
+
+    async def close(self):
+        """
+        Releases the resources held by the repository.
+        """
@@ -0,0 +1,97 @@
+"""
+This module contains a repository batching the reads by id of one event loop tick into one lookup.
+"""
+
+import asyncio
+import typing
+
+from api.entities.movies import Movie
+from api.metrics import LOADER_BATCH_SIZE
+from api.repository.movie.abstractions import MovieRepository, VersionedMovie
+from api.repository.movie.delegating import DelegatingMovieRepository
+
+
+class BatchingMovieRepository(DelegatingMovieRepository):
+    """
+    Collects the get_by_id and get_versioned calls made until the end of the current
+    event loop tick, or for max_delay seconds if it is positive, and answers them
+    with one get_many, respectively get_many_versioned, of the wrapped repository, a
+    single {"id": {"$in": [...]}} query on MongoDB. A batch is dispatched early once
+    it holds max_batch_size distinct ids.
+    """
+
+    def __init__(
+        self,
+        inner: MovieRepository,
+        max_batch_size: int = 100,
+        max_delay: float = 0.0,
+    ):
+        super().__init__(inner)
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        # movie id -> futures of the callers waiting for it, per bulk read
+        self._pending: typing.Dict[
+            typing.Callable, typing.Dict[str, typing.List[asyncio.Future]]
+        ] = {}
+        self._dispatch_handle: typing.Optional[asyncio.Handle] = None
+        self._loads: typing.Set[asyncio.Task] = set()
+
+    async def _enqueue(self, read: typing.Callable, movie_id: str):
+        """Waits for the result of the movie id in the next batch of the bulk read."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(read, {})
+        pending.setdefault(movie_id, []).append(future)
+        if len(pending) >= self._max_batch_size:
+            self._dispatch()
+        elif self._dispatch_handle is None:
+            if self._max_delay > 0:
+                self._dispatch_handle = loop.call_later(self._max_delay, self._dispatch)
+            else:
+                self._dispatch_handle = loop.call_soon(self._dispatch)
+        return await future
+
+    async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
+        return await self._enqueue(self._inner.get_many, movie_id)
+
+    async def get_versioned(self, movie_id: str) -> typing.Optional[VersionedMovie]:
+        return await self._enqueue(self._inner.get_many_versioned, movie_id)
+
+    def _dispatch(self):
+        """Starts loading the collected ids as one batch per bulk read."""
+        if self._dispatch_handle is not None:
+            self._dispatch_handle.cancel()
+            self._dispatch_handle = None
+        pending, self._pending = self._pending, {}
+        for read, batch in pending.items():
+            if not batch:
+                continue
+            load = asyncio.ensure_future(self._load(read, batch))
+            self._loads.add(load)
+            load.add_done_callback(self._loads.discard)
+
+    async def _load(
+        self,
+        read: typing.Callable,
+        batch: typing.Dict[str, typing.List[asyncio.Future]],
+    ):
+        movie_ids = list(batch)
+        LOADER_BATCH_SIZE.observe(len(movie_ids))
+        try:
+            results = await read(movie_ids)
+        except Exception as e:  # pylint: disable=broad-except
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for movie_id, result in zip(movie_ids, results):
+            for future in batch[movie_id]:
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        self._dispatch()
+        if self._loads:
+            await asyncio.gather(*self._loads, return_exceptions=True)
+        await super().close()
@@ -0,0 +1,191 @@
+"""
+This module contains a repository caching the movies read by id in front of another one.
+"""
+
+import collections
+import time
+import typing
+
+from api.entities.movies import Movie
+from api.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+from api.repository.movie.abstractions import (
+    BulkItemResult,
+    MovieRepository,
+    VersionedMovie,
+)
+from api.repository.movie.delegating import DelegatingMovieRepository
+
+
+class CachingMovieRepository(DelegatingMovieRepository):
+    """
+    Serves get_by_id, get_versioned, get_version and the bulk reads from a bounded
+    LRU cache whose entries expire after ttl seconds. An entry holds the version of
+    its movie when it was read with a versioned read, so a warm entry answers
+    conditional reads too; a version missing from the cache is read alone, without
+    loading the movie;
+    the movie and its version are always stored and invalidated together. Writes
+    made through the repository fill or invalidate the entries of their movies;
+    writes made by other processes are seen once the entries expire.
+
+    A read which misses only caches its result if no write went through the
+    repository while it was reading, so a slow read never caches a movie older than
+    a write that already returned.
+    """
+
+    def __init__(
+        self,
+        inner: MovieRepository,
+        max_entries: int = 10_000,
+        ttl: float = 60.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(inner)
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        # movie id -> (expiry, movie, version or None if not read), least recently
+        # used first
+        self._entries: typing.OrderedDict[
+            str, typing.Tuple[float, Movie, typing.Optional[int]]
+        ] = collections.OrderedDict()
+        self._generation = 0
+
+    def _lookup(
+        self, movie_id: str, versioned: bool = False
+    ) -> typing.Optional[typing.Tuple[Movie, typing.Optional[int]]]:
+        """Returns the cached (movie, version), a miss if versioned and no version is cached."""
+        entry = self._entries.get(movie_id)
+        if entry is None:
+            CACHE_MISSES.labels(cache="movie").inc()
+            return None
+        expiry, movie, version = entry
+        if expiry <= self._clock():
+            del self._entries[movie_id]
+            CACHE_EVICTIONS.labels(cache="movie", reason="expired").inc()
+            CACHE_MISSES.labels(cache="movie").inc()
+            return None
+        if versioned and version is None:
+            CACHE_MISSES.labels(cache="movie").inc()
+            return None
+        self._entries.move_to_end(movie_id)
+        CACHE_HITS.labels(cache="movie").inc()
+        return movie, version
+
+    def _store(self, movie: Movie, version: typing.Optional[int] = None):
+        self._entries[movie.id] = (self._clock() + self._ttl, movie, version)
+        self._entries.move_to_end(movie.id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.labels(cache="movie", reason="size").inc()
+
+    def _invalidate(self, movie_ids: typing.Iterable[str]):
+        self._generation += 1
+        for movie_id in movie_ids:
+            self._entries.pop(movie_id, None)
+
+    async def create(self, movie: Movie) -> bool:
+        try:
+            result = await self._inner.create(movie)
+        finally:
+            self._invalidate([movie.id])
+        self._store(movie)
+        return result
+
+    async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
+        entry = self._lookup(movie_id)
+        if entry is not None:
+            return entry[0]
+        generation = self._generation
+        movie = await self._inner.get_by_id(movie_id)
+        if movie is not None and generation == self._generation:
+            self._store(movie)
+        return movie
+
+    async def get_versioned(self, movie_id: str) -> typing.Optional[VersionedMovie]:
+        entry = self._lookup(movie_id, versioned=True)
+        if entry is not None:
+            return VersionedMovie(*entry)
+        generation = self._generation
+        versioned = await self._inner.get_versioned(movie_id)
+        if versioned is not None and generation == self._generation:
+            self._store(versioned.movie, versioned.version)
+        return versioned
+
+    async def get_version(self, movie_id: str) -> typing.Optional[int]:
+        entry = self._lookup(movie_id, versioned=True)
+        if entry is not None:
+            return entry[1]
+        return await self._inner.get_version(movie_id)
+
+    async def get_many_versioned(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[VersionedMovie]]:
+        cached = {}
+        for movie_id in movie_ids:
+            entry = self._lookup(movie_id, versioned=True)
+            if entry is not None:
+                cached[movie_id] = VersionedMovie(*entry)
+        missing = [movie_id for movie_id in movie_ids if movie_id not in cached]
+        if missing:
+            generation = self._generation
+            for versioned in await self._inner.get_many_versioned(missing):
+                if versioned is not None:
+                    cached[versioned.movie.id] = versioned
+                    if generation == self._generation:
+                        self._store(versioned.movie, versioned.version)
+        return [cached.get(movie_id) for movie_id in movie_ids]
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        cached = {}
+        for movie_id in movie_ids:
+            entry = self._lookup(movie_id)
+            if entry is not None:
+                cached[movie_id] = entry[0]
+        missing = [movie_id for movie_id in movie_ids if movie_id not in cached]
+        if missing:
+            generation = self._generation
+            movies = await self._inner.get_many(missing)
+            for movie in movies:
+                if movie is not None:
+                    cached[movie.id] = movie
+                    if generation == self._generation:
+                        self._store(movie)
+        return [cached.get(movie_id) for movie_id in movie_ids]
+
+    async def delete(self, movie_id: str):
+        try:
+            return await self._inner.delete(movie_id)
+        finally:
+            self._invalidate([movie_id])
+
+    async def update(self, movie_id: str, update_parameteres: dict):
+        try:
+            return await self._inner.update(movie_id, update_parameteres)
+        finally:
+            self._invalidate([movie_id])
+
+    async def create_many(
+        self, movies: typing.List[Movie], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        try:
+            return await self._inner.create_many(movies, ordered=ordered)
+        finally:
+            self._invalidate([movie.id for movie in movies])
+
+    async def update_many(
+        self, updates: typing.List[typing.Tuple[str, dict]], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        try:
+            return await self._inner.update_many(updates, ordered=ordered)
+        finally:
+            self._invalidate([movie_id for movie_id, _ in updates])
+
+    async def delete_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[BulkItemResult]:
+        try:
+            return await self._inner.delete_many(movie_ids)
+        finally:
+            self._invalidate(movie_ids)
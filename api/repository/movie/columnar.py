@@ -0,0 +1,157 @@
+"""
+This module contains a compact, column oriented storage engine for the in-memory movie repository.
+"""
+
+import array
+import typing
+import uuid
+
+from api.entities.movies import Movie
+
+
+def _encode_id(movie_id: str) -> typing.Union[int, str]:
+    """Returns the 128 bit integer of a canonical uuid string, otherwise the id itself."""
+    try:
+        value = uuid.UUID(movie_id)
+    except (TypeError, ValueError, AttributeError):
+        return movie_id
+    return value.int if str(value) == movie_id else movie_id
+
+
+def _decode_id(key: typing.Union[int, str]) -> str:
+    """Inverse of _encode_id."""
+    return str(uuid.UUID(int=key)) if isinstance(key, int) else key
+
+
+class ColumnarMovieStore:
+    """
+    Stores movies as a struct of arrays instead of a dict of Movie objects.
+
+    Every movie occupies a row: release years live in an int array, watched flags in
+    a bytearray and titles are deduplicated into a string table referenced by code.
+    Canonical uuid ids are kept as integers and mapped to their row. Movie objects are
+    only materialized on read, so callers always get a fresh, detached instance.
+
+    It implements the subset of the mapping protocol and the row accessors
+    MemoryMovieRepository uses for its storage.
+    """
+
+    def __init__(self):
+        # encoded movie id -> row
+        self._rows: typing.Dict[typing.Union[int, str], int] = {}
+        # row -> encoded movie id, None for free rows
+        self._keys: typing.List[typing.Optional[typing.Union[int, str]]] = []
+        self._title_codes = array.array("I")
+        self._descriptions: typing.List[typing.Optional[str]] = []
+        self._release_years = array.array("i")
+        self._watched = bytearray()
+        self._free_rows: typing.List[int] = []
+        # deduplicated titles: title -> code, code -> title and reference counts
+        self._title_table: typing.Dict[str, int] = {}
+        self._titles: typing.List[typing.Optional[str]] = []
+        self._title_refs = array.array("I")
+        self._free_codes: typing.List[int] = []
+
+    def _acquire_title(self, title: str) -> int:
+        code = self._title_table.get(title)
+        if code is None:
+            if self._free_codes:
+                code = self._free_codes.pop()
+                self._titles[code] = title
+                self._title_refs[code] = 0
+            else:
+                code = len(self._titles)
+                self._titles.append(title)
+                self._title_refs.append(0)
+            self._title_table[title] = code
+        self._title_refs[code] += 1
+        return code
+
+    def _release_title(self, code: int):
+        self._title_refs[code] -= 1
+        if self._title_refs[code] == 0:
+            del self._title_table[self._titles[code]]
+            self._titles[code] = None
+            self._free_codes.append(code)
+
+    def _materialize(self, row: int) -> Movie:
+        return Movie(
+            movie_id=_decode_id(self._keys[row]),
+            title=self._titles[self._title_codes[row]],
+            description=self._descriptions[row],
+            release_year=self._release_years[row],
+            watched=bool(self._watched[row]),
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, movie_id: str) -> bool:
+        return _encode_id(movie_id) in self._rows
+
+    def __getitem__(self, movie_id: str) -> Movie:
+        return self._materialize(self._rows[_encode_id(movie_id)])
+
+    def get(self, movie_id: str, default=None) -> typing.Optional[Movie]:
+        """Returns a materialized copy of the movie, or default if it is not stored."""
+        row = self._rows.get(_encode_id(movie_id))
+        if row is None:
+            return default
+        return self._materialize(row)
+
+    def values(self) -> typing.Iterator[Movie]:
+        """Yields a materialized copy of every stored movie."""
+        for row, key in enumerate(self._keys):
+            if key is not None:
+                yield self._materialize(row)
+
+    def __setitem__(self, movie_id: str, movie: Movie):
+        key = _encode_id(movie_id)
+        code = self._acquire_title(movie.title)
+        row = self._rows.get(key)
+        if row is not None:
+            self._release_title(self._title_codes[row])
+            self._title_codes[row] = code
+            self._descriptions[row] = movie.description
+            self._release_years[row] = movie.release_year
+            self._watched[row] = bool(movie.watched)
+        elif self._free_rows:
+            row = self._free_rows.pop()
+            self._keys[row] = key
+            self._title_codes[row] = code
+            self._descriptions[row] = movie.description
+            self._release_years[row] = movie.release_year
+            self._watched[row] = bool(movie.watched)
+        else:
+            row = len(self._keys)
+            self._keys.append(key)
+            self._title_codes.append(code)
+            self._descriptions.append(movie.description)
+            self._release_years.append(movie.release_year)
+            self._watched.append(bool(movie.watched))
+        self._rows[key] = row
+
+    def pop(self, movie_id: str, default=None) -> typing.Optional[Movie]:
+        """Removes the movie and returns it, or default if it is not stored."""
+        row = self._rows.pop(_encode_id(movie_id), None)
+        if row is None:
+            return default
+        movie = self._materialize(row)
+        self._release_title(self._title_codes[row])
+        self._keys[row] = None
+        self._descriptions[row] = None
+        self._free_rows.append(row)
+        return movie
+
+    def row(self, movie_id: str) -> typing.Optional[int]:
+        """Returns the row of the movie, or None if it is not stored."""
+        return self._rows.get(_encode_id(movie_id))
+
+    def movie_at(self, row: int) -> Movie:
+        return self._materialize(row)
+
+    def movie_id_at(self, row: int) -> str:
+        return _decode_id(self._keys[row])
+
+    def release_year_at(self, row: int) -> int:
+        return self._release_years[row]
@@ -0,0 +1,146 @@
+"""
+This module contains a MovieRepository forwarding every operation to another repository,
+the base of the repositories adding behaviour in front of a backend.
+"""
+
+import typing
+
+from api.entities.movies import Movie
+from api.repository.movie.abstractions import (
+    BulkItemResult,
+    CatalogStats,
+    CursorPage,
+    MovieRepository,
+    TitlePage,
+    TitleSuggestion,
+    VersionedMovie,
+)
+
+
+class DelegatingMovieRepository(MovieRepository):
+    """
+    Forwards every operation to the wrapped repository. Subclasses override the
+    operations they change.
+    """
+
+    def __init__(self, inner: MovieRepository):
+        self._inner = inner
+
+    async def create(self, movie: Movie) -> bool:
+        return await self._inner.create(movie)
+
+    async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
+        return await self._inner.get_by_id(movie_id)
+
+    async def get_version(self, movie_id: str) -> typing.Optional[int]:
+        return await self._inner.get_version(movie_id)
+
+    async def get_versioned(self, movie_id: str) -> typing.Optional[VersionedMovie]:
+        return await self._inner.get_versioned(movie_id)
+
+    async def get_by_title(
+        self, title: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        return await self._inner.get_by_title(title, skip=skip, limit=limit)
+
+    async def get_by_title_after(
+        self, title: str, cursor: typing.Optional[str] = None, limit: int = 1000
+    ) -> CursorPage:
+        return await self._inner.get_by_title_after(title, cursor=cursor, limit=limit)
+
+    async def get_by_title_snapshot(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        snapshot: typing.Optional[str] = None,
+    ) -> TitlePage:
+        return await self._inner.get_by_title_snapshot(
+            title, skip=skip, limit=limit, snapshot=snapshot
+        )
+
+    async def get_by_title_prefix(
+        self, prefix: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        return await self._inner.get_by_title_prefix(prefix, skip=skip, limit=limit)
+
+    async def get_by_title_fuzzy(
+        self, title: str, max_distance: int = 2, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        return await self._inner.get_by_title_fuzzy(
+            title, max_distance=max_distance, skip=skip, limit=limit
+        )
+
+    async def autocomplete_titles(
+        self, prefix: str, limit: int = 10
+    ) -> typing.List[TitleSuggestion]:
+        return await self._inner.autocomplete_titles(prefix, limit=limit)
+
+    async def get_by_release_year_range(
+        self, start: int, end: int, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        return await self._inner.get_by_release_year_range(
+            start, end, skip=skip, limit=limit
+        )
+
+    async def search(
+        self, query: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        return await self._inner.search(query, skip=skip, limit=limit)
+
+    def iter_by_title(
+        self, title: str, skip: int = 0, limit: int = 1000
+    ) -> typing.AsyncIterator[Movie]:
+        return self._inner.iter_by_title(title, skip=skip, limit=limit)
+
+    def iter_by_title_prefix(
+        self, prefix: str, skip: int = 0, limit: int = 1000
+    ) -> typing.AsyncIterator[Movie]:
+        return self._inner.iter_by_title_prefix(prefix, skip=skip, limit=limit)
+
+    def iter_by_release_year_range(
+        self, start: int, end: int, skip: int = 0, limit: int = 1000
+    ) -> typing.AsyncIterator[Movie]:
+        return self._inner.iter_by_release_year_range(
+            start, end, skip=skip, limit=limit
+        )
+
+    async def delete(self, movie_id: str):
+        return await self._inner.delete(movie_id)
+
+    async def update(self, movie_id: str, update_parameteres: dict):
+        return await self._inner.update(movie_id, update_parameteres)
+
+    async def create_many(
+        self, movies: typing.List[Movie], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        return await self._inner.create_many(movies, ordered=ordered)
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        return await self._inner.get_many(movie_ids)
+
+    async def get_many_versioned(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[VersionedMovie]]:
+        return await self._inner.get_many_versioned(movie_ids)
+
+    async def update_many(
+        self, updates: typing.List[typing.Tuple[str, dict]], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        return await self._inner.update_many(updates, ordered=ordered)
+
+    async def delete_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[BulkItemResult]:
+        return await self._inner.delete_many(movie_ids)
+
+    async def get_stats(self) -> CatalogStats:
+        return await self._inner.get_stats()
+
+    async def initialize(self):
+        await self._inner.initialize()
+
+    async def close(self):
+        await self._inner.close()
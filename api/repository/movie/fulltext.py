@@ -0,0 +1,133 @@
+"""This module contains the inverted index serving the full-text search of the in-memory repositories."""
+
+import array
+import collections
+import heapq
+import math
+import typing
+
+from api.entities.movies import Movie
+from api.repository.movie.text import tokenize
+
+# BM25 term frequency saturation and document length normalization.
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A title term counts as this many description terms.
+TITLE_WEIGHT = 2
+# Length of the rows holding no document.
+_ABSENT = 0xFFFFFFFF
+
+
+class CorpusStatistics(typing.NamedTuple):
+    """The corpus wide figures BM25 scores depend on."""
+
+    documents: int
+    total_length: int
+    frequencies: typing.Dict[str, int]
+
+
+def movie_terms(movie: Movie) -> typing.Counter:
+    """Returns the weighted term frequencies of the searchable fields of a movie."""
+    terms = collections.Counter(tokenize(movie.description or ""))
+    for term in tokenize(movie.title or ""):
+        terms[term] += TITLE_WEIGHT
+    return terms
+
+
+class InvertedIndex:
+    """
+    Inverted index over the title and description of movies: every term maps to
+    the posting list of the movies containing it with their weighted term
+    frequency. Movies are added and removed one at a time, nothing is rebuilt.
+
+    Movies are identified by their row in the store of the repository, so the
+    postings hold small integers rather than movie ids. Scores tied in a search are
+    ordered by tie_key of the rows, the movie id of the row for a repository.
+    """
+
+    def __init__(
+        self, tie_key: typing.Optional[typing.Callable[[int], typing.Any]] = None
+    ):
+        # term -> row -> weighted term frequency
+        self._postings: typing.Dict[str, typing.Dict[int, int]] = {}
+        # row -> weighted number of terms, _ABSENT for rows not indexed
+        self._lengths = array.array("I")
+        self._documents = 0
+        self._total_length = 0
+        self._tie_key = tie_key or (lambda row: row)
+
+    def add(self, row: int, movie: Movie):
+        terms = movie_terms(movie)
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[row] = frequency
+        length = sum(terms.values())
+        if row >= len(self._lengths):
+            self._lengths.extend([_ABSENT] * (row + 1 - len(self._lengths)))
+        self._lengths[row] = length
+        self._documents += 1
+        self._total_length += length
+
+    def remove(self, row: int, movie: Movie):
+        """Removes the movie of the row, which must be the indexed version of it."""
+        if row >= len(self._lengths) or self._lengths[row] == _ABSENT:
+            return
+        self._total_length -= self._lengths[row]
+        self._documents -= 1
+        self._lengths[row] = _ABSENT
+        for term in movie_terms(movie):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(row, None)
+                if not postings:
+                    del self._postings[term]
+
+    def statistics(self, terms: typing.Iterable[str]) -> CorpusStatistics:
+        return CorpusStatistics(
+            documents=self._documents,
+            total_length=self._total_length,
+            frequencies={term: len(self._postings.get(term, ())) for term in terms},
+        )
+
+    def search(
+        self,
+        terms: typing.List[str],
+        limit: int,
+        statistics: typing.Optional[CorpusStatistics] = None,
+    ) -> typing.List[typing.Tuple[float, int]]:
+        """
+        Returns the (score, row) pairs of the limit best BM25 matches of the query
+        terms, best first, ties broken by tie_key. The statistics of a larger
+        corpus the index is part of can be given to score on that corpus.
+        """
+        terms = list(dict.fromkeys(terms))
+        if statistics is None:
+            statistics = self.statistics(terms)
+        if not statistics.documents:
+            return []
+        average_length = statistics.total_length / statistics.documents or 1
+        scores: typing.Dict[int, float] = collections.defaultdict(float)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            frequency = statistics.frequencies.get(term, len(postings))
+            idf = math.log(
+                1 + (statistics.documents - frequency + 0.5) / (frequency + 0.5)
+            )
+            for row, term_frequency in postings.items():
+                norm = BM25_K1 * (
+                    1 - BM25_B + BM25_B * self._lengths[row] / average_length
+                )
+                scores[row] += (
+                    idf * term_frequency * (BM25_K1 + 1) / (term_frequency + norm)
+                )
+        tie_key = self._tie_key
+
+        def rank(item):
+            return -item[1], tie_key(item[0])
+
+        if limit:
+            ranked = heapq.nsmallest(limit, scores.items(), key=rank)
+        else:
+            ranked = sorted(scores.items(), key=rank)
+        return [(score, row) for row, score in ranked]
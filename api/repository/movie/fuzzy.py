@@ -0,0 +1,117 @@
+"""This module contains the trigram index and edit distance serving typo tolerant title search."""
+
+import heapq
+import typing
+
+# Default number of typos a fuzzy title search tolerates.
+DEFAULT_MAX_DISTANCE = 2
+
+
+def trigrams(normalized_title: str) -> typing.Set[str]:
+    """
+    Returns the distinct trigrams of a normalized title, padded so the start and the
+    end of the title form trigrams of their own.
+    """
+    padded = f"  {normalized_title} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def usable_distance(grams: typing.Set[str], max_distance: int) -> int:
+    """
+    Returns the largest distance up to max_distance a search for the trigrams can
+    tolerate. An edit destroys at most three trigrams, so any title within distance
+    d shares one of any 3d + 1 distinct trigrams of the query; shorter queries have
+    too few trigrams to narrow the candidates for larger distances.
+    """
+    return max(0, min(max_distance, (len(grams) - 1) // 3))
+
+
+def bounded_levenshtein(a: str, b: str, bound: int) -> typing.Optional[int]:
+    """
+    Returns the edit distance of a and b if it is at most bound, otherwise None.
+    Only the diagonal band of width 2 * bound + 1 is computed and the computation
+    stops as soon as a whole row exceeds the bound.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    over = bound + 1
+    previous = [j if j <= bound else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        char = a[i - 1]
+        current = [over] * (len(b) + 1)
+        if i <= bound:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - bound), min(len(b), i + bound) + 1):
+            value = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != b[j - 1]),
+            )
+            current[j] = value if value < over else over
+            if value < best:
+                best = value
+        if best > bound:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= bound else None
+
+
+class TrigramIndex:
+    """
+    Maps every trigram to the normalized titles containing it. A search only
+    verifies the titles sharing one of the 3d + 1 rarest trigrams of the query, so
+    its cost depends on those posting lists and never on the size of the catalog.
+    """
+
+    def __init__(self):
+        self._postings: typing.Dict[str, typing.Set[str]] = {}
+
+    def add(self, normalized_title: str):
+        for gram in trigrams(normalized_title):
+            self._postings.setdefault(gram, set()).add(normalized_title)
+
+    def remove(self, normalized_title: str):
+        for gram in trigrams(normalized_title):
+            titles = self._postings.get(gram)
+            if titles is not None:
+                titles.discard(normalized_title)
+                if not titles:
+                    del self._postings[gram]
+
+    def search(
+        self, normalized_query: str, max_distance: int = DEFAULT_MAX_DISTANCE
+    ) -> typing.List[typing.Tuple[int, str]]:
+        """
+        Returns the (distance, normalized title) pairs of the titles within
+        max_distance edits of the query, closest first, then alphabetically.
+        """
+        if not normalized_query:
+            return []
+        grams = trigrams(normalized_query)
+        max_distance = usable_distance(grams, max_distance)
+        rarest = heapq.nsmallest(
+            3 * max_distance + 1,
+            grams,
+            key=lambda gram: len(self._postings.get(gram, ())),
+        )
+        candidates = set()
+        for gram in rarest:
+            candidates.update(self._postings.get(gram, ()))
+        # a title within distance d also shares all but 3d of the query trigrams,
+        # a cheaper test than the edit distance which discards most candidates
+        shared = len(grams) - 3 * max_distance
+        length = len(normalized_query)
+        matches = []
+        for candidate in candidates:
+            if abs(len(candidate) - length) > max_distance:
+                continue
+            if shared > 1 and len(grams.intersection(trigrams(candidate))) < shared:
+                continue
+            distance = bounded_levenshtein(normalized_query, candidate, max_distance)
+            if distance is not None:
+                matches.append((distance, candidate))
+        matches.sort()
+        return matches
@@ -2,57 +2,719 @@
 This module contains the implementation of the MovieRepository interface using an in-memory storage
 """
 
+import array
+import asyncio
+import bisect
+import collections
+import heapq
+import time
 import typing
 
 from api.entities.movies import Movie
-from api.repository.movie.abstractions import MovieRepository, RepositoryException
+from api.repository.movie.abstractions import (
+    NOT_PROCESSED,
+    BulkItemResult,
+    CatalogStats,
+    CursorPage,
+    MovieRepository,
+    RepositoryException,
+    TitlePage,
+    TitleSuggestion,
+    VersionedMovie,
+)
+from api.repository.movie.fulltext import InvertedIndex
+from api.repository.movie.fuzzy import DEFAULT_MAX_DISTANCE, TrigramIndex
+from api.repository.movie.pagination import decode_cursor, encode_cursor
+from api.repository.movie.persistence import MovieJournal
+from api.repository.movie.snapshots import ResultSnapshots
+from api.repository.movie.text import normalize_title, suggestion_rank, tokenize
+
+# Maximum number of distinct titles inspected to rank an autocomplete request.
+AUTOCOMPLETE_CANDIDATES = 200
+# Batches at least this large are removed from the indexes by rebuilding them.
+UNINDEX_REBUILD_THRESHOLD = 64
+# Movie fields which can be changed by an update.
+UPDATABLE_FIELDS = ("title", "description", "release_year", "watched")
+# Movie fields the secondary and full-text indexes are keyed on.
+INDEXED_FIELDS = ("title", "description", "release_year")
+# Type code of the arrays of storage rows the indexes are made of.
+ROW_TYPECODE = "I"
+
+
+def _discard(items: list, item):
+    """Removes the item from the sorted list if present."""
+    position = bisect.bisect_left(items, item)
+    if position < len(items) and items[position] == item:
+        del items[position]
+
+
+def _discard_row(rows: array.array, row: int, sort_key) -> bool:
+    """Removes the row from the rows sorted by sort_key, returns True if it was present."""
+    position = bisect.bisect_left(rows, sort_key(row), key=sort_key)
+    if position < len(rows) and rows[position] == row:
+        del rows[position]
+        return True
+    return False
+
+
+def _insert_row(index: dict, key, row: int, sort_key) -> bool:
+    """Adds the row to the bucket of key sorted by sort_key, returns True if the bucket is new."""
+    bucket = index.get(key)
+    if bucket is None:
+        index[key] = array.array(ROW_TYPECODE, (row,))
+        return True
+    bisect.insort(bucket, row, key=sort_key)
+    return False
+
+
+def _remove_row(index: dict, key, row: int, sort_key) -> bool:
+    """Removes the row from the bucket of key sorted by sort_key, returns True if the bucket is gone."""
+    bucket = index.get(key)
+    if not bucket:
+        return False
+    _discard_row(bucket, row, sort_key)
+    if bucket:
+        return False
+    del index[key]
+    return True
+
+
+def _merge_rows(
+    rows: typing.Sequence[int], new_rows: typing.Iterable[int], sort_key
+) -> array.array:
+    """
+    Returns the rows sorted by sort_key with the new rows merged in. Only the keys of
+    the new rows and of a logarithmic number of rows per new row are computed.
+    """
+    merged = array.array(ROW_TYPECODE)
+    start = 0
+    for key, row in sorted((sort_key(row), row) for row in new_rows):
+        position = bisect.bisect_left(rows, key, lo=start, key=sort_key)
+        merged.extend(rows[start:position])
+        merged.append(row)
+        start = position
+    merged.extend(rows[start:])
+    return merged
+
+
+class DictMovieStore:
+    """
+    The default storage of MemoryMovieRepository: Movie objects in a list of rows,
+    with a dict mapping every movie id to the row of its movie. A replaced movie
+    keeps its row, the rows of deleted movies are reused.
+    """
+
+    def __init__(self):
+        # movie id -> row
+        self._rows: typing.Dict[str, int] = {}
+        # row -> movie, None for free rows
+        self._movies: typing.List[typing.Optional[Movie]] = []
+        self._free_rows: typing.List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, movie_id: str) -> bool:
+        return movie_id in self._rows
+
+    def __getitem__(self, movie_id: str) -> Movie:
+        return self._movies[self._rows[movie_id]]
+
+    def get(self, movie_id: str, default=None) -> typing.Optional[Movie]:
+        row = self._rows.get(movie_id)
+        return default if row is None else self._movies[row]
+
+    def values(self) -> typing.Iterator[Movie]:
+        return (movie for movie in self._movies if movie is not None)
+
+    def __setitem__(self, movie_id: str, movie: Movie):
+        row = self._rows.get(movie_id)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                row = len(self._movies)
+                self._movies.append(None)
+            self._rows[movie_id] = row
+        self._movies[row] = movie
+
+    def pop(self, movie_id: str, default=None) -> typing.Optional[Movie]:
+        row = self._rows.pop(movie_id, None)
+        if row is None:
+            return default
+        movie = self._movies[row]
+        self._movies[row] = None
+        self._free_rows.append(row)
+        return movie
+
+    def row(self, movie_id: str) -> typing.Optional[int]:
+        """Returns the row of the movie, or None if it is not stored."""
+        return self._rows.get(movie_id)
+
+    def movie_at(self, row: int) -> Movie:
+        return self._movies[row]
+
+    def movie_id_at(self, row: int) -> str:
+        return self._movies[row].id
+
+    def release_year_at(self, row: int) -> int:
+        return self._movies[row].release_year
 
 
 class MemoryMovieRepository(MovieRepository):
     """
     This class provides an in-memory implementation of the MovieRepository interface.
+
+    Every stored movie has a row in the storage, which it keeps across updates.
+    Alongside the storage secondary indexes map every title, and every normalized
+    title, to the array of rows sharing it sorted by movie id, so lookups only touch
+    the matches. The distinct normalized titles are also kept in a sorted list
+    serving prefix searches, and the rows in an array sorted by (release year, id)
+    serving release year ranges with a binary search. An InvertedIndex over the
+    titles and descriptions serves the full-text search and a TrigramIndex over the
+    distinct normalized titles the fuzzy title search. Keying the indexes on rows
+    rather than on movie ids keeps them small: an index entry is a machine integer,
+    not a reference to an id string kept alive by the index.
+
+    The storage defaults to a DictMovieStore of Movie objects. Any object
+    implementing the same get/[]/pop mapping subset and row accessors can be passed
+    instead, for example a ColumnarMovieStore for large catalogs. Stored movies are
+    never mutated, updates replace them with a new instance.
+
+    With a journal every mutation is also logged durably, the catalog is restored
+    from it on construction and a snapshot is taken once snapshot_every mutations
+    have been logged since the last one.
+
+    Because stored movies are never mutated, title search results are frozen for
+    snapshot pagination by keeping references to the matching movies.
+
+    Version tags come from a counter starting at the construction time in
+    nanoseconds, so tags handed out by an earlier process are never reused. Movies
+    not written since then share the starting version.
     """
 
-    def __init__(self):
-        self._storage = {}
+    def __init__(
+        self,
+        storage: typing.Optional[typing.Any] = None,
+        journal: typing.Optional[MovieJournal] = None,
+        snapshot_every: int = 100_000,
+    ):
+        self._storage = DictMovieStore() if storage is None else storage
+        self._movie_id_at = self._storage.movie_id_at
+        # title -> rows of the movies with that title, sorted by movie id
+        self._title_index: typing.Dict[str, array.array] = {}
+        # normalized title -> rows of the movies with that normalized title, sorted by movie id
+        self._normalized_index: typing.Dict[str, array.array] = {}
+        # sorted distinct normalized titles
+        self._normalized_titles: typing.List[str] = []
+        # rows of every movie sorted by (release year, movie id)
+        self._release_years = array.array(ROW_TYPECODE)
+        self._text_index = InvertedIndex(tie_key=self._movie_id_at)
+        self._trigram_index = TrigramIndex()
+        self._journal = journal
+        self._snapshot_every = snapshot_every
+        self._snapshotting = False
+        self._result_snapshots = ResultSnapshots()
+        # row -> version of the movie written there since construction, 0 if none
+        self._versions = array.array("Q")
+        self._initial_version = self._last_version = time.time_ns()
+        self._watched_count = 0
+        # release year -> number of movies released that year
+        self._release_year_counts: typing.Counter[int] = collections.Counter()
+        if journal is not None:
+            movies = journal.load()
+            for movie in movies.values():
+                self._storage[movie.id] = movie
+            self._index_many(self._placed(movies.values()))
+            self._count(movies.values(), 1)
+
+    def _count(self, movies: typing.Iterable[Movie], sign: int):
+        """Adds the movies to the catalog counts, or removes them with sign -1."""
+        counts = self._release_year_counts
+        for movie in movies:
+            if movie.watched:
+                self._watched_count += sign
+            count = counts[movie.release_year] + sign
+            if count:
+                counts[movie.release_year] = count
+            else:
+                del counts[movie.release_year]
+
+    def _placed(
+        self, movies: typing.Iterable[Movie]
+    ) -> typing.List[typing.Tuple[int, Movie]]:
+        """Returns the (row, movie) pairs of stored movies."""
+        return [(self._storage.row(movie.id), movie) for movie in movies]
+
+    def _release_year_key(self, row: int) -> typing.Tuple[int, str]:
+        return self._storage.release_year_at(row), self._movie_id_at(row)
+
+    def _bump_versions(self, rows: typing.Iterable[int]):
+        versions = self._versions
+        for row in rows:
+            self._last_version += 1
+            if row >= len(versions):
+                versions.extend([0] * (row + 1 - len(versions)))
+            versions[row] = self._last_version
+
+    def _clear_version(self, row: int):
+        if row < len(self._versions):
+            self._versions[row] = 0
+
+    # The sort keys of the indexes are read from the storage: a movie is indexed
+    # after it was stored at its row, and unindexed before it is replaced or removed.
+
+    def _index(self, row: int, movie: Movie):
+        movie_id_at = self._movie_id_at
+        _insert_row(self._title_index, movie.title, row, movie_id_at)
+        normalized = normalize_title(movie.title)
+        if _insert_row(self._normalized_index, normalized, row, movie_id_at):
+            bisect.insort(self._normalized_titles, normalized)
+            self._trigram_index.add(normalized)
+        bisect.insort(self._release_years, row, key=self._release_year_key)
+        self._text_index.add(row, movie)
+
+    def _unindex(self, row: int, movie: Movie):
+        movie_id_at = self._movie_id_at
+        _remove_row(self._title_index, movie.title, row, movie_id_at)
+        normalized = normalize_title(movie.title)
+        if _remove_row(self._normalized_index, normalized, row, movie_id_at):
+            _discard(self._normalized_titles, normalized)
+            self._trigram_index.remove(normalized)
+        _discard_row(self._release_years, row, self._release_year_key)
+        self._text_index.remove(row, movie)
+
+    def _index_many(self, placed: typing.List[typing.Tuple[int, Movie]]):
+        """Indexes a batch of (row, movie) pairs, merging into every touched index once."""
+        titles: typing.Dict[str, str] = {}  # title -> normalized title
+        title_rows: typing.Dict[str, typing.List[int]] = {}
+        normalized_rows: typing.Dict[str, typing.List[int]] = {}
+        for row, movie in placed:
+            title = movie.title
+            title_rows.setdefault(title, []).append(row)
+            normalized = titles.get(title)
+            if normalized is None:
+                normalized = titles[title] = normalize_title(title)
+            normalized_rows.setdefault(normalized, []).append(row)
+            self._text_index.add(row, movie)
+        movie_id_at = self._movie_id_at
+        for title, rows in title_rows.items():
+            self._title_index[title] = _merge_rows(
+                self._title_index.get(title, ()), rows, movie_id_at
+            )
+        new_normalized = [n for n in normalized_rows if n not in self._normalized_index]
+        for normalized, rows in normalized_rows.items():
+            self._normalized_index[normalized] = _merge_rows(
+                self._normalized_index.get(normalized, ()), rows, movie_id_at
+            )
+        self._normalized_titles.extend(new_normalized)
+        self._normalized_titles.sort()
+        for normalized in new_normalized:
+            self._trigram_index.add(normalized)
+        self._release_years = _merge_rows(
+            self._release_years, [row for row, _ in placed], self._release_year_key
+        )
+
+    def _unindex_many(self, placed: typing.List[typing.Tuple[int, Movie]]):
+        """Removes a batch of (row, movie) pairs from the indexes, filtering every touched index once."""
+        if len(placed) < UNINDEX_REBUILD_THRESHOLD:
+            for row, movie in placed:
+                self._unindex(row, movie)
+            return
+        removed = {row for row, _ in placed}
+        titles = {movie.title for _, movie in placed}
+        for index, keys in (
+            (self._title_index, titles),
+            (self._normalized_index, {normalize_title(title) for title in titles}),
+        ):
+            for key in keys:
+                rows = array.array(
+                    ROW_TYPECODE, (row for row in index[key] if row not in removed)
+                )
+                if rows:
+                    index[key] = rows
+                else:
+                    del index[key]
+        self._normalized_titles = [
+            normalized
+            for normalized in self._normalized_titles
+            if normalized in self._normalized_index
+        ]
+        for normalized in {normalize_title(title) for title in titles}:
+            if normalized not in self._normalized_index:
+                self._trigram_index.remove(normalized)
+        self._release_years = array.array(
+            ROW_TYPECODE, (row for row in self._release_years if row not in removed)
+        )
+        for row, movie in placed:
+            self._text_index.remove(row, movie)
+
+    async def _log_put(self, movie: Movie):
+        if self._journal is not None:
+            self._journal.append_put(movie)
+            await self._maybe_snapshot()
+
+    async def _log_delete(self, movie_id: str):
+        if self._journal is not None:
+            self._journal.append_delete(movie_id)
+            await self._maybe_snapshot()
+
+    async def _log_batch(
+        self, puts: typing.Iterable[Movie] = (), deletes: typing.Iterable[str] = ()
+    ):
+        if self._journal is not None:
+            for movie in puts:
+                self._journal.append_put(movie)
+            for movie_id in deletes:
+                self._journal.append_delete(movie_id)
+            await self._maybe_snapshot()
+
+    async def _maybe_snapshot(self):
+        if self._journal.pending_records >= self._snapshot_every:
+            await self.snapshot()
+
+    async def snapshot(self):
+        """
+        Writes a snapshot of the catalog to the journal, so a restore only replays the
+        mutations logged after it. The file is written on a worker thread.
+        """
+        if self._journal is None or self._snapshotting:
+            return
+        self._snapshotting = True
+        try:
+            generation = self._journal.rotate()
+            movies = list(self._storage.values())
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._journal.write_snapshot, generation, movies
+            )
+        finally:
+            self._snapshotting = False
+
+    def _iter_prefix(self, prefix: str) -> typing.Iterator[str]:
+        """Yields the normalized titles starting with the prefix in sorted order."""
+        titles = self._normalized_titles
+        position = bisect.bisect_left(titles, prefix)
+        while position < len(titles) and titles[position].startswith(prefix):
+            yield titles[position]
+            position += 1
 
     async def create(self, movie: Movie) -> bool:
+        row = self._storage.row(movie.id)
+        if row is not None:
+            existing = self._storage.movie_at(row)
+            self._unindex(row, existing)
+            self._count([existing], -1)
         self._storage[movie.id] = movie
+        row = self._storage.row(movie.id)
+        self._index(row, movie)
+        self._count([movie], 1)
+        self._bump_versions([row])
+        await self._log_put(movie)
 
     async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
         return self._storage.get(movie_id)
 
-    # async def get_by_title(
-    #     self, title: str, skip: int = 0, limit: int = 1000
-    # ) -> typing.List[Movie]:
-    #     return_value = []
-    #     for _, value in self._storage.items():
-    #         if title == value.title:
-    #             return_value.append(value)
-    #     if limit == 0:
-    #         return return_value[skip:]
-    #     return return_value[skip : skip + limit]
+    async def get_version(self, movie_id: str) -> typing.Optional[int]:
+        row = self._storage.row(movie_id)
+        if row is None:
+            return None
+        version = self._versions[row] if row < len(self._versions) else 0
+        return version or self._initial_version
+
+    async def get_versioned(self, movie_id: str) -> typing.Optional[VersionedMovie]:
+        movie = self._storage.get(movie_id)
+        if movie is None:
+            return None
+        return VersionedMovie(movie=movie, version=await self.get_version(movie_id))
 
     async def get_by_title(
         self, title: str, skip: int = 0, limit: int = 1000
     ) -> typing.List[Movie]:
-        return_value = []
-        for _, value in self._storage.items():
-            if title == value.title:
-                return_value.append(value)
+        rows = self._title_index.get(title, ())
         if limit == 0:
-            return return_value[skip:]
-        return return_value[skip : skip + limit]
+            page = rows[skip:]
+        else:
+            page = rows[skip : skip + limit]
+        return [self._storage.movie_at(row) for row in page]
+
+    async def get_by_title_after(
+        self, title: str, cursor: typing.Optional[str] = None, limit: int = 1000
+    ) -> CursorPage:
+        rows = self._title_index.get(title, ())
+        start = 0
+        if cursor is not None:
+            cursor_title, after = decode_cursor(cursor, 2)
+            if cursor_title != title:
+                raise RepositoryException(f"invalid cursor {cursor}")
+            start = bisect.bisect_right(rows, after, key=self._movie_id_at)
+        end = len(rows) if limit == 0 else start + limit
+        movies = [self._storage.movie_at(row) for row in rows[start:end]]
+        next_cursor = None
+        if movies and end < len(rows):
+            next_cursor = encode_cursor(title, movies[-1].id)
+        return CursorPage(movies=movies, next_cursor=next_cursor)
+
+    async def get_by_title_snapshot(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        snapshot: typing.Optional[str] = None,
+    ) -> TitlePage:
+        if snapshot is None:
+            movies = await self.get_by_title(title, limit=0)
+            snapshot = self._result_snapshots.take(title, movies)
+        movies = self._result_snapshots.page(snapshot, title, skip=skip, limit=limit)
+        return TitlePage(movies=movies, snapshot=snapshot)
+
+    async def get_by_title_prefix(
+        self, prefix: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+        return_value = []
+        for normalized in self._iter_prefix(prefix):
+            rows = self._normalized_index[normalized]
+            if skip >= len(rows):
+                skip -= len(rows)
+                continue
+            end = None if limit == 0 else skip + limit - len(return_value)
+            return_value.extend(self._storage.movie_at(row) for row in rows[skip:end])
+            skip = 0
+            if limit and len(return_value) >= limit:
+                break
+        return return_value
+
+    def fuzzy_scored(
+        self, title: str, max_distance: int, limit: int
+    ) -> typing.List[typing.Tuple[int, Movie]]:
+        """
+        Returns the (distance, movie) pairs of the movies whose normalized title is
+        within max_distance edits of the normalized title, closest first, then by
+        normalized title and id.
+        """
+        hits = []
+        for distance, normalized in self._trigram_index.search(
+            normalize_title(title), max_distance
+        ):
+            for row in self._normalized_index[normalized]:
+                if limit and len(hits) == limit:
+                    return hits
+                hits.append((distance, self._storage.movie_at(row)))
+        return hits
+
+    async def get_by_title_fuzzy(
+        self,
+        title: str,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        skip: int = 0,
+        limit: int = 1000,
+    ) -> typing.List[Movie]:
+        hits = self.fuzzy_scored(title, max_distance, 0 if limit == 0 else skip + limit)
+        return [movie for _, movie in hits[skip:]]
+
+    async def autocomplete_titles(
+        self, prefix: str, limit: int = 10
+    ) -> typing.List[TitleSuggestion]:
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+        candidates = []
+        for normalized in self._iter_prefix(prefix):
+            if len(candidates) == AUTOCOMPLETE_CANDIDATES:
+                break
+            candidates.append((normalized, len(self._normalized_index[normalized])))
+        best = heapq.nsmallest(
+            limit, candidates, key=lambda c: suggestion_rank(prefix, c[0], c[1])
+        )
+        return [
+            TitleSuggestion(
+                title=self._storage.movie_at(
+                    self._normalized_index[normalized][0]
+                ).title,
+                count=count,
+            )
+            for normalized, count in best
+        ]
+
+    async def get_by_release_year_range(
+        self, start: int, end: int, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        if start > end:
+            return []
+        rows, key = self._release_years, self._release_year_key
+        lower = bisect.bisect_left(rows, (start,), key=key) + skip
+        upper = bisect.bisect_left(rows, (end + 1,), key=key)
+        if limit:
+            upper = min(upper, lower + limit)
+        return [self._storage.movie_at(row) for row in rows[lower:upper]]
+
+    def search_scored(
+        self, terms: typing.List[str], limit: int
+    ) -> typing.List[typing.Tuple[float, Movie]]:
+        """Returns the (score, movie) pairs of the best full-text matches of the terms."""
+        return [
+            (score, self._storage.movie_at(row))
+            for score, row in self._text_index.search(terms, limit)
+        ]
+
+    async def search(
+        self, query: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        hits = self.search_scored(tokenize(query), 0 if limit == 0 else skip + limit)
+        return [movie for _, movie in hits[skip:]]
 
     async def delete(self, movie_id: str):
-        self._storage.pop(movie_id, None)
+        row = self._storage.row(movie_id)
+        if row is not None:
+            movie = self._storage.movie_at(row)
+            self._unindex(row, movie)
+            self._count([movie], -1)
+            self._clear_version(row)
+            self._storage.pop(movie_id)
+            await self._log_delete(movie_id)
 
-    async def update(self, movie_id: str, update_parameteres: dict):
-        movie = self._storage.get(movie_id)
+    def _updated(
+        self,
+        movie_id: str,
+        update_parameteres: dict,
+        movie: typing.Optional[Movie] = None,
+    ) -> Movie:
+        """
+        Returns the stored movie, or the given pending version of it, with the
+        update applied, without storing it.
+        """
+        if movie is None:
+            movie = self._storage.get(movie_id)
         if movie is None:
             raise RepositoryException(f"Movie {movie_id} not found")
+        if "id" in update_parameteres:
+            raise RepositoryException("Cannot update movie id")
+        fields = {key: getattr(movie, key) for key in UPDATABLE_FIELDS}
         for key, value in update_parameteres.items():
-            if key == "id":
-                raise RepositoryException("Cannot update movie id")
-            if hasattr(movie, key):
-                setattr(movie, f"_{key}", value)  # Update the movie entity field
+            if key in fields:
+                fields[key] = value
+        return Movie(movie_id=movie_id, **fields)
+
+    async def update(self, movie_id: str, update_parameteres: dict):
+        updated = self._updated(movie_id, update_parameteres)
+        row = self._storage.row(movie_id)
+        movie = self._storage.movie_at(row)
+        reindex = any(
+            getattr(updated, key) != getattr(movie, key) for key in INDEXED_FIELDS
+        )
+        if reindex:
+            self._unindex(row, movie)
+        self._storage[movie_id] = updated
+        if reindex:
+            self._index(row, updated)
+        self._count([movie], -1)
+        self._count([updated], 1)
+        self._bump_versions([row])
+        await self._log_put(updated)
+
+    async def create_many(
+        self, movies: typing.List[Movie], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        latest = {movie.id: movie for movie in movies}
+        replaced = [
+            (row, self._storage.movie_at(row))
+            for row in (self._storage.row(movie_id) for movie_id in latest)
+            if row is not None
+        ]
+        self._unindex_many(replaced)
+        self._count([movie for _, movie in replaced], -1)
+        for movie_id, movie in latest.items():
+            self._storage[movie_id] = movie
+        placed = self._placed(latest.values())
+        self._index_many(placed)
+        self._count(latest.values(), 1)
+        self._bump_versions(row for row, _ in placed)
+        await self._log_batch(puts=latest.values())
+        return [BulkItemResult(movie_id=movie.id, ok=True) for movie in movies]
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        return [self._storage.get(movie_id) for movie_id in movie_ids]
+
+    async def get_many_versioned(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[VersionedMovie]]:
+        return [await self.get_versioned(movie_id) for movie_id in movie_ids]
+
+    async def update_many(
+        self, updates: typing.List[typing.Tuple[str, dict]], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        results = []
+        # movie id -> (row, stored movie, latest updated movie) of the successful updates
+        changes: typing.Dict[str, typing.Tuple[int, Movie, Movie]] = {}
+        failed = False
+        for movie_id, update_parameteres in updates:
+            if failed and ordered:
+                results.append(BulkItemResult(movie_id, False, NOT_PROCESSED))
+                continue
+            # later updates of the same movie apply on top of this one
+            pending = changes.get(movie_id)
+            try:
+                updated = self._updated(
+                    movie_id, update_parameteres, pending and pending[2]
+                )
+            except RepositoryException as e:
+                failed = True
+                results.append(BulkItemResult(movie_id, False, str(e)))
+                continue
+            if pending is None:
+                row = self._storage.row(movie_id)
+                pending = (row, self._storage.movie_at(row), updated)
+            changes[movie_id] = (pending[0], pending[1], updated)
+            results.append(BulkItemResult(movie_id, True))
+        reindexed = [
+            (row, original, updated)
+            for row, original, updated in changes.values()
+            if any(getattr(updated, k) != getattr(original, k) for k in INDEXED_FIELDS)
+        ]
+        self._unindex_many([(row, original) for row, original, _ in reindexed])
+        for movie_id, (_, _, updated) in changes.items():
+            self._storage[movie_id] = updated
+        self._index_many([(row, updated) for row, _, updated in reindexed])
+        self._count([original for _, original, _ in changes.values()], -1)
+        self._count([updated for _, _, updated in changes.values()], 1)
+        self._bump_versions(row for row, _, _ in changes.values())
+        await self._log_batch(puts=[updated for _, _, updated in changes.values()])
+        return results
+
+    async def delete_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[BulkItemResult]:
+        results = []
+        # movie id -> (row, stored movie) of the movies to delete
+        deleted: typing.Dict[str, typing.Tuple[int, Movie]] = {}
+        for movie_id in movie_ids:
+            row = self._storage.row(movie_id)
+            if row is None or movie_id in deleted:
+                results.append(
+                    BulkItemResult(movie_id, False, f"Movie {movie_id} not found")
+                )
+                continue
+            deleted[movie_id] = (row, self._storage.movie_at(row))
+            results.append(BulkItemResult(movie_id, True))
+        self._unindex_many(list(deleted.values()))
+        self._count([movie for _, movie in deleted.values()], -1)
+        for movie_id, (row, _) in deleted.items():
+            self._clear_version(row)
+            self._storage.pop(movie_id)
+        await self._log_batch(deletes=list(deleted))
+        return results
+
+    async def get_stats(self) -> CatalogStats:
+        return CatalogStats(
+            total=len(self._storage),
+            watched=self._watched_count,
+            by_release_year=dict(sorted(self._release_year_counts.items())),
+        )
+
+    async def close(self):
+        if self._journal is not None:
+            self._journal.close()
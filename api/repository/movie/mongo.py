@@ -2,12 +2,205 @@
 This module contains the implementation of the MovieRepository interface using an in-memory storage
 """
 
+import collections
+import datetime
+import logging
+import re
+import secrets
+import time
 import typing
 
 import motor.motor_asyncio
+from pymongo import ASCENDING, TEXT, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
 
 from api.entities.movies import Movie
-from api.repository.movie.abstractions import MovieRepository, RepositoryException
+from api.metrics import MONGO_INDEX_OK
+from api.repository.movie.abstractions import (
+    NOT_PROCESSED,
+    BulkItemResult,
+    CatalogStats,
+    CursorPage,
+    MovieRepository,
+    RepositoryException,
+    TitlePage,
+    TitleSuggestion,
+    VersionedMovie,
+)
+from api.repository.movie.fuzzy import bounded_levenshtein, trigrams, usable_distance
+from api.repository.movie.mongo_pool import PoolMetricsListener
+from api.repository.movie.pagination import decode_cursor, encode_cursor
+from api.repository.movie.text import normalize_title, suggestion_rank
+
+# Maximum number of distinct titles inspected to rank an autocomplete request.
+AUTOCOMPLETE_CANDIDATES = 200
+# Maximum number of distinct titles verified by a fuzzy title search.
+FUZZY_CANDIDATES = 10_000
+
+# Indexes serving every query shape of the repository.
+MOVIE_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    IndexModel([("title", ASCENDING), ("id", ASCENDING)], name="title_id"),
+    IndexModel(
+        [("title_normalized", ASCENDING), ("id", ASCENDING)],
+        name="title_normalized_id",
+    ),
+    IndexModel(
+        [("release_year", ASCENDING), ("id", ASCENDING)], name="release_year_id"
+    ),
+    IndexModel([("title_trigrams", ASCENDING)], name="title_trigrams"),
+    IndexModel(
+        [("title", TEXT), ("description", TEXT)],
+        name="title_description_text",
+        weights={"title": 2, "description": 1},
+    ),
+]
+
+# Fields a Movie is built from, the only ones list reads fetch.
+MOVIE_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "title": 1,
+    "description": 1,
+    "release_year": 1,
+    "watched": 1,
+}
+# Largest cursor batch requested from the server.
+MAX_READ_BATCH_SIZE = 1000
+# Cursor batch of streamed reads, small enough for the first rows to leave quickly.
+STREAM_BATCH_SIZE = 100
+
+# Seconds a snapshot of title matches can be paged through.
+SNAPSHOT_TTL = 300
+# Indexes of the snapshots collection: pages are read by position, and expired
+# snapshots are removed by the TTL monitor.
+SNAPSHOT_INDEXES = [
+    IndexModel(
+        [("snapshot", ASCENDING), ("position", ASCENDING)], name="snapshot_position"
+    ),
+    IndexModel([("expires_at", ASCENDING)], name="expires_at", expireAfterSeconds=0),
+]
+# Position of the header entry of a snapshot, written once all its movies are.
+_SNAPSHOT_HEADER = -1
+
+# Documents updated per bulk write by the backfill of the derived title fields.
+BACKFILL_BATCH_SIZE = 1000
+
+# Fields of a movie the catalog statistics depend on.
+STATS_PROJECTION = {"_id": 0, "id": 1, "watched": 1, "release_year": 1}
+# _id of the statistics document of the catalog.
+STATS_ID = "catalog"
+# Seconds a bulk delete holds its claim on the movies it removes, after which the
+# claim of a request which died midway is taken over.
+DELETE_CLAIM_TTL = 60
+
+logger = logging.getLogger(__name__)
+
+
+def _index_keys(index: dict) -> list:
+    """
+    Returns the keys of an IndexModel document or index_information entry. Text
+    indexes are stored under internal keys, so their weighted fields stand for them.
+    """
+    keys = index["key"]
+    keys = list(keys.items()) if isinstance(keys, dict) else list(keys)
+    if any(direction == TEXT for _, direction in keys):
+        weights = index.get("weights") or {
+            field: 1 for field, direction in keys if direction == TEXT
+        }
+        return [(TEXT, sorted(weights.items()))]
+    return keys
+
+
+def _title_fields(title: str) -> dict:
+    """Returns the fields derived from the title that title searches query."""
+    normalized = normalize_title(title)
+    return {
+        "title_normalized": normalized,
+        "title_trigrams": sorted(trigrams(normalized)),
+    }
+
+
+def _document(movie: Movie) -> dict:
+    """Returns the stored document of a movie."""
+    return {
+        "id": movie.id,
+        "title": movie.title,
+        **_title_fields(movie.title),
+        "description": movie.description,
+        "release_year": movie.release_year,
+        "watched": movie.watched,
+    }
+
+
+def _create_update(movie: Movie) -> dict:
+    """
+    Returns the upsert update of a create. The version tag of a created movie is the
+    current time in nanoseconds, so a movie deleted and created again never gets a
+    version it had before; updates increment it.
+    """
+    return {"$set": {**_document(movie), "version": time.time_ns()}}
+
+
+def _stats_fields(movie: Movie) -> dict:
+    return {
+        "id": movie.id,
+        "watched": movie.watched,
+        "release_year": movie.release_year,
+    }
+
+
+def _count(delta: typing.Counter, document: typing.Optional[dict], sign: int):
+    """Adds a movie to the $inc of the statistics, or removes it with sign -1."""
+    if document is None:
+        return
+    delta["total"] += sign
+    if document.get("watched"):
+        delta["watched"] += sign
+    delta[f"by_release_year.{document.get('release_year')}"] += sign
+
+
+def _updated_fields(document: dict, update_parameteres: dict) -> dict:
+    """Returns the statistics fields of a movie after an update."""
+    return {
+        **document,
+        **{
+            key: update_parameteres[key]
+            for key in STATS_PROJECTION
+            if key in update_parameteres
+        },
+    }
+
+
+def _prefix_query(normalized_prefix: str) -> dict:
+    """Returns the query of the titles starting with an already normalized prefix."""
+    # An anchored, case sensitive regex is answered from the title_normalized index.
+    return {"title_normalized": {"$regex": f"^{re.escape(normalized_prefix)}"}}
+
+
+_PREFIX_SORT = [("title_normalized", 1), ("id", 1)]
+
+
+def _update_document(update_parameteres: dict) -> dict:
+    """Returns the $set document of an update, with the derived fields it changes."""
+    if "title" in update_parameteres:
+        return {**update_parameteres, **_title_fields(update_parameteres["title"])}
+    return update_parameteres
+
+
+def _unclaimed(now: float) -> dict:
+    """Returns the filter of the movies no running bulk delete has claimed."""
+    return {
+        "$or": [
+            {"deleting": {"$exists": False}},
+            {"deleting.expires": {"$lt": now}},
+        ]
+    }
+
+
+def _update_update(update_parameteres: dict) -> dict:
+    """Returns the update of an update, which also increments the version tag."""
+    return {"$set": _update_document(update_parameteres), "$inc": {"version": 1}}
 
 
 class MongoMovieRepository(MovieRepository):
@@ -17,26 +210,190 @@ class MongoMovieRepository(MovieRepository):
         self,
         connection_string: str = "mongodb://localhost:27017",
         database: str = "movie_track_db",
+        max_pool_size: int = 100,
+        min_pool_size: int = 0,
+        max_idle_time_ms: typing.Optional[int] = None,
+        wait_queue_timeout_ms: typing.Optional[int] = None,
+        compressors: typing.Optional[str] = None,
+        read_preference: str = "primary",
     ):
-        self._client = motor.motor_asyncio.AsyncIOMotorClient(connection_string)
+        options = {
+            "maxPoolSize": max_pool_size,
+            "minPoolSize": min_pool_size,
+            "maxIdleTimeMS": max_idle_time_ms,
+            "waitQueueTimeoutMS": wait_queue_timeout_ms,
+            "readPreference": read_preference,
+        }
+        if compressors:
+            options["compressors"] = compressors
+        self._client = motor.motor_asyncio.AsyncIOMotorClient(
+            connection_string, event_listeners=[PoolMetricsListener()], **options
+        )
         self._database = self._client[database]
         # movies collection which holds the movie documents
         self._movies = self._database["movies"]
+        # statistics collection which holds the counters of the catalog
+        self._stats = self._database["movie_stats"]
+        # snapshots collection which holds the frozen matches of consistent title reads
+        self._snapshots = self._database["movie_snapshots"]
+
+    async def initialize(self):
+        await self.ensure_indexes()
+        try:
+            backfilled = await self.backfill_title_fields()
+            if backfilled:
+                logger.info("derived the title fields of %d movies", backfilled)
+        except PyMongoError as e:
+            logger.error("could not backfill the derived title fields: %s", e)
+        try:
+            if await self._stats.find_one({"_id": STATS_ID}) is None:
+                # catalogs written before the statistics were maintained
+                await self.recompute_stats()
+        except PyMongoError as e:
+            logger.error("could not initialize the catalog statistics: %s", e)
+
+    async def backfill_title_fields(self) -> int:
+        """
+        Sets title_normalized and title_trigrams on the documents written before they
+        were derived from the title, so prefix, autocomplete and fuzzy searches find
+        them. Returns the number of documents updated.
+        """
+        query = {
+            "$or": [
+                {"title_normalized": {"$exists": False}},
+                {"title_trigrams": {"$exists": False}},
+            ]
+        }
+        updated = 0
+        operations = []
+        async for document in self._movies.find(query, {"_id": 1, "title": 1}):
+            title = document.get("title")
+            if not isinstance(title, str):
+                continue
+            # matching the title too skips documents renamed since they were read
+            operations.append(
+                UpdateOne(
+                    {"_id": document["_id"], "title": title},
+                    {"$set": _title_fields(title)},
+                )
+            )
+            if len(operations) == BACKFILL_BATCH_SIZE:
+                updated += (await self._movies.bulk_write(operations)).modified_count
+                operations = []
+        if operations:
+            updated += (await self._movies.bulk_write(operations)).modified_count
+        return updated
+
+    async def ensure_indexes(self) -> typing.Dict[str, str]:
+        """
+        Creates the missing indexes of MOVIE_INDEXES and reports the state of every
+        index, see check_indexes. Failures are logged rather than raised so the API
+        can still start.
+        """
+        try:
+            await self._movies.create_indexes(MOVIE_INDEXES)
+            await self._snapshots.create_indexes(SNAPSHOT_INDEXES)
+        except OperationFailure as e:
+            # raised when an index with the same name or keys has other options,
+            # or when existing documents violate a unique index
+            logger.error("could not create the movie indexes: %s", e)
+        except PyMongoError as e:
+            logger.error("could not reach MongoDB to create the movie indexes: %s", e)
+            return {}
+        return await self.check_indexes()
+
+    async def check_indexes(self) -> typing.Dict[str, str]:
+        """
+        Compares the indexes of the movies collection to MOVIE_INDEXES. Returns the
+        state of every expected index, "ok", "missing" or "mismatched", and publishes
+        it as the movie_tracker_mongo_index_ok metric.
+        """
+        existing = await self._movies.index_information()
+        states = {}
+        for model in MOVIE_INDEXES:
+            expected = model.document
+            keys = _index_keys(expected)
+            # an index with the expected keys but another name serves queries too
+            actual = existing.get(expected["name"]) or next(
+                (info for info in existing.values() if _index_keys(info) == keys), None
+            )
+            if actual is None:
+                state = "missing"
+            elif _index_keys(actual) != keys or bool(actual.get("unique")) != bool(
+                expected.get("unique")
+            ):
+                state = "mismatched"
+            else:
+                state = "ok"
+            states[expected["name"]] = state
+            MONGO_INDEX_OK.labels(
+                collection=self._movies.name, index=expected["name"]
+            ).set(1 if state == "ok" else 0)
+            if state != "ok":
+                logger.warning("movie index %s is %s", expected["name"], state)
+        return states
+
+    def _find(
+        self,
+        query: dict,
+        sort: typing.Optional[list] = None,
+        skip: int = 0,
+        limit: int = 0,
+        batch_size: int = MAX_READ_BATCH_SIZE,
+    ):
+        """
+        Returns a cursor over the movie fields of the matching documents, fetching a
+        whole page per round trip unless a smaller batch size is given.
+        """
+        documents_cursor = self._movies.find(query, MOVIE_PROJECTION)
+        if sort:
+            documents_cursor = documents_cursor.sort(sort)
+        if limit:
+            batch_size = min(batch_size, limit)
+        return documents_cursor.skip(skip).limit(limit).batch_size(batch_size)
+
+    async def _find_movies(
+        self,
+        query: dict,
+        sort: typing.Optional[list] = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> typing.List[Movie]:
+        documents_cursor = self._find(query, sort=sort, skip=skip, limit=limit)
+        return Movie.from_documents(await documents_cursor.to_list(length=None))
+
+    async def _iter_movies(
+        self,
+        query: dict,
+        sort: typing.Optional[list] = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> typing.AsyncIterator[Movie]:
+        documents_cursor = self._find(
+            query, sort=sort, skip=skip, limit=limit, batch_size=STREAM_BATCH_SIZE
+        )
+        async for document in documents_cursor:
+            yield Movie.from_document(document)
+
+    async def _update_stats(self, delta: typing.Counter):
+        increments = {field: value for field, value in delta.items() if value}
+        if increments:
+            await self._stats.update_one(
+                {"_id": STATS_ID}, {"$inc": increments}, upsert=True
+            )
 
     async def create(self, movie: Movie):
-        await self._movies.update_one(
+        before = await self._movies.find_one_and_update(
             {"id": movie.id},
-            {
-                "$set": {
-                    "id": movie.id,
-                    "title": movie.title,
-                    "description": movie.description,
-                    "release_year": movie.release_year,
-                    "watched": movie.watched,
-                }
-            },
+            _create_update(movie),
+            projection=STATS_PROJECTION,
             upsert=True,
+            return_document=ReturnDocument.BEFORE,
         )
+        delta = collections.Counter()
+        _count(delta, before, -1)
+        _count(delta, _stats_fields(movie), 1)
+        await self._update_stats(delta)
 
     # async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
     #     document = await self._movies.find_one({"id": movie_id})
@@ -51,35 +408,271 @@ class MongoMovieRepository(MovieRepository):
     #     return None
 
     async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
-        document = await self._movies.find_one({"id": movie_id})
+        document = await self._movies.find_one({"id": movie_id}, MOVIE_PROJECTION)
         if document:
-            return Movie(
-                movie_id=document["id"],
-                title=document["title"],
-                description=document["description"],
-                release_year=document["release_year"],
-                watched=document["watched"],
-            )
+            return Movie.from_document(document)
         return None
 
+    async def get_version(self, movie_id: str) -> typing.Optional[int]:
+        document = await self._movies.find_one(
+            {"id": movie_id}, {"_id": 0, "version": 1}
+        )
+        if document is None:
+            return None
+        # documents written before version tags were introduced have none
+        return document.get("version", 0)
+
+    async def get_versioned(self, movie_id: str) -> typing.Optional[VersionedMovie]:
+        document = await self._movies.find_one(
+            {"id": movie_id}, {**MOVIE_PROJECTION, "version": 1}
+        )
+        if document is None:
+            return None
+        return VersionedMovie(
+            movie=Movie.from_document(document), version=document.get("version", 0)
+        )
+
     async def get_by_title(
         self, title: str, skip: int = 0, limit: int = 1000
     ) -> typing.List[Movie]:
-        return_value: typing.List[Movie] = []
-        # Get cursor from db.
-        documents_cursor = self._movies.find({"title": title}).skip(skip).limit(limit)
-        # Iterate though documents
-        async for document in documents_cursor:
-            return_value.append(
-                Movie(
-                    movie_id=document.get("id"),
-                    title=document.get("title"),
-                    description=document.get("description"),
-                    release_year=document.get("release_year"),
-                    watched=document.get("watched"),
-                )
+        return await self._find_movies(
+            {"title": title}, sort=[("id", 1)], skip=skip, limit=limit
+        )
+
+    async def search(
+        self, query: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        # served by the title_description_text index, ranked by its relevance score
+        score = {"$meta": "textScore"}
+        documents_cursor = (
+            self._movies.find(
+                {"$text": {"$search": query}}, {**MOVIE_PROJECTION, "score": score}
+            )
+            .sort([("score", score), ("id", 1)])
+            .skip(skip)
+            .limit(limit)
+            .batch_size(min(limit or MAX_READ_BATCH_SIZE, MAX_READ_BATCH_SIZE))
+        )
+        return Movie.from_documents(await documents_cursor.to_list(length=None))
+
+    def iter_by_title(
+        self, title: str, skip: int = 0, limit: int = 1000
+    ) -> typing.AsyncIterator[Movie]:
+        return self._iter_movies(
+            {"title": title}, sort=[("id", 1)], skip=skip, limit=limit
+        )
+
+    async def get_by_title_after(
+        self, title: str, cursor: typing.Optional[str] = None, limit: int = 1000
+    ) -> CursorPage:
+        query = {"title": title}
+        if cursor is not None:
+            cursor_title, after = decode_cursor(cursor, 2)
+            if cursor_title != title:
+                raise RepositoryException(f"invalid cursor {cursor}")
+            query["id"] = {"$gt": after}
+        # one extra movie tells whether a next page exists; the (title, id) index
+        # serves the range and the order, so deep pages cost the same as the first
+        movies = await self._find_movies(
+            query, sort=[("id", 1)], limit=0 if limit == 0 else limit + 1
+        )
+        next_cursor = None
+        if limit and len(movies) > limit:
+            movies = movies[:limit]
+            next_cursor = encode_cursor(title, movies[-1].id)
+        return CursorPage(movies=movies, next_cursor=next_cursor)
+
+    async def _take_snapshot(self, title: str) -> str:
+        """
+        Copies the movies sharing the title into the snapshots collection, so every
+        process serving the API can page through them, and returns the token.
+        """
+        token = secrets.token_urlsafe(16)
+        expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+            seconds=SNAPSHOT_TTL
+        )
+        entries = []
+        position = 0
+        async for document in self._find({"title": title}, sort=[("id", 1)]):
+            entries.append(
+                {
+                    "snapshot": token,
+                    "position": position,
+                    "movie": document,
+                    "expires_at": expires_at,
+                }
+            )
+            position += 1
+            if len(entries) == MAX_READ_BATCH_SIZE:
+                await self._snapshots.insert_many(entries)
+                entries = []
+        # the header comes last, so a token is only valid once the copy is complete
+        entries.append(
+            {
+                "snapshot": token,
+                "position": _SNAPSHOT_HEADER,
+                "title": title,
+                "expires_at": expires_at,
+            }
+        )
+        await self._snapshots.insert_many(entries)
+        return token
+
+    async def get_by_title_snapshot(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        snapshot: typing.Optional[str] = None,
+    ) -> TitlePage:
+        if snapshot is None:
+            snapshot = await self._take_snapshot(title)
+        # the TTL monitor runs once a minute, expired snapshots may still be there
+        header = await self._snapshots.find_one(
+            {
+                "snapshot": snapshot,
+                "position": _SNAPSHOT_HEADER,
+                "expires_at": {"$gt": datetime.datetime.now(datetime.timezone.utc)},
+            }
+        )
+        if header is None or header.get("title") != title:
+            raise RepositoryException(f"snapshot {snapshot} not found or expired")
+        positions = {"$gte": skip}
+        if limit:
+            positions["$lt"] = skip + limit
+        entries_cursor = (
+            self._snapshots.find(
+                {"snapshot": snapshot, "position": positions}, {"_id": 0, "movie": 1}
+            )
+            .sort("position", 1)
+            .batch_size(min(limit or MAX_READ_BATCH_SIZE, MAX_READ_BATCH_SIZE))
+        )
+        entries = await entries_cursor.to_list(length=None)
+        movies = Movie.from_documents([entry["movie"] for entry in entries])
+        return TitlePage(movies=movies, snapshot=snapshot)
+
+    async def get_by_title_prefix(
+        self, prefix: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+        return await self._find_movies(
+            _prefix_query(prefix), sort=_PREFIX_SORT, skip=skip, limit=limit
+        )
+
+    async def iter_by_title_prefix(
+        self, prefix: str, skip: int = 0, limit: int = 1000
+    ) -> typing.AsyncIterator[Movie]:
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return
+        async for movie in self._iter_movies(
+            _prefix_query(prefix), sort=_PREFIX_SORT, skip=skip, limit=limit
+        ):
+            yield movie
+
+    async def get_by_title_fuzzy(
+        self, title: str, max_distance: int = 2, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        normalized = normalize_title(title)
+        if not normalized:
+            return []
+        grams = trigrams(normalized)
+        max_distance = usable_distance(grams, max_distance)
+        # any 3d + 1 trigrams of the query find every match; without statistics the
+        # inner trigrams are preferred, the padded ones at the edges are more common
+        chosen = sorted(
+            grams, key=lambda gram: (gram[0] == " " or gram[-1] == " ", gram)
+        )
+        # a title within d edits also shares all but 3d of the query trigrams and
+        # differs in length by at most d, which the server checks before grouping
+        shared = {"$size": {"$setIntersection": ["$title_trigrams", sorted(grams)]}}
+        length = {"$strLenCP": "$title_normalized"}
+        pipeline = [
+            {"$match": {"title_trigrams": {"$in": chosen[: 3 * max_distance + 1]}}},
+            {
+                "$match": {
+                    "$expr": {
+                        "$and": [
+                            {"$gte": [shared, len(grams) - 3 * max_distance]},
+                            {"$gte": [length, len(normalized) - max_distance]},
+                            {"$lte": [length, len(normalized) + max_distance]},
+                        ]
+                    }
+                }
+            },
+            {"$group": {"_id": "$title_normalized"}},
+            # one more than the cap tells a complete result from a truncated one
+            {"$limit": FUZZY_CANDIDATES + 1},
+        ]
+        candidates = await self._movies.aggregate(pipeline).to_list(None)
+        if len(candidates) > FUZZY_CANDIDATES:
+            raise RepositoryException(
+                f"title {title} is too close to more than {FUZZY_CANDIDATES} "
+                "titles, use a longer one"
             )
-        return return_value
+        distances = {}
+        for candidate in candidates:
+            distance = bounded_levenshtein(normalized, candidate["_id"], max_distance)
+            if distance is not None:
+                distances[candidate["_id"]] = distance
+        if not distances:
+            return []
+        movies = await self._find_movies(
+            {"title_normalized": {"$in": list(distances)}}, sort=_PREFIX_SORT
+        )
+        # the sort is stable, so titles at the same distance stay in index order
+        movies.sort(key=lambda movie: distances[normalize_title(movie.title)])
+        return movies[skip : skip + limit if limit else None]
+
+    async def autocomplete_titles(
+        self, prefix: str, limit: int = 10
+    ) -> typing.List[TitleSuggestion]:
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+        pipeline = [
+            {"$match": _prefix_query(prefix)},
+            {"$sort": {"title_normalized": 1}},
+            # titles are grouped before the window is cut, so the count of a popular
+            # title is not capped by its copies filling the window
+            {
+                "$group": {
+                    "_id": "$title_normalized",
+                    "title": {"$first": "$title"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$sort": {"_id": 1}},
+            {"$limit": AUTOCOMPLETE_CANDIDATES},
+        ]
+        candidates = await self._movies.aggregate(pipeline).to_list(None)
+        candidates.sort(key=lambda c: suggestion_rank(prefix, c["_id"], c["count"]))
+        return [
+            TitleSuggestion(title=candidate["title"], count=candidate["count"])
+            for candidate in candidates[:limit]
+        ]
+
+    async def get_by_release_year_range(
+        self, start: int, end: int, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        return await self._find_movies(
+            {"release_year": {"$gte": start, "$lte": end}},
+            sort=[("release_year", 1), ("id", 1)],
+            skip=skip,
+            limit=limit,
+        )
+
+    def iter_by_release_year_range(
+        self, start: int, end: int, skip: int = 0, limit: int = 1000
+    ) -> typing.AsyncIterator[Movie]:
+        return self._iter_movies(
+            {"release_year": {"$gte": start, "$lte": end}},
+            sort=[("release_year", 1), ("id", 1)],
+            skip=skip,
+            limit=limit,
+        )
 
     # async def update(self, movie_id: str, update_parameteres: dict):
     #     if id in update_parameteres.keys():
@@ -93,14 +686,255 @@ class MongoMovieRepository(MovieRepository):
     async def update(self, movie_id: str, update_parameteres: dict):
         if "id" in update_parameteres.keys():
             raise RepositoryException("can't update movie id.")
-        result = await self._movies.update_one(
-            {"id": movie_id}, {"$set": update_parameteres}
+        before = await self._movies.find_one_and_update(
+            {"id": movie_id},
+            _update_update(update_parameteres),
+            projection=STATS_PROJECTION,
+            return_document=ReturnDocument.BEFORE,
         )
-        if result.modified_count == 0:
+        if before is None:
             raise RepositoryException(f"movie: {movie_id} not updated")
+        delta = collections.Counter()
+        _count(delta, before, -1)
+        _count(delta, _updated_fields(before, update_parameteres), 1)
+        await self._update_stats(delta)
 
     # async def delete(self, movie_id: str):
     #   await self._movies.delete_one({"id": movie_id})
 
     async def delete(self, movie_id: str):
-        await self._movies.delete_one({"id": movie_id})
+        # a movie claimed by a bulk delete is removed and uncounted by it
+        before = await self._movies.find_one_and_delete(
+            {"id": movie_id, **_unclaimed(time.time())}, projection=STATS_PROJECTION
+        )
+        delta = collections.Counter()
+        _count(delta, before, -1)
+        await self._update_stats(delta)
+
+    async def _bulk_write(
+        self, operations: list, movie_ids: typing.List[str], ordered: bool
+    ) -> typing.List[BulkItemResult]:
+        """Runs the operations, one per movie id, and reports the outcome of each."""
+        errors: typing.Dict[int, str] = {}
+        if operations:
+            try:
+                await self._movies.bulk_write(operations, ordered=ordered)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    errors[error["index"]] = error.get("errmsg", "write failed")
+        first_error = min(errors, default=len(operations))
+        results = []
+        for position, movie_id in enumerate(movie_ids):
+            if position in errors:
+                results.append(BulkItemResult(movie_id, False, errors[position]))
+            elif ordered and position > first_error:
+                results.append(BulkItemResult(movie_id, False, NOT_PROCESSED))
+            else:
+                results.append(BulkItemResult(movie_id, True))
+        return results
+
+    async def create_many(
+        self, movies: typing.List[Movie], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        current = await self._existing([movie.id for movie in movies])
+        operations = [
+            UpdateOne({"id": movie.id}, _create_update(movie), upsert=True)
+            for movie in movies
+        ]
+        results = await self._bulk_write(
+            operations, [movie.id for movie in movies], ordered
+        )
+        delta = collections.Counter()
+        for movie, result in zip(movies, results):
+            if result.ok:
+                _count(delta, current.get(movie.id), -1)
+                current[movie.id] = _stats_fields(movie)
+                _count(delta, current[movie.id], 1)
+        await self._update_stats(delta)
+        return results
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        movies = {
+            movie.id: movie
+            for movie in await self._find_movies({"id": {"$in": list(set(movie_ids))}})
+        }
+        return [movies.get(movie_id) for movie_id in movie_ids]
+
+    async def get_many_versioned(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[VersionedMovie]]:
+        documents_cursor = self._movies.find(
+            {"id": {"$in": list(set(movie_ids))}}, {**MOVIE_PROJECTION, "version": 1}
+        ).batch_size(MAX_READ_BATCH_SIZE)
+        versioned = {
+            document["id"]: VersionedMovie(
+                movie=Movie.from_document(document),
+                version=document.get("version", 0),
+            )
+            async for document in documents_cursor
+        }
+        return [versioned.get(movie_id) for movie_id in movie_ids]
+
+    async def _existing(self, movie_ids: typing.List[str]) -> typing.Dict[str, dict]:
+        """
+        Returns the statistics fields of the movies which exist, by id. They are the
+        before-images the statistics of a bulk write are computed from.
+        """
+        documents_cursor = self._movies.find(
+            {"id": {"$in": list(set(movie_ids))}}, STATS_PROJECTION
+        )
+        return {document["id"]: document async for document in documents_cursor}
+
+    async def _claimed(
+        self, movie_ids: typing.List[str], token: str
+    ) -> typing.Dict[str, dict]:
+        """
+        Returns the statistics fields and versions of the movies claimed with the
+        token by a bulk delete which it has not removed yet, by id.
+        """
+        documents_cursor = self._movies.find(
+            {"id": {"$in": movie_ids}, "deleting.token": token},
+            {**STATS_PROJECTION, "version": 1},
+        )
+        return {document["id"]: document async for document in documents_cursor}
+
+    async def update_many(
+        self, updates: typing.List[typing.Tuple[str, dict]], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        existing = await self._existing([movie_id for movie_id, _ in updates])
+        results: typing.List[typing.Optional[BulkItemResult]] = []
+        operations, positions = [], []
+        failed = False
+        for movie_id, update_parameteres in updates:
+            if failed and ordered:
+                results.append(BulkItemResult(movie_id, False, NOT_PROCESSED))
+            elif "id" in update_parameteres:
+                failed = True
+                results.append(
+                    BulkItemResult(movie_id, False, "can't update movie id.")
+                )
+            elif movie_id not in existing:
+                failed = True
+                results.append(
+                    BulkItemResult(movie_id, False, f"movie: {movie_id} not found")
+                )
+            else:
+                positions.append(len(results))
+                results.append(None)
+                operations.append(
+                    UpdateOne({"id": movie_id}, _update_update(update_parameteres))
+                )
+        written = await self._bulk_write(
+            operations, [updates[position][0] for position in positions], ordered
+        )
+        delta = collections.Counter()
+        for position, result in zip(positions, written):
+            results[position] = result
+            if result.ok:
+                movie_id, update_parameteres = updates[position]
+                _count(delta, existing[movie_id], -1)
+                existing[movie_id] = _updated_fields(
+                    existing[movie_id], update_parameteres
+                )
+                _count(delta, existing[movie_id], 1)
+        await self._update_stats(delta)
+        return results
+
+    async def delete_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[BulkItemResult]:
+        # the movies are claimed with a token first, so when concurrent requests
+        # delete the same movie only the one which claimed it updates the statistics
+        unique_ids = list(dict.fromkeys(movie_ids))
+        token = secrets.token_hex(16)
+        now = time.time()
+        await self._movies.update_many(
+            {"id": {"$in": unique_ids}, **_unclaimed(now)},
+            {"$set": {"deleting": {"token": token, "expires": now + DELETE_CLAIM_TTL}}},
+        )
+        deleted: typing.Dict[str, dict] = {}
+        claimed = await self._claimed(unique_ids, token)
+        while claimed:
+            # each movie is removed only at the version its statistics were read at
+            removed = await self._movies.delete_many(
+                {
+                    "$or": [
+                        {"id": movie_id, "version": document.get("version")}
+                        for movie_id, document in claimed.items()
+                    ]
+                }
+            )
+            remaining = {}
+            if removed.deleted_count < len(claimed):
+                # writes changed some of the movies since, they are read again
+                remaining = await self._claimed(list(claimed), token)
+            for movie_id, document in claimed.items():
+                if movie_id not in remaining:
+                    deleted[movie_id] = document
+            claimed = remaining
+        delta = collections.Counter()
+        for document in deleted.values():
+            _count(delta, document, -1)
+        await self._update_stats(delta)
+        results = []
+        for movie_id in movie_ids:
+            if movie_id in deleted:
+                results.append(BulkItemResult(movie_id, True))
+                # a repeated id is only deleted once
+                del deleted[movie_id]
+            else:
+                results.append(
+                    BulkItemResult(movie_id, False, f"movie: {movie_id} not found")
+                )
+        return results
+
+    async def get_stats(self) -> CatalogStats:
+        document = await self._stats.find_one({"_id": STATS_ID}) or {}
+        by_release_year = {
+            int(year): count
+            for year, count in document.get("by_release_year", {}).items()
+            if count
+        }
+        return CatalogStats(
+            total=document.get("total", 0),
+            watched=document.get("watched", 0),
+            by_release_year=dict(sorted(by_release_year.items())),
+        )
+
+    async def recompute_stats(self) -> bool:
+        """
+        Recomputes the statistics with a scan of the movies, stores them and returns
+        whether the maintained ones were accurate. They drift if a write fails
+        between the movie and the statistics updates, or if bulk updates race on the
+        same movies. Writes running during the recompute can be lost from the
+        counters, so run it when the catalog is quiet.
+        """
+        pipeline = [
+            {
+                "$group": {
+                    "_id": "$release_year",
+                    "count": {"$sum": 1},
+                    "watched": {"$sum": {"$cond": ["$watched", 1, 0]}},
+                }
+            }
+        ]
+        total, watched, by_release_year = 0, 0, {}
+        async for group in self._movies.aggregate(pipeline):
+            total += group["count"]
+            watched += group["watched"]
+            by_release_year[str(group["_id"])] = group["count"]
+        stored = await self.get_stats()
+        await self._stats.replace_one(
+            {"_id": STATS_ID},
+            {"total": total, "watched": watched, "by_release_year": by_release_year},
+            upsert=True,
+        )
+        accurate = stored == await self.get_stats()
+        if not accurate:
+            logger.warning("the catalog statistics had drifted and were recomputed")
+        return accurate
+
+    async def close(self):
+        self._client.close()
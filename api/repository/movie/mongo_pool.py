@@ -0,0 +1,82 @@
+"""This module publishes the events of the MongoDB connection pools as Prometheus metrics."""
+
+import threading
+import time
+
+from pymongo import monitoring
+
+from api.metrics import (
+    MONGO_POOL_CHECKOUT_WAIT,
+    MONGO_POOL_CHECKOUTS,
+    MONGO_POOL_CONNECTIONS,
+    MONGO_POOL_IN_USE,
+    MONGO_POOL_MAX_SIZE,
+)
+
+
+def _address(address) -> str:
+    host, port = address
+    return f"{host}:{port}"
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener maintaining the movie_tracker_mongo_pool_* metrics.
+    The driver calls it synchronously on the thread checking the connection out,
+    so the wait of a checkout is timed with a thread local start time.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def pool_created(self, event):
+        max_pool_size = event.options.get("maxPoolSize")
+        if max_pool_size is not None:
+            MONGO_POOL_MAX_SIZE.labels(address=_address(event.address)).set(
+                max_pool_size
+            )
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        address = _address(event.address)
+        MONGO_POOL_CONNECTIONS.labels(address=address).set(0)
+        MONGO_POOL_IN_USE.labels(address=address).set(0)
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(address=_address(event.address)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(address=_address(event.address)).dec()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        address = _address(event.address)
+        self._observe_wait(address)
+        MONGO_POOL_CHECKOUTS.labels(address=address, outcome=event.reason).inc()
+
+    def connection_checked_out(self, event):
+        address = _address(event.address)
+        self._observe_wait(address)
+        MONGO_POOL_CHECKOUTS.labels(address=address, outcome="ok").inc()
+        MONGO_POOL_IN_USE.labels(address=address).inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_IN_USE.labels(address=_address(event.address)).dec()
+
+    def _observe_wait(self, address: str):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(address=address).observe(
+                time.perf_counter() - started
+            )
+            self._local.started = None
@@ -0,0 +1,29 @@
+"""This module contains the opaque continuation cursors used for keyset pagination."""
+
+import base64
+import binascii
+import json
+import typing
+
+from api.repository.movie.abstractions import RepositoryException
+
+
+def encode_cursor(*key) -> str:
+    """Encodes the sort key of the last returned item into an opaque cursor."""
+    payload = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> typing.List:
+    """
+    Decodes a cursor made by encode_cursor into its sort key of length values.
+    Raises RepositoryException for malformed cursors.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(payload)
+    except (binascii.Error, ValueError) as e:
+        raise RepositoryException(f"invalid cursor {cursor}") from e
+    if not isinstance(key, list) or len(key) != length:
+        raise RepositoryException(f"invalid cursor {cursor}")
+    return key
@@ -0,0 +1,336 @@
+"""
+This module contains the durable storage used by the in-memory repository: a compact binary
+encoding of movies, an append-only mutation log and snapshots of the whole catalog.
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import re
+import struct
+import typing
+import zlib
+
+from api.entities.movies import Movie
+from api.repository.movie.abstractions import RepositoryException
+
+# id length, title length, description length, release year, flags
+_MOVIE_HEADER = struct.Struct("<HHIiB")
+# Bits of the flags byte. Stored documents may lack a field, which is encoded as a
+# flag so it decodes back to None rather than to an empty value.
+_WATCHED = 1
+_NO_TITLE = 2
+_NO_DESCRIPTION = 4
+_NO_RELEASE_YEAR = 8
+# crc32 of the payload, payload length
+_RECORD_HEADER = struct.Struct("<II")
+# magic, generation, number of movies, crc32 of the body
+_SNAPSHOT_HEADER = struct.Struct("<8sQQI")
+_SNAPSHOT_MAGIC = b"MVSNAP01"
+
+_FILE_NAME = re.compile(r"^(snapshot|journal)-(\d+)\.(bin|log)$")
+
+_PUT = b"P"
+_DELETE = b"D"
+
+logger = logging.getLogger(__name__)
+
+
+def encode_movie(movie: Movie) -> bytes:
+    """Encodes a movie into its compact binary form."""
+    movie_id = movie.id.encode()
+    flags = _WATCHED if movie.watched else 0
+    title = b""
+    if movie.title is None:
+        flags |= _NO_TITLE
+    else:
+        title = movie.title.encode()
+    description = b""
+    if movie.description is None:
+        flags |= _NO_DESCRIPTION
+    else:
+        description = movie.description.encode()
+    release_year = 0
+    if movie.release_year is None:
+        flags |= _NO_RELEASE_YEAR
+    else:
+        release_year = movie.release_year
+    return (
+        _MOVIE_HEADER.pack(
+            len(movie_id), len(title), len(description), release_year, flags
+        )
+        + movie_id
+        + title
+        + description
+    )
+
+
+def _fsync_and_close(fd: int):
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def decode_movie(buffer, offset: int = 0) -> typing.Tuple[Movie, int]:
+    """Decodes a movie encoded by encode_movie at offset, returns it and the end offset."""
+    id_length, title_length, description_length, release_year, flags = (
+        _MOVIE_HEADER.unpack_from(buffer, offset)
+    )
+    start = offset + _MOVIE_HEADER.size
+    title_start = start + id_length
+    description_start = title_start + title_length
+    end = description_start + description_length
+    movie = Movie(
+        movie_id=str(buffer[start:title_start], "utf-8"),
+        title=(
+            None
+            if flags & _NO_TITLE
+            else str(buffer[title_start:description_start], "utf-8")
+        ),
+        description=(
+            None
+            if flags & _NO_DESCRIPTION
+            else str(buffer[description_start:end], "utf-8")
+        ),
+        release_year=None if flags & _NO_RELEASE_YEAR else release_year,
+        watched=bool(flags & _WATCHED),
+    )
+    return movie, end
+
+
+class MovieJournal:
+    """
+    Durable state of an in-memory movie catalog kept in a directory.
+
+    Mutations are appended to a log file and fsynced in batches: once
+    fsync_batch_size records are pending or fsync_interval seconds after the first
+    pending record, whichever comes first. Appends made on an event loop arm a loop
+    timer for the interval, so a quiet catalog still syncs its last records on time,
+    and the fsync runs on the default executor rather than blocking the loop.
+    Records only count as synced once their fsync returns, so flush, rotate and
+    close fsync again whatever a running sync has not finished with. Outside of an
+    event loop every append syncs inline. Records not yet synced may be lost
+    on a crash. Torn records at the end of the log are detected by their checksum
+    and dropped on load.
+
+    Logs and snapshots are numbered by generation. Starting a snapshot switches the
+    appends to the log of the next generation, the snapshot of that generation then
+    holds everything logged before it and the older files are removed once it is
+    durable. Loading memory maps the latest snapshot and replays the logs from its
+    generation on.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        fsync_batch_size: int = 128,
+        fsync_interval: float = 0.05,
+    ):
+        self._directory = directory
+        self._fsync_batch_size = fsync_batch_size
+        self._fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+        self._generation = max(
+            [generation for _, generation in self._files()], default=0
+        )
+        self._log = None
+        # records appended to the log, and how many of them are known to be durable
+        self._appended = 0
+        self._synced = 0
+        self._timer: typing.Optional[asyncio.TimerHandle] = None
+        self._syncing: typing.Optional[asyncio.Task] = None
+        self.pending_records = 0
+
+    def _path(self, kind: str, generation: int) -> str:
+        extension = "bin" if kind == "snapshot" else "log"
+        return os.path.join(self._directory, f"{kind}-{generation:012d}.{extension}")
+
+    def _files(self) -> typing.List[typing.Tuple[str, int]]:
+        """Returns the (kind, generation) of the snapshots and logs in the directory."""
+        files = []
+        for name in os.listdir(self._directory):
+            match = _FILE_NAME.match(name)
+            if match:
+                files.append((match.group(1), int(match.group(2))))
+        return sorted(files, key=lambda file: file[1])
+
+    def _open_log(self):
+        if self._log is None:
+            self._log = open(self._path("journal", self._generation), "ab")
+
+    def _load_snapshot(self, generation: int, movies: typing.Dict[str, Movie]):
+        with open(self._path("snapshot", generation), "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                magic, _, count, checksum = _SNAPSHOT_HEADER.unpack_from(buffer, 0)
+                with memoryview(buffer) as view:
+                    with view[_SNAPSHOT_HEADER.size :] as body:
+                        valid = zlib.crc32(body) == checksum
+                    if magic != _SNAPSHOT_MAGIC or not valid:
+                        raise RepositoryException(
+                            f"corrupt movie snapshot in {self._directory}"
+                        )
+                    offset = _SNAPSHOT_HEADER.size
+                    for _ in range(count):
+                        movie, offset = decode_movie(view, offset)
+                        movies[movie.id] = movie
+
+    def _replay_log(self, generation: int, movies: typing.Dict[str, Movie]) -> int:
+        """Applies the records of a log and returns how many were applied."""
+        path = self._path("journal", generation)
+        with open(path, "rb") as file:
+            data = file.read()
+        offset = 0
+        records = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            checksum, length = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            payload = data[start : start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            if payload[:1] == _PUT:
+                movie, _ = decode_movie(payload, 1)
+                movies[movie.id] = movie
+            else:
+                movies.pop(payload[1:].decode(), None)
+            offset = start + length
+            records += 1
+        if offset < len(data):
+            # drop the torn tail so new records are not appended after garbage
+            with open(path, "r+b") as file:
+                file.truncate(offset)
+        return records
+
+    def load(self) -> typing.Dict[str, Movie]:
+        """Returns the stored catalog by movie id."""
+        movies: typing.Dict[str, Movie] = {}
+        files = self._files()
+        snapshots = [generation for kind, generation in files if kind == "snapshot"]
+        first_log = 0
+        if snapshots:
+            first_log = snapshots[-1]
+            self._load_snapshot(first_log, movies)
+        for kind, generation in files:
+            if kind == "journal" and generation >= first_log:
+                self.pending_records += self._replay_log(generation, movies)
+        return movies
+
+    def _append(self, payload: bytes):
+        self._open_log()
+        self._log.write(_RECORD_HEADER.pack(zlib.crc32(payload), len(payload)))
+        self._log.write(payload)
+        self._appended += 1
+        self.pending_records += 1
+        if self._appended - self._synced >= self._fsync_batch_size:
+            self._request_sync(0.0)
+        elif self._timer is None:
+            self._request_sync(self._fsync_interval)
+
+    def _request_sync(self, delay: float):
+        """Syncs the pending records within delay seconds."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # no timer can be armed, so the records are synced right away
+            self.flush()
+            return
+        if self._timer is not None:
+            if delay > 0:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._start_sync, loop)
+
+    def _start_sync(self, loop: asyncio.AbstractEventLoop):
+        self._timer = None
+        # a running sync picks up the records appended meanwhile
+        if self._syncing is None:
+            self._syncing = loop.create_task(self._sync(loop))
+
+    async def _sync(self, loop: asyncio.AbstractEventLoop):
+        """Syncs the pending records until none are left, fsyncing on the executor."""
+        try:
+            while self._log is not None and self._synced < self._appended:
+                appended = self._appended
+                self._log.flush()
+                # a duplicate stays valid if rotate or close closes the log meanwhile
+                await loop.run_in_executor(
+                    None, _fsync_and_close, os.dup(self._log.fileno())
+                )
+                self._synced = max(self._synced, appended)
+        except OSError as e:
+            logger.error("could not sync the movie journal: %s", e)
+        finally:
+            self._syncing = None
+
+    def append_put(self, movie: Movie):
+        """Logs that the movie was created or replaced."""
+        self._append(_PUT + encode_movie(movie))
+
+    def append_delete(self, movie_id: str):
+        """Logs that the movie was deleted."""
+        self._append(_DELETE + movie_id.encode())
+
+    def flush(self):
+        """
+        Writes and fsyncs the pending log records on the calling thread, including
+        those a running sync has not fsynced yet.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._log is not None and self._synced < self._appended:
+            appended = self._appended
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._synced = appended
+
+    def rotate(self) -> int:
+        """
+        Starts the log of the next generation and returns it. The snapshot of that
+        generation must contain every mutation logged so far.
+        """
+        self.flush()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self._generation += 1
+        self._open_log()
+        self.pending_records = 0
+        return self._generation
+
+    def write_snapshot(self, generation: int, movies: typing.Iterable[Movie]):
+        """Durably writes the snapshot of a generation returned by rotate and removes
+        the files it supersedes. Safe to run on a worker thread."""
+        path = self._path("snapshot", generation)
+        body = bytearray()
+        count = 0
+        for movie in movies:
+            body += encode_movie(movie)
+            count += 1
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(
+                _SNAPSHOT_HEADER.pack(
+                    _SNAPSHOT_MAGIC, generation, count, zlib.crc32(body)
+                )
+            )
+            file.write(body)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+        directory = os.open(self._directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        for kind, older in self._files():
+            if older < generation:
+                os.remove(self._path(kind, older))
+
+    def close(self):
+        """Flushes and closes the log."""
+        self.flush()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
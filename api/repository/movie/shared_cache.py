@@ -0,0 +1,362 @@
+"""
+This module contains a movie cache in a memory-mapped file shared by the worker processes
+of a host, and the repository serving the reads by id from it.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+import typing
+import zlib
+
+from api.entities.movies import Movie
+from api.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+from api.repository.movie.abstractions import (
+    BulkItemResult,
+    MovieRepository,
+    RepositoryException,
+    VersionedMovie,
+)
+from api.repository.movie.delegating import DelegatingMovieRepository
+from api.repository.movie.persistence import decode_movie, encode_movie
+
+# magic, number of slots, size of a slot
+_FILE_HEADER = struct.Struct("<8sQI")
+_FILE_MAGIC = b"MVCACHE2"
+# the slots start on a cache line after the file header
+_SLOTS_OFFSET = 64
+# sequence, expiry, key hash, version + 1 or 0 if unknown, payload length, crc32 of
+# the version and the payload
+_SLOT_HEADER = struct.Struct("<QdQQII")
+_SEQUENCE = struct.Struct("<Q")
+_VERSION = struct.Struct("<Q")
+# Reads retried while a writer is changing the slot before reporting a miss.
+READ_ATTEMPTS = 3
+
+
+def default_cache_path() -> str:
+    """Returns the cache file path of the host, in memory backed /dev/shm if present."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "movie-tracker-cache")
+
+
+def _checksum(stored_version: int, payload: bytes) -> int:
+    return zlib.crc32(payload, zlib.crc32(_VERSION.pack(stored_version)))
+
+
+def key_hash(movie_id: str) -> int:
+    """
+    Returns the 64 bit hash of a movie id. Every process must agree on it, so the
+    randomized built-in hash() of strings cannot be used.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(movie_id.encode(), digest_size=8).digest(), "little"
+    )
+
+
+class SharedMovieCache:
+    """
+    A direct mapped table of movies in a memory-mapped file. Every process opening
+    the same file shares the table.
+
+    A movie lives in the slot its id hashes to, encoded with encode_movie, with its
+    expiry as a wall clock time and its version if it was read with one. Movies
+    whose encoding does not fit in a slot are not cached, and a movie replaces
+    whatever occupies its slot.
+
+    Every slot is guarded by a sequence lock: writers, serialized across processes
+    by an exclusive flock on the file, make the sequence odd, change the slot, and
+    make it even again. Readers take no lock; they copy the slot and retry if the
+    sequence was odd or changed meanwhile. A crc32 of the version and the payload
+    also rejects torn copies on CPUs which reorder the stores.
+
+    The sequence of a slot also serves as a stamp: store only writes if the slot was
+    not changed since the stamp was taken, so a read which raced an invalidation
+    never caches the movie it read.
+    """
+
+    def __init__(self, path: str, slots: int = 65_536, slot_size: int = 1024):
+        if slot_size <= _SLOT_HEADER.size:
+            raise ValueError(f"slot size must exceed {_SLOT_HEADER.size} bytes")
+        self._slots = slots
+        self._slot_size = slot_size
+        self._capacity = slot_size - _SLOT_HEADER.size
+        size = _SLOTS_OFFSET + slots * slot_size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with self._locked():
+                header = os.pread(self._fd, _FILE_HEADER.size, 0)
+                if not header:
+                    # a new file reads as zeros: every slot is empty
+                    os.ftruncate(self._fd, size)
+                    os.pwrite(
+                        self._fd, _FILE_HEADER.pack(_FILE_MAGIC, slots, slot_size), 0
+                    )
+                elif header != _FILE_HEADER.pack(_FILE_MAGIC, slots, slot_size):
+                    raise RepositoryException(
+                        f"shared cache {path} has another layout, remove it or use "
+                        "another path"
+                    )
+            self._map = mmap.mmap(self._fd, size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    @contextlib.contextmanager
+    def _locked(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _offset(self, key: int) -> int:
+        return _SLOTS_OFFSET + (key % self._slots) * self._slot_size
+
+    def get(
+        self, movie_id: str, now: typing.Optional[float] = None
+    ) -> typing.Optional[Movie]:
+        """Returns the cached movie, or None if it is not cached or expired."""
+        entry = self.get_entry(movie_id, now)
+        return None if entry is None else entry[0]
+
+    def get_entry(
+        self, movie_id: str, now: typing.Optional[float] = None
+    ) -> typing.Optional[typing.Tuple[Movie, typing.Optional[int]]]:
+        """
+        Returns the cached movie and its version, None if the version is unknown, or
+        None if the movie is not cached or expired.
+        """
+        now = time.time() if now is None else now
+        key = key_hash(movie_id)
+        offset = self._offset(key)
+        for _ in range(READ_ATTEMPTS):
+            sequence, expiry, slot_key, stored_version, length, crc = (
+                _SLOT_HEADER.unpack_from(self._map, offset)
+            )
+            if sequence & 1:
+                continue
+            if slot_key != key or length == 0 or expiry <= now:
+                return None
+            if length > self._capacity:
+                continue
+            start = offset + _SLOT_HEADER.size
+            payload = self._map[start : start + length]
+            if _SEQUENCE.unpack_from(self._map, offset)[0] != sequence:
+                continue
+            if _checksum(stored_version, payload) != crc:
+                continue
+            movie, _ = decode_movie(payload)
+            # two ids with the same hash share the slot
+            if movie.id != movie_id:
+                return None
+            return movie, stored_version - 1 if stored_version else None
+        return None
+
+    def stamp(self, movie_id: str) -> int:
+        """Returns the stamp store needs to cache the movie read after taking it."""
+        return _SEQUENCE.unpack_from(self._map, self._offset(key_hash(movie_id)))[0]
+
+    def _write_slot(self, offset: int, sequence: int, fields: tuple, payload: bytes):
+        # a writer which died mid-write left the sequence odd, | 1 recovers the slot
+        writing = sequence | 1
+        _SEQUENCE.pack_into(self._map, offset, writing)
+        _SLOT_HEADER.pack_into(self._map, offset, writing, *fields)
+        start = offset + _SLOT_HEADER.size
+        self._map[start : start + len(payload)] = payload
+        _SEQUENCE.pack_into(self._map, offset, writing + 1)
+
+    def store(
+        self,
+        movie: Movie,
+        stamp: int,
+        ttl: float,
+        version: typing.Optional[int] = None,
+    ) -> bool:
+        """
+        Caches the movie, with its version if known, for ttl seconds unless its slot
+        changed since the stamp was taken or its encoding does not fit. Returns
+        whether it was cached.
+        """
+        payload = encode_movie(movie)
+        if len(payload) > self._capacity:
+            return False
+        key = key_hash(movie.id)
+        offset = self._offset(key)
+        stored_version = 0 if version is None else version + 1
+        with self._locked():
+            sequence, expiry, slot_key, _, length, _ = _SLOT_HEADER.unpack_from(
+                self._map, offset
+            )
+            if sequence != stamp:
+                return False
+            if length and slot_key != key and expiry > time.time():
+                CACHE_EVICTIONS.labels(cache="shared_movie", reason="collision").inc()
+            fields = (
+                time.time() + ttl,
+                key,
+                stored_version,
+                len(payload),
+                _checksum(stored_version, payload),
+            )
+            self._write_slot(offset, sequence, fields, payload)
+        return True
+
+    def invalidate(self, movie_ids: typing.Iterable[str]):
+        """Empties the slots of the movies, and so invalidates their stamps."""
+        with self._locked():
+            for offset in sorted({self._offset(key_hash(i)) for i in movie_ids}):
+                sequence = _SEQUENCE.unpack_from(self._map, offset)[0]
+                self._write_slot(offset, sequence, (0.0, 0, 0, 0, 0), b"")
+
+    def close(self):
+        """Unmaps the file, the table stays for the other processes."""
+        self._map.close()
+        os.close(self._fd)
+
+
+class SharedCachingMovieRepository(DelegatingMovieRepository):
+    """
+    Serves get_by_id, get_versioned, get_version and the bulk reads from a
+    SharedMovieCache, so every worker process of the host reads a hot movie from the
+    wrapped repository once per ttl seconds rather than once per process. Movies
+    read with a versioned read are cached with their version in the same slot, so
+    conditional reads are answered from the cache too. Writes made through any of the workers invalidate
+    the entries of their movies once the wrapped repository acknowledged them;
+    writes made by other hosts are seen once the entries expire.
+    """
+
+    def __init__(self, inner: MovieRepository, cache: SharedMovieCache, ttl: float):
+        super().__init__(inner)
+        self._cache = cache
+        self._ttl = ttl
+
+    def _lookup(
+        self, movie_id: str, versioned: bool = False
+    ) -> typing.Optional[typing.Tuple[Movie, typing.Optional[int]]]:
+        """Returns the cached (movie, version), a miss if versioned and no version is cached."""
+        entry = self._cache.get_entry(movie_id)
+        if entry is None or (versioned and entry[1] is None):
+            CACHE_MISSES.labels(cache="shared_movie").inc()
+            return None
+        CACHE_HITS.labels(cache="shared_movie").inc()
+        return entry
+
+    async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
+        entry = self._lookup(movie_id)
+        if entry is not None:
+            return entry[0]
+        stamp = self._cache.stamp(movie_id)
+        movie = await self._inner.get_by_id(movie_id)
+        if movie is not None:
+            self._cache.store(movie, stamp, self._ttl)
+        return movie
+
+    async def get_versioned(self, movie_id: str) -> typing.Optional[VersionedMovie]:
+        entry = self._lookup(movie_id, versioned=True)
+        if entry is not None:
+            return VersionedMovie(*entry)
+        stamp = self._cache.stamp(movie_id)
+        versioned = await self._inner.get_versioned(movie_id)
+        if versioned is not None:
+            self._cache.store(versioned.movie, stamp, self._ttl, versioned.version)
+        return versioned
+
+    async def get_version(self, movie_id: str) -> typing.Optional[int]:
+        entry = self._lookup(movie_id, versioned=True)
+        if entry is not None:
+            return entry[1]
+        return await self._inner.get_version(movie_id)
+
+    async def get_many_versioned(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[VersionedMovie]]:
+        cached = {}
+        for movie_id in movie_ids:
+            entry = self._lookup(movie_id, versioned=True)
+            if entry is not None:
+                cached[movie_id] = VersionedMovie(*entry)
+        missing = [movie_id for movie_id in movie_ids if movie_id not in cached]
+        if missing:
+            stamps = {movie_id: self._cache.stamp(movie_id) for movie_id in missing}
+            for versioned in await self._inner.get_many_versioned(missing):
+                if versioned is not None:
+                    movie_id = versioned.movie.id
+                    cached[movie_id] = versioned
+                    self._cache.store(
+                        versioned.movie, stamps[movie_id], self._ttl, versioned.version
+                    )
+        return [cached.get(movie_id) for movie_id in movie_ids]
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        cached = {}
+        for movie_id in movie_ids:
+            entry = self._lookup(movie_id)
+            if entry is not None:
+                cached[movie_id] = entry[0]
+        missing = [movie_id for movie_id in movie_ids if movie_id not in cached]
+        if missing:
+            stamps = {movie_id: self._cache.stamp(movie_id) for movie_id in missing}
+            for movie in await self._inner.get_many(missing):
+                if movie is not None:
+                    cached[movie.id] = movie
+                    self._cache.store(movie, stamps[movie.id], self._ttl)
+        return [cached.get(movie_id) for movie_id in movie_ids]
+
+    # Created movies are not written through: a write of another process may land
+    # between the create and the store, and only reads can be checked with a stamp.
+
+    async def create(self, movie: Movie) -> bool:
+        try:
+            return await self._inner.create(movie)
+        finally:
+            self._cache.invalidate([movie.id])
+
+    async def delete(self, movie_id: str):
+        try:
+            return await self._inner.delete(movie_id)
+        finally:
+            self._cache.invalidate([movie_id])
+
+    async def update(self, movie_id: str, update_parameteres: dict):
+        try:
+            return await self._inner.update(movie_id, update_parameteres)
+        finally:
+            self._cache.invalidate([movie_id])
+
+    async def create_many(
+        self, movies: typing.List[Movie], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        try:
+            return await self._inner.create_many(movies, ordered=ordered)
+        finally:
+            self._cache.invalidate([movie.id for movie in movies])
+
+    async def update_many(
+        self, updates: typing.List[typing.Tuple[str, dict]], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        try:
+            return await self._inner.update_many(updates, ordered=ordered)
+        finally:
+            self._cache.invalidate([movie_id for movie_id, _ in updates])
+
+    async def delete_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[BulkItemResult]:
+        try:
+            return await self._inner.delete_many(movie_ids)
+        finally:
+            self._cache.invalidate(movie_ids)
+
+    async def close(self):
+        try:
+            await super().close()
+        finally:
+            self._cache.close()
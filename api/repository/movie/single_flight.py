@@ -0,0 +1,164 @@
+"""
+This module contains a repository sharing one backend call between concurrent identical reads.
+"""
+
+import asyncio
+import typing
+
+from api.entities.movies import Movie
+from api.metrics import SINGLE_FLIGHT_DEDUPLICATED
+from api.repository.movie.abstractions import (
+    BulkItemResult,
+    CursorPage,
+    MovieRepository,
+    VersionedMovie,
+)
+from api.repository.movie.delegating import DelegatingMovieRepository
+
+
+class SingleFlightMovieRepository(DelegatingMovieRepository):
+    """
+    Coalesces concurrent identical reads by id, with version, of the version, by title, by title after a cursor,
+    by title prefix, by fuzzy title, by release year range and full-text searches:
+    the first starts the backend call, the others wait for its result. A
+    write through the repository detaches the reads in flight, so a read starting
+    after a write never shares the result of a read started before it.
+    """
+
+    def __init__(self, inner: MovieRepository):
+        super().__init__(inner)
+        self._in_flight: typing.Dict[typing.Tuple, asyncio.Future] = {}
+
+    async def _coalesce(self, key: typing.Tuple, call: typing.Callable):
+        flight = self._in_flight.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(call())
+            self._in_flight[key] = flight
+            flight.add_done_callback(lambda _: self._land(key, flight))
+        else:
+            SINGLE_FLIGHT_DEDUPLICATED.labels(operation=key[0]).inc()
+        # a cancelled caller must not cancel the call the others wait for
+        return await asyncio.shield(flight)
+
+    def _land(self, key: typing.Tuple, flight: asyncio.Future):
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    def _detach(self):
+        self._in_flight.clear()
+
+    async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
+        return await self._coalesce(
+            ("get_by_id", movie_id), lambda: self._inner.get_by_id(movie_id)
+        )
+
+    async def get_versioned(self, movie_id: str) -> typing.Optional[VersionedMovie]:
+        return await self._coalesce(
+            ("get_versioned", movie_id), lambda: self._inner.get_versioned(movie_id)
+        )
+
+    async def get_version(self, movie_id: str) -> typing.Optional[int]:
+        return await self._coalesce(
+            ("get_version", movie_id), lambda: self._inner.get_version(movie_id)
+        )
+
+    async def get_by_title(
+        self, title: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        movies = await self._coalesce(
+            ("get_by_title", title, skip, limit),
+            lambda: self._inner.get_by_title(title, skip=skip, limit=limit),
+        )
+        # every caller gets its own list of the shared, immutable movies
+        return list(movies)
+
+    async def get_by_title_prefix(
+        self, prefix: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        movies = await self._coalesce(
+            ("get_by_title_prefix", prefix, skip, limit),
+            lambda: self._inner.get_by_title_prefix(prefix, skip=skip, limit=limit),
+        )
+        return list(movies)
+
+    async def get_by_title_after(
+        self, title: str, cursor: typing.Optional[str] = None, limit: int = 1000
+    ) -> CursorPage:
+        page = await self._coalesce(
+            ("get_by_title_after", title, cursor, limit),
+            lambda: self._inner.get_by_title_after(title, cursor=cursor, limit=limit),
+        )
+        return CursorPage(movies=list(page.movies), next_cursor=page.next_cursor)
+
+    async def get_by_title_fuzzy(
+        self, title: str, max_distance: int = 2, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        movies = await self._coalesce(
+            ("get_by_title_fuzzy", title, max_distance, skip, limit),
+            lambda: self._inner.get_by_title_fuzzy(
+                title, max_distance=max_distance, skip=skip, limit=limit
+            ),
+        )
+        return list(movies)
+
+    async def get_by_release_year_range(
+        self, start: int, end: int, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        movies = await self._coalesce(
+            ("get_by_release_year_range", start, end, skip, limit),
+            lambda: self._inner.get_by_release_year_range(
+                start, end, skip=skip, limit=limit
+            ),
+        )
+        return list(movies)
+
+    async def search(
+        self, query: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        movies = await self._coalesce(
+            ("search", query, skip, limit),
+            lambda: self._inner.search(query, skip=skip, limit=limit),
+        )
+        return list(movies)
+
+    async def create(self, movie: Movie) -> bool:
+        try:
+            return await self._inner.create(movie)
+        finally:
+            self._detach()
+
+    async def delete(self, movie_id: str):
+        try:
+            return await self._inner.delete(movie_id)
+        finally:
+            self._detach()
+
+    async def update(self, movie_id: str, update_parameteres: dict):
+        try:
+            return await self._inner.update(movie_id, update_parameteres)
+        finally:
+            self._detach()
+
+    async def create_many(
+        self, movies: typing.List[Movie], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        try:
+            return await self._inner.create_many(movies, ordered=ordered)
+        finally:
+            self._detach()
+
+    async def update_many(
+        self, updates: typing.List[typing.Tuple[str, dict]], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        try:
+            return await self._inner.update_many(updates, ordered=ordered)
+        finally:
+            self._detach()
+
+    async def delete_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[BulkItemResult]:
+        try:
+            return await self._inner.delete_many(movie_ids)
+        finally:
+            self._detach()
@@ -0,0 +1,66 @@
+"""This module contains frozen query results used to paginate over a consistent view."""
+
+import collections
+import secrets
+import time
+import typing
+
+from api.entities.movies import Movie
+from api.repository.movie.abstractions import RepositoryException
+
+
+class ResultSnapshots:
+    """
+    Holds frozen query results by an opaque token.
+
+    Repositories that never mutate stored movies can freeze a result by keeping the
+    references to the movies it contains: later writes replace movies in the live
+    store and leave the frozen ones untouched, which makes taking a snapshot a copy
+    on write of the result. Pages are then sliced from the frozen tuple.
+
+    Snapshots expire ttl seconds after they were taken and are garbage collected
+    whenever a snapshot is taken or read. At most max_snapshots are kept, the oldest
+    are dropped first.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_snapshots: int = 1024):
+        self._ttl = ttl
+        self._max_snapshots = max_snapshots
+        # token -> (expiry, query key, frozen result), ordered by expiry
+        self._snapshots: typing.OrderedDict[
+            str, typing.Tuple[float, typing.Hashable, typing.Tuple[Movie, ...]]
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def _collect(self, now: float):
+        while self._snapshots:
+            token, (expiry, _, _) = next(iter(self._snapshots.items()))
+            if expiry > now and len(self._snapshots) <= self._max_snapshots:
+                return
+            del self._snapshots[token]
+
+    def take(self, key: typing.Hashable, movies: typing.Iterable[Movie]) -> str:
+        """Freezes the result of the query identified by key and returns its token."""
+        now = time.monotonic()
+        token = secrets.token_urlsafe(16)
+        self._snapshots[token] = (now + self._ttl, key, tuple(movies))
+        self._collect(now)
+        return token
+
+    def page(
+        self, token: str, key: typing.Hashable, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        """
+        Returns a page of a frozen result.
+        Raises RepositoryException if the snapshot expired or belongs to another query.
+        """
+        self._collect(time.monotonic())
+        snapshot = self._snapshots.get(token)
+        if snapshot is None or snapshot[1] != key:
+            raise RepositoryException(f"snapshot {token} not found or expired")
+        movies = snapshot[2]
+        if limit == 0:
+            return list(movies[skip:])
+        return list(movies[skip : skip + limit])
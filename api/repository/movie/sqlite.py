@@ -0,0 +1,699 @@
+"""
+This module contains the implementation of the MovieRepository interface using SQLite
+"""
+
+import asyncio
+import concurrent.futures
+import sqlite3
+import time
+import typing
+
+from api.entities.movies import Movie
+from api.repository.movie.abstractions import (
+    NOT_PROCESSED,
+    BulkItemResult,
+    CatalogStats,
+    CursorPage,
+    MovieRepository,
+    RepositoryException,
+    TitlePage,
+    TitleSuggestion,
+    VersionedMovie,
+)
+from api.repository.movie.fuzzy import (
+    DEFAULT_MAX_DISTANCE,
+    bounded_levenshtein,
+    trigrams,
+    usable_distance,
+)
+from api.repository.movie.pagination import decode_cursor, encode_cursor
+from api.repository.movie.snapshots import ResultSnapshots
+from api.repository.movie.text import normalize_title, suggestion_rank, tokenize
+
+# Maximum number of distinct titles inspected to rank an autocomplete request.
+AUTOCOMPLETE_CANDIDATES = 200
+# Maximum number of distinct titles verified by a fuzzy title search.
+FUZZY_CANDIDATES = 10_000
+# Movie fields which can be changed by an update.
+UPDATABLE_FIELDS = ("title", "description", "release_year", "watched")
+# Number of prepared statements the connection keeps compiled.
+STATEMENT_CACHE_SIZE = 256
+# Largest number of ids bound to one IN (...) list.
+MAX_BOUND_IDS = 500
+# Relative weights of the title and description columns in full-text ranking.
+TITLE_WEIGHT, DESCRIPTION_WEIGHT = 2.0, 1.0
+
+# The movies table, its indexes, and the full-text index, title trigrams and
+# statistics kept up to date by triggers in the transaction of every write.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    title_normalized TEXT NOT NULL,
+    description TEXT,
+    release_year INTEGER NOT NULL,
+    watched INTEGER NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS movies_title_id ON movies (title, id);
+CREATE INDEX IF NOT EXISTS movies_title_normalized_id
+    ON movies (title_normalized, id);
+CREATE INDEX IF NOT EXISTS movies_release_year_id ON movies (release_year, id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+    title, description, content='movies', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+    INSERT INTO movies_fts (rowid, title, description)
+    VALUES (NEW.rowid, NEW.title, NEW.description);
+END;
+CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+    INSERT INTO movies_fts (movies_fts, rowid, title, description)
+    VALUES ('delete', OLD.rowid, OLD.title, OLD.description);
+END;
+CREATE TRIGGER IF NOT EXISTS movies_fts_update
+AFTER UPDATE OF title, description ON movies BEGIN
+    INSERT INTO movies_fts (movies_fts, rowid, title, description)
+    VALUES ('delete', OLD.rowid, OLD.title, OLD.description);
+    INSERT INTO movies_fts (rowid, title, description)
+    VALUES (NEW.rowid, NEW.title, NEW.description);
+END;
+
+CREATE TABLE IF NOT EXISTS title_trigrams (
+    trigram TEXT NOT NULL,
+    title_normalized TEXT NOT NULL,
+    PRIMARY KEY (trigram, title_normalized)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS title_trigrams_title
+    ON title_trigrams (title_normalized);
+CREATE TRIGGER IF NOT EXISTS movies_trigrams_delete AFTER DELETE ON movies
+WHEN NOT EXISTS (
+    SELECT 1 FROM movies WHERE title_normalized = OLD.title_normalized
+) BEGIN
+    DELETE FROM title_trigrams WHERE title_normalized = OLD.title_normalized;
+END;
+CREATE TRIGGER IF NOT EXISTS movies_trigrams_update
+AFTER UPDATE OF title_normalized ON movies
+WHEN OLD.title_normalized <> NEW.title_normalized AND NOT EXISTS (
+    SELECT 1 FROM movies WHERE title_normalized = OLD.title_normalized
+) BEGIN
+    DELETE FROM title_trigrams WHERE title_normalized = OLD.title_normalized;
+END;
+
+CREATE TABLE IF NOT EXISTS movie_stats (
+    release_year INTEGER PRIMARY KEY,
+    movies INTEGER NOT NULL,
+    watched INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS movie_stats_insert AFTER INSERT ON movies BEGIN
+    INSERT INTO movie_stats (release_year, movies, watched)
+    VALUES (NEW.release_year, 1, NEW.watched != 0)
+    ON CONFLICT (release_year) DO UPDATE
+    SET movies = movies + 1, watched = watched + excluded.watched;
+END;
+CREATE TRIGGER IF NOT EXISTS movie_stats_delete AFTER DELETE ON movies BEGIN
+    UPDATE movie_stats SET movies = movies - 1, watched = watched - (OLD.watched != 0)
+    WHERE release_year = OLD.release_year;
+END;
+CREATE TRIGGER IF NOT EXISTS movie_stats_update
+AFTER UPDATE OF release_year, watched ON movies BEGIN
+    UPDATE movie_stats SET movies = movies - 1, watched = watched - (OLD.watched != 0)
+    WHERE release_year = OLD.release_year;
+    INSERT INTO movie_stats (release_year, movies, watched)
+    VALUES (NEW.release_year, 1, NEW.watched != 0)
+    ON CONFLICT (release_year) DO UPDATE
+    SET movies = movies + 1, watched = watched + excluded.watched;
+END;
+"""
+
+_COLUMNS = "id, title, description, release_year, watched"
+_SELECT = f"SELECT {_COLUMNS} FROM movies"
+_UPSERT = (
+    "INSERT INTO movies (id, title, title_normalized, description, release_year,"
+    " watched, version) VALUES (?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (id) DO UPDATE SET title = excluded.title,"
+    " title_normalized = excluded.title_normalized,"
+    " description = excluded.description, release_year = excluded.release_year,"
+    " watched = excluded.watched, version = excluded.version"
+)
+_HAS_TRIGRAMS = "SELECT 1 FROM title_trigrams WHERE title_normalized = ? LIMIT 1"
+_INSERT_TRIGRAM = (
+    "INSERT OR IGNORE INTO title_trigrams (trigram, title_normalized) VALUES (?, ?)"
+)
+# Titles are compared as UTF-8 bytes, so appending the largest code point bounds
+# the range of the titles starting with a prefix; the substr check keeps it exact.
+_PREFIX_WHERE = (
+    "title_normalized >= ? AND title_normalized < ?"
+    " AND substr(title_normalized, 1, ?) = ?"
+)
+
+
+def _prefix_parameters(prefix: str) -> tuple:
+    return (prefix, prefix + "\U0010ffff", len(prefix), prefix)
+
+
+def _limit(limit: int) -> int:
+    """Returns the LIMIT of a page, where 0 means no limit."""
+    return -1 if limit == 0 else limit
+
+
+def _movie(row: tuple) -> Movie:
+    return Movie(
+        movie_id=row[0],
+        title=row[1],
+        description=row[2],
+        release_year=row[3],
+        watched=bool(row[4]),
+    )
+
+
+def _row(movie: Movie, version: int) -> tuple:
+    return (
+        movie.id,
+        movie.title,
+        normalize_title(movie.title),
+        movie.description,
+        movie.release_year,
+        movie.watched,
+        version,
+    )
+
+
+def _add_trigrams(connection: sqlite3.Connection, normalized_titles: typing.Iterable):
+    """Indexes the trigrams of the written normalized titles not indexed yet."""
+    for normalized in set(normalized_titles):
+        if connection.execute(_HAS_TRIGRAMS, (normalized,)).fetchone() is None:
+            connection.executemany(
+                _INSERT_TRIGRAM, [(gram, normalized) for gram in trigrams(normalized)]
+            )
+
+
+def _each(
+    connection: sqlite3.Connection,
+    items: typing.Iterable,
+    write: typing.Callable,
+    ordered: bool,
+) -> typing.List[typing.Optional[str]]:
+    """
+    Writes the items one by one, each in its own savepoint, and returns the error of
+    every item or None. An ordered write stops at the first failure.
+    """
+    errors = []
+    failed = False
+    for item in items:
+        if failed and ordered:
+            errors.append(NOT_PROCESSED)
+            continue
+        connection.execute("SAVEPOINT item")
+        try:
+            write(connection, item)
+        except (RepositoryException, sqlite3.Error) as e:
+            connection.execute("ROLLBACK TO item")
+            failed = True
+            errors.append(str(e))
+        else:
+            errors.append(None)
+        finally:
+            connection.execute("RELEASE item")
+    return errors
+
+
+class SqliteMovieRepository(MovieRepository):
+    """
+    This class provides a durable single node implementation of the MovieRepository
+    interface on an SQLite database file.
+
+    The database runs in WAL mode. Secondary indexes on (title, id), (normalized
+    title, id) and (release year, id) serve the title, prefix and release year
+    queries, an FTS5 table the full-text search and a table of title trigrams the
+    fuzzy title search. Triggers keep the full-text index and the catalog statistics
+    up to date in the transaction of every write.
+
+    sqlite3 calls block, so the connection lives on a dedicated thread and every
+    call is run there. The statements use parameters only, so they are compiled once
+    and then reused from the statement cache of the connection.
+
+    Writes are queued and committed together: every write waiting when a
+    transaction starts, up to max_batch_size, joins it in a savepoint of its own,
+    so a failed write does not fail the others and one commit covers the batch.
+    A positive max_delay holds the first write of a batch that many seconds to
+    let more join it. Each write returns once its transaction is committed.
+
+    Because stored movies are never mutated, title search results are frozen for
+    snapshot pagination by keeping references to the matching movies.
+
+    Version tags of created movies are the creation time in nanoseconds and updates
+    increment them, as in MongoMovieRepository.
+    """
+
+    def __init__(
+        self,
+        path: str = "movies.db",
+        max_batch_size: int = 500,
+        max_delay: float = 0.0,
+        synchronous: str = "FULL",
+    ):
+        self._path = path
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._synchronous = synchronous
+        # the connection is opened and used by the single thread of the executor
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sqlite-movies"
+        )
+        self._connection: typing.Optional[sqlite3.Connection] = None
+        self._pending: typing.List[
+            typing.Tuple[typing.Callable, tuple, asyncio.Future]
+        ] = []
+        self._writer: typing.Optional[asyncio.Task] = None
+        self._result_snapshots = ResultSnapshots()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self._path, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute(f"PRAGMA synchronous = {self._synchronous}")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _call(self, function: typing.Callable, *args):
+        if self._connection is None:
+            self._connection = self._connect()
+        return function(self._connection, *args)
+
+    async def _run(self, function: typing.Callable, *args):
+        """Runs function(connection, *args) on the thread of the connection."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._call, function, *args
+        )
+
+    async def _write(self, function: typing.Callable, *args):
+        """Queues function(connection, *args) and returns its result once committed."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((function, args, future))
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._write_pending())
+        return await future
+
+    async def _write_pending(self):
+        try:
+            await asyncio.sleep(self._max_delay)
+            while self._pending:
+                batch = self._pending[: self._max_batch_size]
+                del self._pending[: self._max_batch_size]
+                operations = [(function, args) for function, args, _ in batch]
+                try:
+                    outcomes = await self._run(self._transaction, operations)
+                except Exception as e:  # pylint: disable=broad-except
+                    outcomes = [(False, e)] * len(batch)
+                for (_, _, future), (ok, value) in zip(batch, outcomes):
+                    if future.done():
+                        # the caller was cancelled, the write is committed regardless
+                        continue
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+        finally:
+            self._writer = None
+
+    @staticmethod
+    def _transaction(
+        connection: sqlite3.Connection, operations: typing.List[tuple]
+    ) -> typing.List[tuple]:
+        """Runs the operations in one transaction, returns (ok, result or error) of each."""
+        outcomes = []
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for function, args in operations:
+                connection.execute("SAVEPOINT operation")
+                try:
+                    outcomes.append((True, function(connection, *args)))
+                except (RepositoryException, sqlite3.Error) as e:
+                    connection.execute("ROLLBACK TO operation")
+                    outcomes.append((False, e))
+                finally:
+                    connection.execute("RELEASE operation")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return outcomes
+
+    async def _fetch(self, sql: str, parameters: typing.Sequence = ()) -> list:
+        return await self._run(
+            lambda connection: connection.execute(sql, parameters).fetchall()
+        )
+
+    async def _movies(self, sql: str, parameters: typing.Sequence = ()):
+        return [_movie(row) for row in await self._fetch(sql, parameters)]
+
+    @staticmethod
+    def _upsert(connection: sqlite3.Connection, movie: Movie):
+        row = _row(movie, time.time_ns())
+        connection.execute(_UPSERT, row)
+        _add_trigrams(connection, [row[2]])
+
+    async def create(self, movie: Movie) -> bool:
+        await self._write(self._upsert, movie)
+
+    async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
+        rows = await self._fetch(f"{_SELECT} WHERE id = ?", (movie_id,))
+        return _movie(rows[0]) if rows else None
+
+    async def get_version(self, movie_id: str) -> typing.Optional[int]:
+        rows = await self._fetch("SELECT version FROM movies WHERE id = ?", (movie_id,))
+        return rows[0][0] if rows else None
+
+    async def get_versioned(self, movie_id: str) -> typing.Optional[VersionedMovie]:
+        rows = await self._fetch(
+            f"SELECT {_COLUMNS}, version FROM movies WHERE id = ?", (movie_id,)
+        )
+        if not rows:
+            return None
+        return VersionedMovie(movie=_movie(rows[0]), version=rows[0][5])
+
+    async def get_by_title(
+        self, title: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        return await self._movies(
+            f"{_SELECT} WHERE title = ? ORDER BY id LIMIT ? OFFSET ?",
+            (title, _limit(limit), skip),
+        )
+
+    async def get_by_title_after(
+        self, title: str, cursor: typing.Optional[str] = None, limit: int = 1000
+    ) -> CursorPage:
+        after = ""
+        if cursor is not None:
+            cursor_title, after = decode_cursor(cursor, 2)
+            if cursor_title != title:
+                raise RepositoryException(f"invalid cursor {cursor}")
+        # one extra movie tells whether a next page exists; the (title, id) index
+        # serves the range and the order, so deep pages cost the same as the first
+        movies = await self._movies(
+            f"{_SELECT} WHERE title = ? AND id > ? ORDER BY id LIMIT ?",
+            (title, after, -1 if limit == 0 else limit + 1),
+        )
+        next_cursor = None
+        if limit and len(movies) > limit:
+            movies = movies[:limit]
+            next_cursor = encode_cursor(title, movies[-1].id)
+        return CursorPage(movies=movies, next_cursor=next_cursor)
+
+    async def get_by_title_snapshot(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        snapshot: typing.Optional[str] = None,
+    ) -> TitlePage:
+        if snapshot is None:
+            movies = await self.get_by_title(title, limit=0)
+            snapshot = self._result_snapshots.take(title, movies)
+        movies = self._result_snapshots.page(snapshot, title, skip=skip, limit=limit)
+        return TitlePage(movies=movies, snapshot=snapshot)
+
+    async def get_by_title_prefix(
+        self, prefix: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+        return await self._movies(
+            f"{_SELECT} WHERE {_PREFIX_WHERE} ORDER BY title_normalized, id"
+            " LIMIT ? OFFSET ?",
+            (*_prefix_parameters(prefix), _limit(limit), skip),
+        )
+
+    @staticmethod
+    def _fuzzy_titles(
+        connection: sqlite3.Connection, normalized: str, max_distance: int
+    ) -> typing.Dict[str, int]:
+        """Returns the normalized titles within max_distance edits, by distance."""
+        grams = sorted(trigrams(normalized))
+        max_distance = usable_distance(set(grams), max_distance)
+        # any 3d + 1 trigrams of the query find every match, the rarest ones find
+        # the fewest candidates to verify
+        placeholders = ", ".join("?" * len(grams))
+        frequencies = dict(
+            connection.execute(
+                "SELECT trigram, COUNT(*) FROM title_trigrams"
+                f" WHERE trigram IN ({placeholders}) GROUP BY trigram",
+                grams,
+            ).fetchall()
+        )
+        chosen = [gram for gram in grams if gram in frequencies]
+        chosen.sort(key=frequencies.get)
+        chosen = chosen[: 3 * max_distance + 1]
+        if not chosen:
+            return {}
+        placeholders = ", ".join("?" * len(chosen))
+        # one more than the cap tells a complete result from a truncated one
+        candidates = connection.execute(
+            "SELECT DISTINCT title_normalized FROM title_trigrams"
+            f" WHERE trigram IN ({placeholders}) LIMIT ?",
+            (*chosen, FUZZY_CANDIDATES + 1),
+        ).fetchall()
+        if len(candidates) > FUZZY_CANDIDATES:
+            raise RepositoryException(
+                f"title {normalized} is too close to more than {FUZZY_CANDIDATES} "
+                "titles, use a longer one"
+            )
+        distances = {}
+        for (candidate,) in candidates:
+            distance = bounded_levenshtein(normalized, candidate, max_distance)
+            if distance is not None:
+                distances[candidate] = distance
+        return distances
+
+    async def get_by_title_fuzzy(
+        self,
+        title: str,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        skip: int = 0,
+        limit: int = 1000,
+    ) -> typing.List[Movie]:
+        normalized = normalize_title(title)
+        if not normalized:
+            return []
+        distances = await self._run(self._fuzzy_titles, normalized, max_distance)
+        if not distances:
+            return []
+        titles = list(distances)
+        movies = []
+        for start in range(0, len(titles), MAX_BOUND_IDS):
+            chunk = titles[start : start + MAX_BOUND_IDS]
+            movies.extend(
+                await self._movies(
+                    f"{_SELECT} WHERE title_normalized IN"
+                    f" ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        movies.sort(
+            key=lambda movie: (
+                distances[normalize_title(movie.title)],
+                normalize_title(movie.title),
+                movie.id,
+            )
+        )
+        return movies[skip : skip + limit if limit else None]
+
+    async def autocomplete_titles(
+        self, prefix: str, limit: int = 10
+    ) -> typing.List[TitleSuggestion]:
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+        # with a min() aggregate the bare title column comes from the row of the
+        # smallest id, the title of the first movie of every normalized title
+        rows = await self._fetch(
+            "SELECT title_normalized, title, MIN(id), COUNT(*) FROM movies"
+            f" WHERE {_PREFIX_WHERE} GROUP BY title_normalized"
+            " ORDER BY title_normalized LIMIT ?",
+            (*_prefix_parameters(prefix), AUTOCOMPLETE_CANDIDATES),
+        )
+        rows.sort(key=lambda row: suggestion_rank(prefix, row[0], row[3]))
+        return [TitleSuggestion(title=row[1], count=row[3]) for row in rows[:limit]]
+
+    async def get_by_release_year_range(
+        self, start: int, end: int, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        return await self._movies(
+            f"{_SELECT} WHERE release_year BETWEEN ? AND ?"
+            " ORDER BY release_year, id LIMIT ? OFFSET ?",
+            (start, end, _limit(limit), skip),
+        )
+
+    async def search(
+        self, query: str, skip: int = 0, limit: int = 1000
+    ) -> typing.List[Movie]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # quoted terms are matched as plain words, never as FTS5 query syntax
+        match = " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+        return await self._movies(
+            f"SELECT {', '.join(f'movies.{c}' for c in _COLUMNS.split(', '))}"
+            " FROM movies_fts JOIN movies ON movies.rowid = movies_fts.rowid"
+            " WHERE movies_fts MATCH ?"
+            f" ORDER BY bm25(movies_fts, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}),"
+            " movies.id LIMIT ? OFFSET ?",
+            (match, _limit(limit), skip),
+        )
+
+    async def delete(self, movie_id: str):
+        await self._write(
+            lambda connection: connection.execute(
+                "DELETE FROM movies WHERE id = ?", (movie_id,)
+            )
+        )
+
+    @staticmethod
+    def _update(connection: sqlite3.Connection, movie_id: str, parameters: dict):
+        if "id" in parameters:
+            raise RepositoryException("can't update movie id.")
+        fields = {
+            key: value for key, value in parameters.items() if key in UPDATABLE_FIELDS
+        }
+        if "title" in fields:
+            fields["title_normalized"] = normalize_title(fields["title"])
+        # the column names come from UPDATABLE_FIELDS, only the values are bound
+        assignments = "".join(f"{column} = :{column}, " for column in sorted(fields))
+        cursor = connection.execute(
+            f"UPDATE movies SET {assignments}version = version + 1 WHERE id = :id",
+            {**fields, "id": movie_id},
+        )
+        if cursor.rowcount == 0:
+            raise RepositoryException(f"movie: {movie_id} not found")
+        if "title" in fields:
+            _add_trigrams(connection, [fields["title_normalized"]])
+
+    async def update(self, movie_id: str, update_parameteres: dict):
+        await self._write(self._update, movie_id, update_parameteres)
+
+    @staticmethod
+    def _create_many(
+        connection: sqlite3.Connection, movies: typing.List[Movie], ordered: bool
+    ) -> typing.List[typing.Optional[str]]:
+        rows = [_row(movie, time.time_ns()) for movie in movies]
+        connection.execute("SAVEPOINT movies")
+        try:
+            connection.executemany(_UPSERT, rows)
+            errors = [None] * len(rows)
+        except sqlite3.Error:
+            # find the failing movies by writing them one at a time
+            connection.execute("ROLLBACK TO movies")
+            errors = _each(
+                connection,
+                rows,
+                lambda connection, row: connection.execute(_UPSERT, row),
+                ordered,
+            )
+        finally:
+            connection.execute("RELEASE movies")
+        _add_trigrams(
+            connection, [row[2] for row, error in zip(rows, errors) if error is None]
+        )
+        return errors
+
+    async def create_many(
+        self, movies: typing.List[Movie], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        errors = await self._write(self._create_many, movies, ordered)
+        return [
+            BulkItemResult(movie.id, error is None, error)
+            for movie, error in zip(movies, errors)
+        ]
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        distinct = list(set(movie_ids))
+        movies = {}
+        for start in range(0, len(distinct), MAX_BOUND_IDS):
+            chunk = distinct[start : start + MAX_BOUND_IDS]
+            for movie in await self._movies(
+                f"{_SELECT} WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ):
+                movies[movie.id] = movie
+        return [movies.get(movie_id) for movie_id in movie_ids]
+
+    async def get_many_versioned(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[VersionedMovie]]:
+        distinct = list(set(movie_ids))
+        versioned = {}
+        for start in range(0, len(distinct), MAX_BOUND_IDS):
+            chunk = distinct[start : start + MAX_BOUND_IDS]
+            for row in await self._fetch(
+                f"SELECT {_COLUMNS}, version FROM movies"
+                f" WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ):
+                versioned[row[0]] = VersionedMovie(movie=_movie(row), version=row[5])
+        return [versioned.get(movie_id) for movie_id in movie_ids]
+
+    async def update_many(
+        self, updates: typing.List[typing.Tuple[str, dict]], ordered: bool = True
+    ) -> typing.List[BulkItemResult]:
+        errors = await self._write(
+            lambda connection: _each(
+                connection,
+                updates,
+                lambda connection, update: self._update(connection, *update),
+                ordered,
+            )
+        )
+        return [
+            BulkItemResult(movie_id, error is None, error)
+            for (movie_id, _), error in zip(updates, errors)
+        ]
+
+    @staticmethod
+    def _delete_many(
+        connection: sqlite3.Connection, movie_ids: typing.List[str]
+    ) -> typing.List[bool]:
+        statement = "DELETE FROM movies WHERE id = ?"
+        return [
+            connection.execute(statement, (movie_id,)).rowcount > 0
+            for movie_id in movie_ids
+        ]
+
+    async def delete_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[BulkItemResult]:
+        deleted = await self._write(self._delete_many, movie_ids)
+        return [
+            (
+                BulkItemResult(movie_id, True)
+                if ok
+                else BulkItemResult(movie_id, False, f"movie: {movie_id} not found")
+            )
+            for movie_id, ok in zip(movie_ids, deleted)
+        ]
+
+    async def get_stats(self) -> CatalogStats:
+        rows = await self._fetch(
+            "SELECT release_year, movies, watched FROM movie_stats"
+            " WHERE movies > 0 ORDER BY release_year"
+        )
+        return CatalogStats(
+            total=sum(row[1] for row in rows),
+            watched=sum(row[2] for row in rows),
+            by_release_year={row[0]: row[1] for row in rows},
+        )
+
+    async def initialize(self):
+        # opens the database and creates the schema before the first request
+        await self._run(lambda connection: None)
+
+    async def close(self):
+        if self._writer is not None:
+            await asyncio.shield(self._writer)
+        if self._connection is not None:
+            await self._run(lambda connection: connection.close())
+            self._connection = None
+        self._executor.shutdown(wait=True)
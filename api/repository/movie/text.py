@@ -0,0 +1,25 @@
+"""This module contains helpers for normalizing and ranking movie titles for search."""
+
+import re
+import typing
+
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+
+def normalize_title(title: str) -> str:
+    """Returns the case and whitespace insensitive form of a title used for searching."""
+    return _WHITESPACE.sub(" ", title).strip().casefold()
+
+
+def suggestion_rank(prefix: str, normalized_title: str, count: int) -> typing.Tuple:
+    """
+    Sort key for autocomplete suggestions: exact matches first, then titles shared
+    by more movies, then shorter titles, then alphabetical order.
+    """
+    return (normalized_title != prefix, -count, len(normalized_title), normalized_title)
+
+
+def tokenize(text: str) -> typing.List[str]:
+    """Splits a text into the case insensitive words the full-text search matches."""
+    return _WORD.findall(text.casefold())
@@ -0,0 +1,92 @@
+"""
+This module contains a repository coalescing concurrent creates into bulk writes.
+"""
+
+import asyncio
+import typing
+
+from api.entities.movies import Movie
+from api.repository.movie.abstractions import MovieRepository, RepositoryException
+from api.repository.movie.delegating import DelegatingMovieRepository
+
+
+class WriteBehindMovieRepository(DelegatingMovieRepository):
+    """
+    Queues creates and writes them to the wrapped repository with one unordered
+    create_many once max_batch_size movies are queued or max_delay seconds after
+    the first of them. Every create returns once its batch is acknowledged and
+    raises RepositoryException if its movie failed, so callers keep the guarantees
+    of a direct create. The other operations go straight to the wrapped repository.
+    """
+
+    def __init__(
+        self,
+        inner: MovieRepository,
+        max_batch_size: int = 500,
+        max_delay: float = 0.01,
+    ):
+        super().__init__(inner)
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._pending: typing.List[typing.Tuple[Movie, asyncio.Future]] = []
+        self._timer: typing.Optional[asyncio.TimerHandle] = None
+        self._writes: typing.Set[asyncio.Task] = set()
+
+    async def create(self, movie: Movie) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((movie, future))
+        if len(self._pending) >= self._max_batch_size:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_delay, self._flush_pending)
+        await future
+
+    def _flush_pending(self):
+        """Starts writing the queued creates as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        write = asyncio.ensure_future(self._write(batch))
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: typing.List[typing.Tuple[Movie, asyncio.Future]]):
+        # an unordered bulk write may apply its items in any order, so only the
+        # latest create of a movie is written and all its callers share the outcome
+        latest = {movie.id: movie for movie, _ in batch}
+        try:
+            results = await self._inner.create_many(
+                list(latest.values()), ordered=False
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        errors = {result.movie_id: result.error for result in results if not result.ok}
+        for movie, future in batch:
+            if future.done():
+                # the caller was cancelled, the movie is written regardless
+                continue
+            if movie.id in errors:
+                future.set_exception(
+                    RepositoryException(
+                        f"could not create movie {movie.id}: {errors[movie.id]}"
+                    )
+                )
+            else:
+                future.set_result(None)
+
+    async def flush(self):
+        """Writes the queued creates and waits for every write in flight."""
+        self._flush_pending()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
+        await super().close()
@@ -0,0 +1,95 @@
+"""
+Measures the latency of the fuzzy title search of the TrigramIndex for growing catalogs,
+against verifying the query against every title, for queries with one or two typos.
+
+Usage: python -m benchmarks.fuzzy_search [titles ...]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from api.repository.movie.fuzzy import TrigramIndex, bounded_levenshtein
+from api.repository.movie.text import normalize_title
+
+QUERIES = 200
+SCAN_QUERIES = 5
+# Letters weighted by their frequency in English text.
+LETTERS = (
+    "eeeeeeeeeeeettttttttaaaaaaaaoooooooiiiiiiinnnnnnnsssssshhhhhhrrrrrrdddd"
+    "llllcccuuummwwffggyyppbbvkjxqz"
+)
+
+
+def titles(count: int, rng: random.Random):
+    """Returns count distinct normalized titles of one to four made up words."""
+    words = list(
+        {
+            "".join(rng.choice(LETTERS) for _ in range(rng.randrange(2, 10)))
+            for _ in range(50_000)
+        }
+    )
+    result = set()
+    while len(result) < count:
+        result.add(
+            normalize_title(
+                " ".join(rng.choice(words) for _ in range(rng.randrange(1, 5)))
+            )
+        )
+    return list(result)
+
+
+def misspell(title: str, rng: random.Random) -> str:
+    """Applies one or two random substitutions, deletions or insertions."""
+    for _ in range(rng.randrange(1, 3)):
+        position = rng.randrange(len(title))
+        edit = rng.randrange(3)
+        letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        if edit == 0:
+            title = title[:position] + letter + title[position + 1 :]
+        elif edit == 1 and len(title) > 3:
+            title = title[:position] + title[position + 1 :]
+        else:
+            title = title[:position] + letter + title[position:]
+    return title
+
+
+def percentile(samples, fraction: float) -> float:
+    return sorted(samples)[int(len(samples) * fraction)]
+
+
+def main():
+    """Runs the benchmark and prints the latency per catalog size."""
+    sizes = [int(size) for size in sys.argv[1:]] or [100_000, 1_000_000]
+    print(
+        f"{'titles':>10}{'build s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'matches':>9}{'scan ms':>10}"
+    )
+    for size in sizes:
+        rng = random.Random(42)
+        catalog = titles(size, rng)
+        started = time.perf_counter()
+        index = TrigramIndex()
+        for title in catalog:
+            index.add(title)
+        build = time.perf_counter() - started
+        queries = [misspell(rng.choice(catalog), rng) for _ in range(QUERIES)]
+        latencies, matches = [], 0
+        for query in queries:
+            started = time.perf_counter()
+            matches += len(index.search(query, 2))
+            latencies.append((time.perf_counter() - started) * 1e3)
+        started = time.perf_counter()
+        for query in queries[:SCAN_QUERIES]:
+            for title in catalog:
+                bounded_levenshtein(query, title, 2)
+        scan = (time.perf_counter() - started) * 1e3 / SCAN_QUERIES
+        print(
+            f"{size:>10}{build:>10.1f}{statistics.median(latencies):>9.2f}"
+            f"{percentile(latencies, 0.95):>9.2f}{matches / QUERIES:>9.1f}{scan:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
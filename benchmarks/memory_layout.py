@@ -0,0 +1,99 @@
+"""
+Compares the memory used per movie by the dict of Movie objects storage and by the
+ColumnarMovieStore, alone and inside a populated MemoryMovieRepository. The indexes
+are the same for both layouts, so the storage column is where they differ.
+
+Usage: python -m benchmarks.memory_layout [rows]
+"""
+
+import asyncio
+import gc
+import random
+import sys
+import tracemalloc
+import typing
+import uuid
+
+from api.entities.movies import Movie
+from api.repository.movie.columnar import ColumnarMovieStore
+from api.repository.movie.memory import DictMovieStore, MemoryMovieRepository
+
+TITLES = 5000
+BATCH_SIZE = 1000
+
+
+def movies(rows: int):
+    """Yields movies built from freshly allocated strings, as if decoded from requests."""
+    rng = random.Random(42)
+    for _ in range(rows):
+        yield Movie(
+            movie_id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            title=f"Movie title number {rng.randrange(TITLES)}",
+            description=f"A description of the movie {rng.getrandbits(32)}",
+            release_year=rng.randrange(1900, 2025),
+            watched=rng.random() < 0.5,
+        )
+
+
+async def populate(repo: MemoryMovieRepository, rows: int):
+    """Creates the rows movies in batches, as an import would."""
+    batch = []
+    for movie in movies(rows):
+        batch.append(movie)
+        if len(batch) == BATCH_SIZE:
+            await repo.create_many(batch)
+            batch = []
+    await repo.create_many(batch)
+
+
+def fill(storage, rows: int):
+    """Stores the rows movies directly, without the indexes of a repository."""
+    for movie in movies(rows):
+        storage[movie.id] = movie
+    return storage
+
+
+def retained_by(build) -> int:
+    """Returns the bytes still allocated by the object build returns, once built."""
+    gc.collect()
+    tracemalloc.start()
+    built = build()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return retained
+
+
+def measure(storage_factory, rows: int) -> typing.Tuple[int, int]:
+    """Returns the bytes retained by the storage alone and by a whole repository."""
+
+    def repository():
+        repo = MemoryMovieRepository(storage=storage_factory())
+        asyncio.run(populate(repo, rows))
+        return repo
+
+    storage = retained_by(lambda: fill(storage_factory(), rows))
+    return storage, retained_by(repository)
+
+
+def main():
+    """Runs the benchmark and prints the bytes per row of each layout."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print(
+        f"{'layout':<12}{'rows':>10}{'storage/row':>13}{'indexes/row':>13}"
+        f"{'total/row':>11}"
+    )
+    for name, storage_factory in (
+        ("dict", DictMovieStore),
+        ("columnar", ColumnarMovieStore),
+    ):
+        storage, total = measure(storage_factory, rows)
+        print(
+            f"{name:<12}{rows:>10}{storage / rows:>13.1f}"
+            f"{(total - storage) / rows:>13.1f}{total / rows:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
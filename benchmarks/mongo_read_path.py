@@ -0,0 +1,129 @@
+"""
+Compares the client side cost of turning a page of MongoDB documents into movies:
+
+- full: whole documents decoded to dicts, one Movie(...) per document (the old path)
+- projected: only the movie fields decoded, bulk Movie.from_documents (the current path)
+- raw: projected raw BSON walked in Python without building dicts
+
+Pages are encoded as the server sends them, so this runs without a database.
+
+Usage: python -m benchmarks.mongo_read_path [rows] [repetitions]
+"""
+
+import struct
+import sys
+import timeit
+
+import bson
+
+from api.entities.movies import Movie
+from api.repository.movie.mongo import MOVIE_PROJECTION, _document
+
+_INT32 = struct.Struct("<i")
+_INT64 = struct.Struct("<q")
+
+
+def build_pages(rows: int):
+    """Returns the full and the projected encoding of a page of rows movies."""
+    documents = []
+    for i in range(rows):
+        document = _document(
+            Movie(
+                movie_id=f"{i:08x}-1c2d-4e5f-8a9b-0c1d2e3f4a5b",
+                title=f"Movie title number {i % 97}",
+                description="A description of the movie, as long as most are. " * 2,
+                release_year=1950 + i % 70,
+                watched=i % 2 == 0,
+            )
+        )
+        document["_id"] = bson.ObjectId()
+        documents.append(document)
+    full = b"".join(bson.encode(document) for document in documents)
+    fields = [field for field, included in MOVIE_PROJECTION.items() if included]
+    projected = b"".join(
+        bson.encode({field: document[field] for field in fields})
+        for document in documents
+    )
+    return full, projected
+
+
+def full_path(data: bytes):
+    """The read path before projections: decode everything, build one by one."""
+    return [
+        Movie(
+            movie_id=document.get("id"),
+            title=document.get("title"),
+            description=document.get("description"),
+            release_year=document.get("release_year"),
+            watched=document.get("watched"),
+        )
+        for document in bson.decode_all(data)
+    ]
+
+
+def projected_path(data: bytes):
+    """The current read path: projected documents, bulk construction."""
+    return Movie.from_documents(bson.decode_all(data))
+
+
+def raw_path(data: bytes):
+    """Walks the raw BSON of projected documents in Python, building no dicts."""
+    movies = []
+    offset = 0
+    while offset < len(data):
+        (size,) = _INT32.unpack_from(data, offset)
+        end = offset + size - 1
+        position = offset + 4
+        fields = {}
+        while position < end:
+            element_type = data[position]
+            name_end = data.index(b"\x00", position + 1)
+            name = data[position + 1 : name_end]
+            position = name_end + 1
+            if element_type == 0x02:
+                (length,) = _INT32.unpack_from(data, position)
+                value = data[position + 4 : position + 3 + length].decode()
+                position += 4 + length
+            elif element_type == 0x10:
+                (value,) = _INT32.unpack_from(data, position)
+                position += 4
+            elif element_type == 0x12:
+                (value,) = _INT64.unpack_from(data, position)
+                position += 8
+            elif element_type == 0x08:
+                value = data[position] == 1
+                position += 1
+            else:
+                raise ValueError(f"unsupported BSON type {element_type}")
+            fields[name] = value
+        movies.append(
+            Movie(
+                movie_id=fields[b"id"],
+                title=fields[b"title"],
+                description=fields[b"description"],
+                release_year=fields[b"release_year"],
+                watched=fields[b"watched"],
+            )
+        )
+        offset += size
+    return movies
+
+
+def main():
+    """Runs the benchmark and prints the time per page of every path."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    full, projected = build_pages(rows)
+    assert full_path(full) == projected_path(projected) == raw_path(projected)
+    print(f"{'path':<12}{'bytes':>10}{'ms/page':>10}")
+    for name, function, data in (
+        ("full", full_path, full),
+        ("projected", projected_path, projected),
+        ("raw", raw_path, projected),
+    ):
+        elapsed = timeit.timeit(lambda: function(data), number=repetitions)
+        print(f"{name:<12}{len(data):>10}{elapsed / repetitions * 1e3:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
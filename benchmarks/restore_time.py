@@ -0,0 +1,60 @@
+"""
+Measures how long MemoryMovieRepository takes to restore its journal, for growing catalog
+sizes: a full snapshot followed by a short log tail.
+
+Usage: python -m benchmarks.restore_time [rows ...]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+from api.entities.movies import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.persistence import MovieJournal
+
+TAIL = 1000
+
+
+def movies(rows: int, seed: int = 42):
+    """Yields reproducible random movies."""
+    rng = random.Random(seed)
+    for _ in range(rows):
+        yield Movie(
+            movie_id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            title=f"Movie title number {rng.randrange(rows // 10 + 1)}",
+            description=f"A description of the movie {rng.getrandbits(32)}",
+            release_year=rng.randrange(1900, 2025),
+            watched=rng.random() < 0.5,
+        )
+
+
+async def prepare(directory: str, rows: int):
+    """Writes a snapshot of rows movies and a log tail of TAIL creates."""
+    journal = MovieJournal(directory, fsync_batch_size=10_000)
+    generation = journal.rotate()
+    journal.write_snapshot(generation, movies(rows))
+    repo = MemoryMovieRepository(journal=journal, snapshot_every=rows + TAIL + 1)
+    for movie in movies(TAIL, seed=7):
+        await repo.create(movie)
+    await repo.close()
+
+
+def main():
+    """Runs the benchmark and prints the restore time per catalog size."""
+    sizes = [int(size) for size in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'rows':>10}{'restore s':>12}{'us/row':>10}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(prepare(directory, rows))
+            started = time.perf_counter()
+            MemoryMovieRepository(journal=MovieJournal(directory))
+            elapsed = time.perf_counter() - started
+        print(f"{rows:>10}{elapsed:>12.3f}{elapsed / rows * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()